@@ -3,13 +3,17 @@ Flask-based Loto7 Prediction API
 非同期対応・超軽量初期化・メモリ最適化版
 """
 
-from flask import Flask, request, jsonify, send_file, send_from_directory, render_template
+from flask import Flask, request, jsonify, send_file, send_from_directory, render_template, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import json
 import traceback
 import gc
+import time
 import psutil
+import threading
+import pandas as pd
+from collections import OrderedDict
 from datetime import datetime
 import logging
 
@@ -19,6 +23,12 @@ import tasks
 
 # 自作モジュール（最小限の読み込み）
 from utils.file_manager import FileManager
+from utils.artifact_io import ArtifactValidationError
+from utils.task_events import TERMINAL_STATES
+from utils.celery_health import CeleryHealthMonitor
+from utils.request_metrics import RequestMetrics
+from utils.task_durations import default_estimate, parse_estimated_time
+from utils.profiling import CAPTURE_MODES
 
 # Flask設定
 app = Flask(__name__, static_folder='static', template_folder='templates')
@@ -42,6 +52,185 @@ os.makedirs('./templates', exist_ok=True)
 # グローバル変数（最小限）
 file_manager = None
 
+class FileViewCache:
+    """ファイルパスと(mtime, size)をキーにした読み込み結果キャッシュ
+    
+    ファイルが更新されるまではパース済みの構造と生成済みレスポンスをメモリから返す。
+    レスポンスは決まったキーだけを response() で保持し、リクエストで値が変わるものは
+    recent_response() で直近の一定件数だけを保持する"""
+    
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _signature(paths):
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        return tuple(signature)
+    
+    def get(self, key, paths, loader):
+        """キャッシュエントリを取得（ファイルが変わっていればloaderで再読み込み）"""
+        signature = self._signature(paths)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        entry = {'signature': signature, 'value': loader(), 'responses': {}, 'recent_responses': OrderedDict()}
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+    
+    def response(self, entry, response_key, builder):
+        """エントリに紐づく生成済みレスポンスを取得（なければ生成して保持）"""
+        responses = entry['responses']
+        if response_key not in responses:
+            responses[response_key] = builder(entry['value'])
+        return responses[response_key]
+    
+    def recent_response(self, entry, response_key, builder, limit):
+        """直近に使われたレスポンスを最大limit件だけ保持して取得（空の結果は保持しない）"""
+        responses = entry['recent_responses']
+        with self._lock:
+            if response_key in responses:
+                responses.move_to_end(response_key)
+                return responses[response_key]
+        
+        response = builder(entry['value'])
+        if response:
+            with self._lock:
+                responses[response_key] = response
+                while len(responses) > limit:
+                    responses.popitem(last=False)
+        return response
+    
+    def invalidate(self, key=None):
+        """キャッシュを破棄"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self):
+        """キャッシュのヒット率"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total > 0 else 0.0,
+                'entries': len(self._entries)
+            }
+
+view_cache = FileViewCache()
+
+# Celery稼働状況（バックグラウンドで定期取得したスナップショットを参照）
+# ファイルの有無（共有ストアとの同期を含む）とタスク計測もRedisへの問い合わせが要るため同じスレッドで取得する
+celery_health = CeleryHealthMonitor(celery_app)
+celery_health.add_collector('files', lambda: file_manager.files_status() if file_manager else {})
+celery_health.add_collector('tasks', lambda: tasks.get_task_metrics().summary())
+
+# よく使われる件数は読み込み時にレスポンスを作っておく（それ以外の件数はリクエストごとに作る）
+COMMON_VIEW_COUNTS = (5, 10)
+
+# 予測詳細のレスポンスを保持する開催回の件数
+DETAIL_VIEW_LIMIT = 32
+
+def _history_paths():
+    """予測履歴の更新検知に使うファイル一覧"""
+    if file_manager.history_backend == 'sqlite':
+        return [file_manager.history_db_path, file_manager.history_db_path + '-wal']
+    return [file_manager.history_path]
+
+def _load_history_view():
+    """予測履歴を読み込み（読み込み失敗時はNone）"""
+    from models.prediction_history import RoundAwarePredictionHistory
+    history = RoundAwarePredictionHistory()
+    history.set_file_manager(file_manager)
+    return history if history.load_from_csv() else None
+
+def get_history_view():
+    """キャッシュ済みの予測履歴エントリを取得"""
+    file_manager.history_exists()  # 共有ストアの新しい版をローカルへ反映
+    entry = view_cache.get('prediction_history', _history_paths(), _load_history_view)
+    if entry['value'] is not None:
+        for count in COMMON_VIEW_COUNTS:
+            recent_history_response(entry, count)
+    return entry
+
+def recent_history_response(entry, count):
+    """最近の予測履歴レスポンス（よく使われる件数のみ保持）"""
+    if count in COMMON_VIEW_COUNTS:
+        return view_cache.response(entry, ('recent', count), lambda history: _build_history_response(history, count))
+    return _build_history_response(entry['value'], count)
+
+def _build_history_response(history, count):
+    recent_predictions = history.get_recent_predictions(count)
+    return {
+        'predictions': recent_predictions,
+        'total_count': len(history.predictions),
+        'summary': history.get_prediction_summary()
+    }
+
+def get_data_view():
+    """キャッシュ済みの抽選データエントリを取得"""
+    file_manager.data_cached()  # 共有ストアの新しい版をローカルへ反映
+    entry = view_cache.get('data_cache', [file_manager.data_path], file_manager.load_data_cache)
+    if entry['value'] is not None and len(entry['value']) > 0:
+        for count in COMMON_VIEW_COUNTS:
+            recent_results_response(entry, count)
+    return entry
+
+def recent_results_response(entry, count):
+    """最近の抽選結果レスポンス（よく使われる件数のみ保持）"""
+    if count in COMMON_VIEW_COUNTS:
+        return view_cache.response(entry, ('recent', count), lambda data: _build_recent_results(data, count))
+    return _build_recent_results(entry['value'], count)
+
+def _build_recent_results(cached_data, count):
+    # 最新のcount件を取得（軽量処理）
+    recent_data = cached_data.nlargest(count, '開催回')
+    
+    results = []
+    for _, row in recent_data.iterrows():
+        try:
+            round_num = int(row['開催回'])
+            main_numbers = []
+            
+            # メイン数字を取得
+            main_cols = ['第1数字', '第2数字', '第3数字', '第4数字', '第5数字', '第6数字', '第7数字']
+            for col in main_cols:
+                if col in row.index and not pd.isna(row[col]):
+                    main_numbers.append(int(row[col]))
+            
+            if len(main_numbers) == 7:
+                results.append({
+                    'round': round_num,
+                    'date': row.get('日付', ''),
+                    'main_numbers': sorted(main_numbers),
+                    'bonus_numbers': []  # ボーナス数字は省略（軽量化）
+                })
+        except:
+            continue
+    
+    return {
+        'results': sorted(results, key=lambda x: x['round'], reverse=True),
+        'count': len(results),
+        'latest_round': int(cached_data['開催回'].max()) if len(cached_data) > 0 else 0
+    }
+
 def ultra_light_init():
     """🔥 超軽量初期化 - 1秒以内で完了"""
     global file_manager
@@ -52,6 +241,10 @@ def ultra_light_init():
         file_manager = FileManager()
         logger.info("✅ ファイル管理器初期化完了")
         
+        # 共有アーティファクトの更新通知を購読（Redis共有時のみ）
+        if file_manager.watch_artifacts():
+            logger.info("✅ アーティファクト更新通知の購読を開始")
+        
         # メモリ最適化の初期設定
         optimize_memory()
         
@@ -106,6 +299,44 @@ def create_error_response(message, status_code=500, details=None):
     
     return jsonify(response), status_code
 
+# 📈 リクエスト計測
+request_metrics = RequestMetrics()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    request_metrics.request_started()
+
+@app.after_request
+def record_request_metrics(response):
+    """エンドポイント別のレイテンシ・ステータス・バイト数を記録（ストリーミングは応答開始まで）"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.request_finished(
+            endpoint, request.method, response.status_code,
+            time.perf_counter() - started, response.content_length or 0
+        )
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # 例外でafter_requestが呼ばれなかったリクエストも処理中件数から外す
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.request_finished(endpoint, request.method, 500, time.perf_counter() - started)
+
+def estimate_task(task_name, stage=None, default=None):
+    """タスクのETA（過去の所要時間の中央値・p90）と推奨ポーリング間隔"""
+    data_size = None
+    try:
+        data_size = file_manager.data_row_count() if file_manager else None
+        return tasks.get_task_durations().estimate(task_name, stage=stage, data_size=data_size, default=default)
+    except Exception as e:
+        logger.warning(f"ETA履歴の取得に失敗（既定の目安を使用）: {e}")
+        return default_estimate(task_name, default)
+
 def get_task_status(task_id):
     """Celeryタスクの状態を取得"""
     try:
@@ -194,7 +425,8 @@ def init_heavy_async():
         return create_success_response({
             'task_id': task.id,
             'status': 'started',
-            'message': '重いコンポーネントの初期化を開始しました'
+            'message': '重いコンポーネントの初期化を開始しました',
+            **estimate_task('tasks.heavy_init_task')
         }, "初期化タスクを開始しました")
         
     except Exception as e:
@@ -223,7 +455,7 @@ def predict_async():
             'task_id': task.id,
             'status': 'started',
             'message': '予測生成を開始しました',
-            'estimated_time': '30-60秒'
+            **estimate_task('tasks.predict_task')
         }, "予測タスクを開始しました")
         
     except Exception as e:
@@ -238,14 +470,19 @@ def train_async():
         # リクエストパラメータ
         request_data = request.get_json() or {}
         
+        # 詳細計測（profile: cpu / memory）は指定されたときだけ
+        profile_mode = request_data.get('profile')
+        if profile_mode is not None and profile_mode not in CAPTURE_MODES:
+            return create_error_response(f"無効な計測モード: {profile_mode}（{' / '.join(CAPTURE_MODES)}）", 400)
+        
         # 非同期タスクを開始
-        task = tasks.train_model_task.delay(request_data)
+        task = tasks.train_model_task.delay(request_data, profile=profile_mode)
         
         return create_success_response({
             'task_id': task.id,
             'status': 'started',
             'message': 'モデル学習を開始しました',
-            'estimated_time': '2-5分',
+            **estimate_task('tasks.train_model_task'),
             'options': request_data
         }, "学習タスクを開始しました")
         
@@ -258,14 +495,29 @@ def train_async():
 def validation_async():
     """非同期時系列検証"""
     try:
+        # リクエストパラメータ
+        request_data = request.get_json(silent=True) or {}
+        
+        fidelity = request_data.get('fidelity', 'full')
+        if fidelity not in ('full', 'screening', 'tiered'):
+            return create_error_response(f"無効な忠実度ティア: {fidelity}", 400)
+        
+        expanding_mode = request_data.get('expanding_mode', 'exact')
+        if expanding_mode not in ('exact', 'warm_start'):
+            return create_error_response(f"無効な累積窓モード: {expanding_mode}", 400)
+        
+        if request_data.get('distributed') and expanding_mode != 'exact':
+            return create_error_response("分散検証は累積窓exactモードのみ対応しています", 400)
+        
         # 非同期タスクを開始
-        task = tasks.validation_task.delay()
+        task = tasks.validation_task.delay(request_data)
         
         return create_success_response({
             'task_id': task.id,
             'status': 'started',
             'message': '時系列検証を開始しました',
-            'estimated_time': '3-10分'
+            **estimate_task('tasks.validation_task'),
+            'options': request_data
         }, "検証タスクを開始しました")
         
     except Exception as e:
@@ -284,6 +536,150 @@ def get_task_status_api(task_id):
         logger.error(f"タスク状態確認エラー: {e}")
         return create_error_response(f"タスク状態の確認に失敗しました: {str(e)}", 500)
 
+# 🔥 タスク進捗ストリーム（Server-Sent Events）
+SSE_HEARTBEAT_SECONDS = 15   # 無通信時のコメント送信・状態再確認の間隔
+SSE_MAX_STREAM_SECONDS = 300 # 1接続の最大時間（EventSourceが自動で再接続する）
+
+# SSE・ロングポーリングで同時に待機できる接続数。待機中はgthreadのスレッドを1本占有するため、
+# 他のAPIが使うスレッドを残すようワーカーのスレッド数（render.yamlでは8）の半分に抑える
+WAIT_SLOTS = int(os.environ.get('LOTO7_WAIT_SLOTS', 4))
+wait_slots = threading.BoundedSemaphore(WAIT_SLOTS)
+WAIT_SLOTS_RETRY_AFTER = 5   # 上限到達時にクライアントへ返す再試行の目安（秒）
+
+def format_sse(data, event=None):
+    """SSEメッセージを組み立て"""
+    message = f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+    return f"event: {event}\n{message}" if event else message
+
+@app.route('/api/task/<task_id>/events', methods=['GET'])
+def task_events_stream(task_id):
+    """タスクの進捗・完了をSSEで配信（ワーカーからのPub/Sub通知を中継）
+    
+    同時接続数が上限に達している場合は503を返し、ポーリング（/wait）への切り替えを促す"""
+    if not wait_slots.acquire(blocking=False):
+        response, status_code = create_error_response(
+            "進捗ストリームの同時接続数が上限に達しています。ポーリングで状態を確認してください", 503,
+            details={'poll_url': f'/api/task/{task_id}/wait'}
+        )
+        response.headers['Retry-After'] = str(WAIT_SLOTS_RETRY_AFTER)
+        return response, status_code
+    
+    if request.method == 'HEAD':
+        # 接続できるかの確認のみ（HEADでも本文を反復するサーバーがあるためストリームは作らない）
+        wait_slots.release()
+        return Response(mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+    def stream():
+        # 購読は反復開始後に作る（反復前に切断されても購読が残らない）
+        subscription = tasks.get_task_events().subscribe(task_id)
+        try:
+            # 購読開始後に現在の状態を送る（購読前の更新を取りこぼさない）
+            task_status = get_task_status(task_id)
+            yield format_sse(task_status)
+            if task_status['state'] in TERMINAL_STATES:
+                return
+            
+            started = time.time()
+            while time.time() - started < SSE_MAX_STREAM_SECONDS:
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                
+                if event is None:
+                    # 通知を取りこぼした場合に備えて結果バックエンドを確認
+                    task_status = get_task_status(task_id)
+                    if task_status['state'] in TERMINAL_STATES:
+                        yield format_sse(task_status)
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                
+                if event['state'] in TERMINAL_STATES:
+                    # 結果本体は結果バックエンドから取得
+                    yield format_sse(get_task_status(task_id))
+                    return
+                
+                yield format_sse({key: value for key, value in event.items() if key != 'task_id'})
+        finally:
+            subscription.close()
+    
+    try:
+        response = Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    except Exception:
+        wait_slots.release()
+        raise
+    # 反復の有無にかかわらず、サーバーが応答を閉じたときに枠を返す
+    response.call_on_close(wait_slots.release)
+    return response
+
+# 🔥 タスク状態のロングポーリングAPI
+LONG_POLL_DEFAULT_TIMEOUT = 25  # 秒
+LONG_POLL_MAX_TIMEOUT = 55      # プロキシの60秒タイムアウトより短くする
+LONG_POLL_RECHECK_SECONDS = 5   # 通知の取りこぼしに備えた結果バックエンドの再確認間隔
+
+def task_status_changed(task_status, since_state, since_progress):
+    """クライアントが最後に見た状態から変化したか"""
+    if task_status['state'] in TERMINAL_STATES:
+        return True
+    if since_state is not None and task_status['state'] != since_state:
+        return True
+    return since_progress is not None and task_status.get('progress', 0) != since_progress
+
+def wait_for_task_status(task_id, timeout, since_state=None, since_progress=None):
+    """状態・進捗が変わるかタイムアウトするまで待ってタスク状態を返す"""
+    deadline = time.time() + timeout
+    with tasks.get_task_events().subscribe(task_id) as subscription:
+        task_status = get_task_status(task_id)
+        if since_state is None and since_progress is None:
+            # 基準が無い場合は現在の状態からの変化を待つ
+            since_state, since_progress = task_status['state'], task_status.get('progress', 0)
+        elif task_status_changed(task_status, since_state, since_progress):
+            return task_status
+        
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return task_status
+            
+            event = subscription.get(timeout=min(remaining, LONG_POLL_RECHECK_SECONDS))
+            if event is None:
+                task_status = get_task_status(task_id)
+            elif event['state'] in TERMINAL_STATES:
+                return get_task_status(task_id)
+            else:
+                task_status = {key: value for key, value in event.items() if key != 'task_id'}
+            
+            if task_status_changed(task_status, since_state, since_progress):
+                return task_status
+
+@app.route('/api/task/<task_id>/wait', methods=['GET'])
+def wait_task_status_api(task_id):
+    """タスクの状態が変わるまで待機して返す（SSEを使えないクライアント向け）"""
+    try:
+        timeout = min(max(request.args.get('timeout', LONG_POLL_DEFAULT_TIMEOUT, type=float), 0), LONG_POLL_MAX_TIMEOUT)
+        since_state = request.args.get('since_state')
+        since_progress = request.args.get('since_progress', type=int)
+        
+        if not wait_slots.acquire(blocking=False):
+            # 待機中の接続が上限に達している場合は待たずに現在の状態を返す（通常のポーリングになる）
+            task_status = get_task_status(task_id)
+        else:
+            try:
+                task_status = wait_for_task_status(task_id, timeout, since_state, since_progress)
+            except Exception as e:
+                # Pub/Subが使えない場合は待機せず現在の状態を返す
+                logger.warning(f"タスク状態の待機に失敗（即時応答します）: {e}")
+                task_status = get_task_status(task_id)
+            finally:
+                wait_slots.release()
+        
+        return create_success_response(task_status, "タスク状態を取得しました")
+        
+    except Exception as e:
+        logger.error(f"タスク状態待機エラー: {e}")
+        return create_error_response(f"タスク状態の確認に失敗しました: {str(e)}", 500)
+
 # 🔥 タスクキャンセルAPI
 @app.route('/api/task/<task_id>/cancel', methods=['POST'])
 def cancel_task(task_id):
@@ -317,31 +713,16 @@ def get_status():
         except:
             pass
         
-        # ファイル状態
-        files_status = {}
-        if file_manager:
-            files_status = {
-                "model_exists": file_manager.model_exists(),
-                "history_exists": file_manager.history_exists(),
-                "data_cached": file_manager.data_cached()
-            }
+        # Celery状態（リクエストごとにinspectせずスナップショットを返す）
+        celery_status = celery_health.snapshot()
         
-        # Celery状態
-        celery_status = {}
-        try:
-            # アクティブなタスク数を確認
-            inspect = celery_app.control.inspect()
-            active_tasks = inspect.active()
-            if active_tasks:
-                total_active = sum(len(tasks) for tasks in active_tasks.values())
-                celery_status['active_tasks'] = total_active
-            else:
-                celery_status['active_tasks'] = 0
-                
-            celery_status['broker_connected'] = True
-        except:
-            celery_status['broker_connected'] = False
-            celery_status['active_tasks'] = 0
+        # ファイル状態（スナップショット取得前はローカルディスクのみ確認）
+        files_status = celery_health.collected('files')
+        if files_status is None:
+            files_status = file_manager.files_status(sync=False) if file_manager else {}
+        
+        # タスク別の待ち時間・実行時間（スナップショットと一緒に取得した値）
+        task_metrics = celery_health.collected('tasks', {})
         
         status = {
             "initialized": file_manager is not None,
@@ -349,6 +730,9 @@ def get_status():
             "files": files_status,
             "memory": memory_info,
             "celery": celery_status,
+            "cache": view_cache.stats(),
+            "requests": request_metrics.summary(),
+            "tasks": task_metrics,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -358,6 +742,28 @@ def get_status():
         logger.error(f"ステータス取得エラー: {e}")
         return create_error_response(f"ステータス取得中にエラーが発生しました: {str(e)}", 500)
 
+# 📈 メトリクスAPI（Prometheusテキスト形式）
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """リクエスト計測・タスク計測・プロセス情報をPrometheus形式で出力"""
+    lines = request_metrics.render()
+    try:
+        lines += tasks.get_task_metrics().render()
+    except Exception as e:
+        logger.warning(f"タスク計測の取得に失敗: {e}")
+    try:
+        process = psutil.Process(os.getpid())
+        lines += ['# HELP loto7_process_resident_memory_bytes 常駐メモリ（バイト）',
+                  '# TYPE loto7_process_resident_memory_bytes gauge',
+                  f'loto7_process_resident_memory_bytes {process.memory_info().rss}',
+                  '# HELP loto7_process_cpu_seconds_total CPU時間（秒）',
+                  '# TYPE loto7_process_cpu_seconds_total counter',
+                  f'loto7_process_cpu_seconds_total {sum(process.cpu_times()[:2]):.3f}']
+    except Exception as e:
+        logger.warning(f"プロセス情報の取得に失敗: {e}")
+    
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 # 📊 簡単なデータ取得API（同期処理可能）
 @app.route('/api/recent_results', methods=['GET'])
 def get_recent_results():
@@ -370,46 +776,18 @@ def get_recent_results():
         if not file_manager.data_cached():
             return create_error_response("データがキャッシュされていません。初期化を実行してください", 404)
         
-        # キャッシュからデータを読み込み（軽量処理）
-        cached_data = file_manager.load_data_cache()
+        # キャッシュからデータを読み込み（ファイル未更新ならメモリから）
+        entry = get_data_view()
+        cached_data = entry['value']
         if cached_data is None or len(cached_data) == 0:
             return create_error_response("キャッシュデータが無効です", 500)
         
         count = int(request.args.get('count', 5))
         count = min(max(count, 1), 20)  # 1-20の範囲に制限
         
-        # 最新のcount件を取得（軽量処理）
-        recent_data = cached_data.nlargest(count, '開催回')
-        
-        results = []
-        for _, row in recent_data.iterrows():
-            try:
-                round_num = int(row['開催回'])
-                main_numbers = []
-                
-                # メイン数字を取得
-                main_cols = ['第1数字', '第2数字', '第3数字', '第4数字', '第5数字', '第6数字', '第7数字']
-                for col in main_cols:
-                    if col in row.index and not pd.isna(row[col]):
-                        main_numbers.append(int(row[col]))
-                
-                if len(main_numbers) == 7:
-                    results.append({
-                        'round': round_num,
-                        'date': row.get('日付', ''),
-                        'main_numbers': sorted(main_numbers),
-                        'bonus_numbers': []  # ボーナス数字は省略（軽量化）
-                    })
-            except:
-                continue
-        
-        response_data = {
-            'results': sorted(results, key=lambda x: x['round'], reverse=True),
-            'count': len(results),
-            'latest_round': int(cached_data['開催回'].max()) if len(cached_data) > 0 else 0
-        }
+        response_data = recent_results_response(entry, count)
         
-        return create_success_response(response_data, f"最近{len(results)}回の結果を取得しました")
+        return create_success_response(response_data, f"最近{response_data['count']}回の結果を取得しました")
         
     except Exception as e:
         logger.error(f"最近の結果取得エラー: {e}")
@@ -436,20 +814,14 @@ def get_prediction_history():
                 'message': '予測履歴がまだありません'
             }, "予測履歴を取得しました（履歴なし）")
         
-        # 履歴読み込み（軽量処理）
+        # 履歴読み込み（ファイル未更新ならメモリから）
         try:
-            from models.prediction_history import RoundAwarePredictionHistory
-            history = RoundAwarePredictionHistory()
-            history.set_file_manager(file_manager)
+            entry = get_history_view()
             
-            if history.load_from_csv():
-                recent_predictions = history.get_recent_predictions(count)
+            if entry['value'] is not None:
+                response_data = recent_history_response(entry, count)
                 
-                return create_success_response({
-                    'predictions': recent_predictions,
-                    'total_count': len(history.predictions),
-                    'summary': history.get_prediction_summary()
-                }, f"最近の予測履歴{len(recent_predictions)}件を取得しました")
+                return create_success_response(response_data, f"最近の予測履歴{len(response_data['predictions'])}件を取得しました")
             else:
                 return create_error_response("予測履歴の読み込みに失敗しました", 500)
                 
@@ -469,14 +841,13 @@ def get_prediction_detail(round_number):
         if not file_manager:
             return create_error_response("システムが初期化されていません", 500)
         
-        from models.prediction_history import RoundAwarePredictionHistory
-        history = RoundAwarePredictionHistory()
-        history.set_file_manager(file_manager)
-        
-        if not history.load_from_csv():
+        entry = get_history_view()
+        if entry['value'] is None:
             return create_error_response("予測履歴の読み込みに失敗しました", 500)
         
-        detailed_analysis = history.get_detailed_analysis(round_number)
+        detailed_analysis = view_cache.recent_response(
+            entry, ('detail', round_number), lambda history: history.get_detailed_analysis(round_number), DETAIL_VIEW_LIMIT
+        )
         
         if not detailed_analysis:
             return create_error_response(f"第{round_number}回の予測が見つかりません", 404)
@@ -492,16 +863,13 @@ def get_prediction_detail(round_number):
 def predict_with_init():
     """予測開始（自動初期化付き）"""
     try:
-        # Celery接続確認
-        try:
-            # アクティブワーカーの確認
-            inspect = celery_app.control.inspect()
-            active = inspect.active()
-            if not active:
-                logger.warning("Celeryワーカーが検出されません")
-        except Exception as e:
-            logger.error(f"Celery接続エラー: {e}")
-            return create_error_response(f"非同期処理システムに接続できません: {str(e)}", 500)
+        # Celery接続確認（バックグラウンド取得済みのスナップショットで判定）
+        celery_status = celery_health.snapshot()
+        if celery_status['broker_connected'] is False:
+            logger.error(f"Celery接続エラー: {celery_status.get('error')}")
+            return create_error_response(f"非同期処理システムに接続できません: {celery_status.get('error', '')}", 500)
+        if celery_status['collected'] and celery_status['worker_count'] == 0:
+            logger.warning("Celeryワーカーが検出されません")
         
         # 初期化 + 予測タスクを開始
         task = tasks.predict_task.delay()
@@ -510,7 +878,7 @@ def predict_with_init():
             'task_id': task.id,
             'status': 'started',
             'message': '予測を開始しました（初期化込み）',
-            'estimated_time': '3-10分'
+            **estimate_task('tasks.predict_task')
         }, "予測タスクを開始しました")
         
     except Exception as e:
@@ -529,7 +897,7 @@ def init_light():
             'task_id': task.id,
             'status': 'started',
             'message': '初期化を開始しました',
-            'estimated_time': '2-5分'
+            **estimate_task('tasks.heavy_init_task')
         }, "初期化タスクを開始しました")
         
     except Exception as e:
@@ -540,6 +908,52 @@ def init_light():
 
 # 🔥 段階的学習API群
 
+# 学習段階の基本情報（estimated_time は履歴が無いときの目安）
+LEARNING_STAGES_INFO = {
+    'stage1_fixed_10': {
+        'id': 'stage1_fixed_10',
+        'name': '固定窓検証（10回分）',
+        'description': '直近10回での予測パターン分析',
+        'estimated_time': '3-5分',
+        'status': 'available'
+    },
+    'stage2_fixed_20': {
+        'id': 'stage2_fixed_20',
+        'name': '固定窓検証（20回分）',
+        'description': '中期20回での予測パターン分析',
+        'estimated_time': '5-8分',
+        'status': 'available'
+    },
+    'stage3_fixed_30': {
+        'id': 'stage3_fixed_30',
+        'name': '固定窓検証（30回分）',
+        'description': '長期30回での予測パターン分析',
+        'estimated_time': '8-12分',
+        'status': 'available'
+    },
+    'stage4_expanding': {
+        'id': 'stage4_expanding',
+        'name': '累積窓検証',
+        'description': '全履歴を活用した累積学習',
+        'estimated_time': '10-15分',
+        'status': 'available'
+    },
+    'stage5_ensemble': {
+        'id': 'stage5_ensemble',
+        'name': 'アンサンブル最適化',
+        'description': '全段階の結果を統合した最終調整',
+        'estimated_time': '2-3分',
+        'status': 'available'
+    }
+}
+
+def estimate_learning_stage(stage_id):
+    """学習段階のETA"""
+    return estimate_task(
+        'tasks.progressive_learning_stage_task', stage=stage_id,
+        default=parse_estimated_time(LEARNING_STAGES_INFO[stage_id]['estimated_time'])
+    )
+
 @app.route('/api/learning/progress', methods=['GET'])
 def get_learning_progress():
     """学習進捗状況を取得"""
@@ -561,28 +975,58 @@ def execute_learning_stage(stage_id):
     """指定された学習段階を実行"""
     try:
         # 有効な段階IDチェック
-        valid_stages = [
-            'stage1_fixed_10', 'stage2_fixed_20', 'stage3_fixed_30', 
-            'stage4_expanding', 'stage5_ensemble'
-        ]
-        
-        if stage_id not in valid_stages:
+        if stage_id not in LEARNING_STAGES_INFO:
             return create_error_response(f"無効な学習段階ID: {stage_id}", 400)
         
+        request_data = request.get_json(silent=True) or {}
+        profile_mode = request_data.get('profile')
+        if profile_mode is not None and profile_mode not in CAPTURE_MODES:
+            return create_error_response(f"無効な計測モード: {profile_mode}（{' / '.join(CAPTURE_MODES)}）", 400)
+        
         # 非同期タスクを開始
-        task = tasks.progressive_learning_stage_task.delay(stage_id)
+        task = tasks.progressive_learning_stage_task.delay(stage_id, profile=profile_mode)
         
         return create_success_response({
             'task_id': task.id,
             'stage_id': stage_id,
             'status': 'started',
-            'message': f'学習段階 {stage_id} を開始しました'
+            'message': f'学習段階 {stage_id} を開始しました',
+            **estimate_learning_stage(stage_id)
         }, f"学習段階 {stage_id} のタスクを開始しました")
         
     except Exception as e:
         logger.error(f"学習段階実行APIエラー ({stage_id}): {e}")
         return create_error_response(f"学習段階 {stage_id} の開始に失敗しました: {str(e)}", 500)
 
+@app.route('/api/learning/run_all', methods=['POST'])
+def run_learning_pipeline():
+    """全学習段階を依存関係に従って一括実行"""
+    try:
+        request_data = request.get_json(silent=True) or {}
+        
+        fidelity = request_data.get('fidelity', 'full')
+        if fidelity not in ('full', 'screening', 'tiered'):
+            return create_error_response(f"無効な忠実度ティア: {fidelity}", 400)
+        
+        max_workers = request_data.get('max_workers', 1)
+        if not isinstance(max_workers, int) or isinstance(max_workers, bool) or not 1 <= max_workers <= 4:
+            return create_error_response("max_workers は1〜4の整数で指定してください", 400)
+        
+        # 非同期タスクを開始
+        task = tasks.progressive_learning_pipeline_task.delay(request_data)
+        
+        return create_success_response({
+            'task_id': task.id,
+            'status': 'started',
+            'message': '段階的学習パイプラインを開始しました',
+            **estimate_task('tasks.progressive_learning_pipeline_task'),
+            'options': request_data
+        }, "段階的学習パイプラインのタスクを開始しました")
+        
+    except Exception as e:
+        logger.error(f"学習パイプライン実行APIエラー: {e}")
+        return create_error_response(f"学習パイプラインの開始に失敗しました: {str(e)}", 500)
+
 @app.route('/api/learning/reset', methods=['POST'])
 def reset_learning_progress():
     """学習進捗をリセット"""
@@ -607,44 +1051,11 @@ def get_available_stages():
         if not file_manager:
             return create_error_response("システムが初期化されていません", 500)
         
-        # 基本的な段階情報を返す
-        stages_info = {
-            'stage1_fixed_10': {
-                'id': 'stage1_fixed_10',
-                'name': '固定窓検証（10回分）',
-                'description': '直近10回での予測パターン分析',
-                'estimated_time': '3-5分',
-                'status': 'available'
-            },
-            'stage2_fixed_20': {
-                'id': 'stage2_fixed_20',
-                'name': '固定窓検証（20回分）',
-                'description': '中期20回での予測パターン分析',
-                'estimated_time': '5-8分',
-                'status': 'available'
-            },
-            'stage3_fixed_30': {
-                'id': 'stage3_fixed_30',
-                'name': '固定窓検証（30回分）',
-                'description': '長期30回での予測パターン分析',
-                'estimated_time': '8-12分',
-                'status': 'available'
-            },
-            'stage4_expanding': {
-                'id': 'stage4_expanding',
-                'name': '累積窓検証',
-                'description': '全履歴を活用した累積学習',
-                'estimated_time': '10-15分',
-                'status': 'available'
-            },
-            'stage5_ensemble': {
-                'id': 'stage5_ensemble',
-                'name': 'アンサンブル最適化',
-                'description': '全段階の結果を統合した最終調整',
-                'estimated_time': '2-3分',
-                'status': 'available'
-            }
-        }
+        # 段階ごとのETAは過去の所要時間から算出（履歴が無ければ既定の目安）
+        stages_info = {}
+        for stage_id, info in LEARNING_STAGES_INFO.items():
+            estimate = estimate_learning_stage(stage_id)
+            stages_info[stage_id] = {**info, **estimate}
         
         return create_success_response({
             'stages': list(stages_info.values()),
@@ -668,17 +1079,54 @@ def download_file(filename):
         if not file_manager:
             return create_error_response("システムが初期化されていません", 500)
         
+        file_manager.sync_artifact(filename)
+        
+        # SQLiteバックエンドの場合は最新の履歴をCSVへ書き出してから配信
+        if filename == 'prediction_history.csv' and file_manager.get_history_store() is not None:
+            file_manager.export_history_csv()
+        
         file_path = file_manager.get_file_path(filename)
         
         if not os.path.exists(file_path):
             return create_error_response(f"ファイルが見つかりません: {filename}", 404)
         
-        return send_file(file_path, as_attachment=True, download_name=filename)
+        # ETag（SHA-256）付きで配信し、If-None-Match・Range（再開ダウンロード）に対応
+        checksum = file_manager.artifact_checksum(filename)
+        response = send_file(
+            file_path, as_attachment=True, download_name=filename,
+            conditional=True, etag=checksum, max_age=0
+        )
+        response.headers['X-Content-SHA256'] = checksum
+        response.headers['X-Artifact-Version'] = str(file_manager.artifact_version(filename))
+        return response
     
     except Exception as e:
         logger.error(f"ダウンロードエラー: {e}")
         return create_error_response(f"ダウンロード中にエラーが発生しました: {str(e)}", 500)
 
+@app.route('/api/profile/<filename>', methods=['GET'])
+def download_profile_report(filename):
+    """タスクの詳細計測レポートをダウンロード（.profはpstats・snakeviz等で読める）"""
+    try:
+        if os.path.basename(filename) != filename or not filename.endswith(('.prof', '.txt')):
+            return create_error_response(f"無効なレポート名: {filename}", 400)
+        
+        if not file_manager:
+            return create_error_response("システムが初期化されていません", 500)
+        
+        file_path = file_manager.load_profile_report(filename)
+        if file_path is None:
+            return create_error_response(f"計測レポートが見つかりません: {filename}", 404)
+        
+        return send_file(
+            file_path, as_attachment=True, download_name=filename,
+            mimetype='text/plain' if filename.endswith('.txt') else 'application/octet-stream'
+        )
+    
+    except Exception as e:
+        logger.error(f"計測レポートダウンロードエラー: {e}")
+        return create_error_response(f"計測レポートのダウンロード中にエラーが発生しました: {str(e)}", 500)
+
 @app.route('/api/upload/<filename>', methods=['POST'])
 def upload_file(filename):
     """ファイルアップロード"""
@@ -691,22 +1139,42 @@ def upload_file(filename):
         if not file_manager:
             return create_error_response("システムが初期化されていません", 500)
         
-        if 'file' not in request.files:
-            return create_error_response("ファイルが指定されていません", 400)
+        # 期待するSHA-256はヘッダーまたはフォーム項目で指定（任意）
+        expected_sha256 = request.headers.get('X-Content-SHA256')
         
-        file = request.files['file']
+        if request.mimetype == 'multipart/form-data':
+            # 互換用: multipart は request.files へのアクセス時に Werkzeug が全体を受信し
+            # （大きい場合は一時ファイルへ）バッファしてから渡すため、ストリーミングにはならない
+            if 'file' not in request.files:
+                return create_error_response("ファイルが指定されていません", 400)
+            
+            file = request.files['file']
+            
+            if file.filename == '':
+                return create_error_response("ファイル名が空です", 400)
+            
+            stream = file.stream
+            expected_sha256 = expected_sha256 or request.form.get('sha256')
+        else:
+            # application/octet-stream などの生データ（フロントエンドの既定）は
+            # request.stream から分割して読み、全体をメモリに載せない
+            stream = request.stream
         
-        if file.filename == '':
-            return create_error_response("ファイル名が空です", 400)
+        # 一時ファイルへ分割書き込み → チェックサム・構造検証 → 置き換え → 他プロセスへ通知
+        try:
+            installed = file_manager.install_artifact(
+                filename, stream,
+                expected_sha256=expected_sha256,
+                max_bytes=app.config['MAX_CONTENT_LENGTH']
+            )
+        except ArtifactValidationError as e:
+            return create_error_response(f"アップロードされたファイルが不正です: {str(e)}", 400)
         
-        # ファイル保存
-        file_path = file_manager.get_file_path(filename)
-        file.save(file_path)
+        # SQLiteバックエンドの場合はアップロードされた履歴CSVでストアを置き換え
+        if filename == 'prediction_history.csv' and file_manager.get_history_store() is not None:
+            file_manager.migrate_history_csv_to_sqlite()
         
-        return create_success_response({
-            "filename": filename,
-            "size": os.path.getsize(file_path)
-        }, f"{filename}をアップロードしました")
+        return create_success_response(installed, f"{filename}をアップロードしました")
     
     except Exception as e:
         logger.error(f"アップロードエラー: {e}")
@@ -779,9 +1247,6 @@ def file_too_large(error):
     return create_error_response("ファイルサイズが大きすぎます（最大16MB）", 413)
 
 # 定期的なメモリ最適化
-import threading
-import time
-
 def periodic_optimization():
     """定期的なメモリ最適化（5分ごと）"""
     while True:
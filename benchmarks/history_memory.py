@@ -0,0 +1,92 @@
+"""
+予測履歴メモリベンチマーク: 辞書+リスト表現とPredictionEntry（uint8配列）の比較
+
+使い方:
+    python -m benchmarks.history_memory --rounds 3000 --sets 20
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.prediction_entry import PredictionEntry
+
+def build_dict_entries(predictions, actuals, matches):
+    """従来の辞書+Pythonリスト表現"""
+    return [
+        {
+            'round': i + 1,
+            'date': '2024-01-01 00:00:00',
+            'predictions': predictions[i].tolist(),
+            'actual': actuals[i].tolist(),
+            'matches': matches[i].tolist(),
+            'verified': True
+        }
+        for i in range(len(predictions))
+    ]
+
+def build_compact_entries(predictions, actuals, matches):
+    """PredictionEntry表現"""
+    return [
+        PredictionEntry(i + 1, '2024-01-01 00:00:00', predictions[i].tolist(),
+                        actual=actuals[i].tolist(), matches=matches[i].tolist(), verified=True)
+        for i in range(len(predictions))
+    ]
+
+def measure(builder, *args):
+    """構築にかかったメモリ（保持分）と時間を計測"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    entries = builder(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return entries, {
+        'retained_mb': round(current / 1024 / 1024, 2),
+        'peak_mb': round(peak / 1024 / 1024, 2),
+        'build_seconds': round(elapsed, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='予測履歴エントリのメモリ比較ベンチマーク')
+    parser.add_argument('--rounds', type=int, default=3000, help='開催回数')
+    parser.add_argument('--sets', type=int, default=20, help='1回あたりの予測セット数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='結果JSONの出力先（省略時は標準出力）')
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    numbers = np.argsort(rng.random((args.rounds, args.sets + 1, 37)), axis=2)[:, :, :7] + 1
+    predictions = numbers[:, :args.sets]
+    actuals = numbers[:, args.sets]
+    matches = (predictions[:, :, :, None] == actuals[:, None, None, :]).any(axis=3).sum(axis=2)
+    
+    dict_entries, dict_stats = measure(build_dict_entries, predictions, actuals, matches)
+    compact_entries, compact_stats = measure(build_compact_entries, predictions, actuals, matches)
+    
+    # 表現が違っても参照結果は同じであることを確認
+    consistent = all(
+        compact['predictions'] == legacy['predictions'] and compact['matches'] == legacy['matches']
+        for compact, legacy in zip(compact_entries, dict_entries)
+    )
+    
+    result = {
+        'rounds': args.rounds,
+        'sets': args.sets,
+        'dict': dict_stats,
+        'compact': compact_stats,
+        'memory_ratio': round(compact_stats['retained_mb'] / dict_stats['retained_mb'], 3) if dict_stats['retained_mb'] else None,
+        'consistent': consistent
+    }
+    
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
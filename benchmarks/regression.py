@@ -0,0 +1,240 @@
+"""
+性能回帰ゲート: ベンチマークスイートを実行し、コミット済みのベースラインと比較
+
+経過時間は固定ワークロード（キャリブレーション）の所要時間で割って正規化し、マシン速度の差・揺らぎを
+打ち消してから許容率と比較する。ピークメモリはベースラインとの比較に加え、学習・予測・検証の
+シナリオがワーカーのメモリ上限（既定400MB）を超えていないかを確認する。
+回帰・上限超過・実行失敗があれば終了コード1で終了する
+
+使い方:
+    python -m benchmarks.regression                      # benchmarks/baseline.json と比較
+    python -m benchmarks.regression --tolerance 0.3 --output report.json
+    python -m benchmarks.regression --current bench.json # 計測済みの結果を比較のみ（キャリブレーションが無ければ正規化しない）
+    python -m benchmarks.regression --update-baseline    # ベースラインを今回の結果で更新
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from benchmarks.suite import run_suite, select_scenarios, parse_rows, format_result, environment_info, MODEL_SETS
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# ベースラインが無い場合の計測条件（ゲートとして数分で終わる構成）
+DEFAULT_GATE_OPTIONS = {
+    'scenarios': [
+        'features.create_advanced_features',
+        'train.train_ensemble_models',
+        'predict.ensemble_predict',
+        'validation.create_validation_features',
+        'validation.train_validation_models',
+        'validation.expanding_window_validation_warm',
+        'file_io.save_model',
+        'file_io.load_model',
+        'file_io.save_data_cache',
+        'file_io.load_data_cache',
+        'file_io.save_history',
+        'file_io.load_history',
+        'history.auto_verify_with_data',
+    ],
+    'rows': [200],
+    'repeat': 3,
+    'models': 'screening',
+    'fidelity': 'screening',
+    'seed': 42
+}
+
+DEFAULT_TOLERANCE = 0.25         # 正規化した経過時間の許容増加率
+DEFAULT_MEMORY_TOLERANCE = 0.15  # ピークRSSの許容増加率
+DEFAULT_MIN_DELTA_S = 0.05       # これ未満の時間差は揺らぎとして扱う
+DEFAULT_MEMORY_CEILING_MB = 400  # ワーカーのメモリ上限
+CEILING_GROUPS = ('train', 'predict', 'validation')
+
+# === キャリブレーション ===
+
+def _calibration_workload():
+    """純Python（ループ・ソート）とnumpy（行列演算）を混ぜた固定ワークロード"""
+    total = 0
+    for i in range(600000):
+        total += i * i % 7
+    sorted(range(300000), key=lambda value: -value)
+    matrix = np.random.default_rng(0).random((300, 300))
+    np.linalg.inv(matrix @ matrix.T + np.eye(300))
+    return total
+
+def calibrate(rounds=7):
+    """固定ワークロードの所要時間（秒、中央値）。経過時間の正規化に使う"""
+    _calibration_workload()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _calibration_workload()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+# === 比較 ===
+
+def _key(result):
+    return result['scenario'], result['rows']
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE, memory_tolerance=DEFAULT_MEMORY_TOLERANCE,
+            min_delta_s=DEFAULT_MIN_DELTA_S, memory_ceiling_mb=DEFAULT_MEMORY_CEILING_MB,
+            ceiling_groups=CEILING_GROUPS):
+    """シナリオごとに経過時間・ピークRSSをベースラインと比較
+
+    Returns:
+        dict: {'passed': bool, 'time_scale': float, 'scenarios': [...]}
+              time_scale は今回のマシンがベースラインの何倍遅いか（キャリブレーション比）
+    """
+    base_calibration = baseline.get('environment', {}).get('calibration_s')
+    current_calibration = current.get('environment', {}).get('calibration_s')
+    time_scale = current_calibration / base_calibration if base_calibration and current_calibration else 1.0
+
+    base_results = {_key(result): result for result in baseline.get('results', [])}
+    current_results = {_key(result): result for result in current.get('results', [])}
+
+    scenarios = []
+    for key in list(base_results) + [key for key in current_results if key not in base_results]:
+        base, now = base_results.get(key), current_results.get(key)
+        entry = {'scenario': key[0], 'rows': key[1], 'problems': []}
+
+        if now is None:
+            entry['status'] = 'missing'
+            entry['problems'].append('今回の結果にありません')
+        elif now['status'] != 'ok':
+            entry['status'] = now['status']
+            entry['problems'].append(now.get('error') or now.get('reason') or now['status'])
+        elif base is None or base['status'] != 'ok':
+            entry['status'] = 'new'
+        else:
+            # ベースラインの時間を今回のマシン速度に換算して比較
+            expected = base['wall_s'] * time_scale
+            ratio = now['wall_s'] / expected if expected > 0 else 1.0
+            entry.update({
+                'wall_s': now['wall_s'], 'baseline_wall_s': base['wall_s'],
+                'expected_wall_s': round(expected, 4), 'time_ratio': round(ratio, 3),
+                'peak_rss_mb': now['peak_rss_mb'], 'baseline_peak_rss_mb': base['peak_rss_mb'],
+                'max_rss_mb': now['max_rss_mb']
+            })
+            if ratio > 1 + tolerance and now['wall_s'] - expected > min_delta_s:
+                entry['problems'].append(f"経過時間 {ratio:.2f}倍（許容 {1 + tolerance:.2f}倍）")
+            if now['peak_rss_mb'] > base['peak_rss_mb'] * (1 + memory_tolerance):
+                entry['problems'].append(
+                    f"ピークRSS {base['peak_rss_mb']:.1f}MB → {now['peak_rss_mb']:.1f}MB（許容 +{memory_tolerance:.0%}）"
+                )
+            entry['status'] = 'regression' if entry['problems'] else ('improved' if ratio < 1 - tolerance else 'ok')
+
+        # メモリ上限はベースラインの有無によらず確認
+        group = (now or base)['group']
+        if now and now['status'] == 'ok' and group in ceiling_groups and now['max_rss_mb'] > memory_ceiling_mb:
+            entry['problems'].append(f"最大RSS {now['max_rss_mb']:.1f}MB が上限 {memory_ceiling_mb}MB を超えています")
+            entry['status'] = 'over_ceiling'
+
+        scenarios.append(entry)
+
+    failed = [entry for entry in scenarios if entry['problems']]
+    return {'passed': not failed, 'time_scale': round(time_scale, 3), 'scenarios': scenarios}
+
+def format_comparison(comparison):
+    """比較結果の表"""
+    lines = [f"キャリブレーション比（今回/ベースライン）: {comparison['time_scale']:.3f}",
+             f"{'scenario':<45} {'rows':>8} {'expected':>11} {'current':>9} {'ratio':>6} {'peak':>8} {'max':>8}  status"]
+    for entry in comparison['scenarios']:
+        if 'wall_s' in entry:
+            lines.append(
+                f"{entry['scenario']:<45} {entry['rows']:>8} {entry['expected_wall_s']:>10.3f}s {entry['wall_s']:>8.3f}s "
+                f"{entry['time_ratio']:>6.2f} {entry['peak_rss_mb']:>6.1f}MB {entry['max_rss_mb']:>6.1f}MB  {entry['status']}"
+            )
+        else:
+            lines.append(f"{entry['scenario']:<45} {entry['rows']:>8} {'-':>11} {'-':>9} {'-':>6} {'-':>8} {'-':>8}  {entry['status']}")
+        for problem in entry['problems']:
+            lines.append(f"    ! {problem}")
+    lines.append('合格' if comparison['passed'] else '不合格: 性能回帰またはメモリ上限超過があります')
+    return '\n'.join(lines)
+
+# === 実行 ===
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def run_benchmarks(options, timeout=None):
+    """キャリブレーション付きでスイートを実行（前後に測った小さい方を採用）"""
+    calibration_before = calibrate()
+    results = run_suite(options['scenarios'], options['rows'], options, timeout=timeout,
+                        log=lambda result: print(format_result(result), file=sys.stderr, flush=True))
+    calibration = min(calibration_before, calibrate())
+    return {
+        'environment': {**environment_info(), 'calibration_s': round(calibration, 5)},
+        'options': options,
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='ベースラインとの性能回帰チェック')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='ベースラインJSON')
+    parser.add_argument('--current', help='計測済みの結果JSON（省略時はスイートを実行）')
+    parser.add_argument('--update-baseline', action='store_true', help='今回の結果でベースラインを書き換える')
+    parser.add_argument('--output', help='比較結果JSONの出力先')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='経過時間の許容増加率（0.25で+25%%）')
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE, help='ピークRSSの許容増加率')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA_S, help='回帰とみなす最小の時間差（秒）')
+    parser.add_argument('--memory-ceiling', type=float, default=DEFAULT_MEMORY_CEILING_MB, help='最大RSSの上限（MB）')
+    parser.add_argument('--ceiling-groups', default=','.join(CEILING_GROUPS), help='メモリ上限を確認するグループ')
+    # 計測条件（省略時はベースラインと同じ条件）
+    parser.add_argument('--scenarios', help='シナリオ名またはグループ名（カンマ区切り）')
+    parser.add_argument('--rows', help='合成データの行数（カンマ区切り）')
+    parser.add_argument('--repeat', type=int)
+    parser.add_argument('--models', choices=MODEL_SETS)
+    parser.add_argument('--fidelity')
+    parser.add_argument('--timeout', type=float, default=3600, help='1シナリオあたりの制限時間（秒）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    baseline = load_json(args.baseline) if os.path.exists(args.baseline) else None
+    if baseline is None and not args.update_baseline:
+        print(f"ベースラインがありません: {args.baseline}（--update-baseline で作成）", file=sys.stderr)
+        sys.exit(2)
+
+    if args.current:
+        current = load_json(args.current)
+    else:
+        options = dict(baseline['options'] if baseline else DEFAULT_GATE_OPTIONS)
+        if args.scenarios:
+            options['scenarios'] = select_scenarios(args.scenarios)
+        if args.rows:
+            options['rows'] = parse_rows(args.rows)
+        for name in ('repeat', 'models', 'fidelity'):
+            if getattr(args, name) is not None:
+                options[name] = getattr(args, name)
+        current = run_benchmarks(options, timeout=args.timeout)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"ベースラインを更新しました: {args.baseline}")
+        return
+
+    comparison = compare(
+        baseline, current, tolerance=args.tolerance, memory_tolerance=args.memory_tolerance,
+        min_delta_s=args.min_delta, memory_ceiling_mb=args.memory_ceiling,
+        ceiling_groups=tuple(group.strip() for group in args.ceiling_groups.split(',') if group.strip())
+    )
+    print(format_comparison(comparison))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({**comparison, 'current': current}, f, indent=2, ensure_ascii=False)
+
+    sys.exit(0 if comparison['passed'] else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+"""
+ベンチマークスイート: 特徴量作成・学習・予測・時系列検証・ファイル入出力・履歴照合の計測
+
+合成データ（benchmarks.synthetic）を指定行数で作り、シナリオ×行数ごとに別プロセスで実行して
+経過時間・CPU時間・ピークRSSを計測する（ピークメモリに他のシナリオの分が混ざらないように）。
+結果はJSONで出力し、コミット間で比較できるようにする
+
+使い方:
+    python -m benchmarks.suite --rows 1000 --output bench.json
+    python -m benchmarks.suite --scenarios file_io,history --rows 1000,100000,1000000
+    python -m benchmarks.suite --scenarios train,predict --models screening
+    python -m benchmarks.suite --list
+
+学習を伴うシナリオは行数が増えると非常に重い（フルモデルの学習は1000行で数分）ため、
+シナリオごとの上限行数を超える組み合わせはスキップする（--no-row-limit で解除）
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import generate_draws, MAIN_COLUMNS, ROUND_COLUMN
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_SETS = ('full', 'screening')
+PREDICTION_SETS = 20
+
+# === シナリオの準備 ===
+# 準備関数は計測対象の処理を返す。繰り返しの前に毎回（計測外で）状態を戻す必要があれば (prepare, run) を返す
+
+def _check(result, label):
+    """処理が失敗を返した場合は例外にする（失敗を速いと誤認しないため）"""
+    if result is False or result is None or (isinstance(result, tuple) and result[0] is None):
+        raise RuntimeError(f"{label} が失敗を返しました")
+    return result
+
+def _file_manager(options):
+    from utils.file_manager import FileManager
+    return FileManager(base_dir=options['workdir'], history_backend='csv', artifact_backend='local')
+
+def _prediction_system(options):
+    """予測システム（--models screening なら検証用の軽量モデル構成で学習する）"""
+    from sklearn.base import clone
+    from models.prediction_system import AutoFetchEnsembleLoto7
+    from models.validation import TimeSeriesCrossValidator
+
+    system = AutoFetchEnsembleLoto7()
+    system.data_fetcher.main_columns = MAIN_COLUMNS
+    system.data_fetcher.round_column = ROUND_COLUMN
+    if options['models'] == 'screening':
+        system.models = {name: clone(model) for name, model in TimeSeriesCrossValidator().screening_models.items()}
+    return system
+
+def _trained_system(data, options):
+    """学習済みの予測システム（同じ行数・モデル構成の学習結果はシナリオ間で使い回す）"""
+    from utils.file_manager import FileManager
+
+    system = _prediction_system(options)
+    cache_dir = os.path.join(options['workdir'], f"trained_{len(data)}_{options['models']}_{options['seed']}")
+    cache = FileManager(base_dir=cache_dir, history_backend='csv', artifact_backend='local')
+    if cache.model_exists() and cache.load_model(system):
+        return system
+
+    _check(system.train_ensemble_models(data), 'train_ensemble_models')
+    cache.save_model(system)
+    return system
+
+def _history(rows, seed, verified=False):
+    """全開催回に20セットずつ予測を持つ予測履歴"""
+    from models.prediction_history import RoundAwarePredictionHistory
+    from utils.prediction_entry import PredictionEntry
+
+    rng = np.random.default_rng(seed)
+    history = RoundAwarePredictionHistory()
+    # 乱数配列が大きくならないよう分割して生成
+    for start in range(0, rows, 10000):
+        count = min(10000, rows - start)
+        numbers = np.argsort(rng.random((count, PREDICTION_SETS, 37)), axis=2)[:, :, :7] + 1
+        history.predictions += [
+            PredictionEntry(start + i + 1, '2024-01-01 00:00:00', numbers[i].tolist())
+            for i in range(count)
+        ]
+    if verified:
+        actual = list(range(1, 8))
+        for entry in history.predictions:
+            entry['actual'] = actual
+            entry['matches'] = [len(set(prediction) & set(actual)) for prediction in entry['predictions']]
+            entry['verified'] = True
+    return history
+
+def setup_create_advanced_features(data, options):
+    system = _prediction_system(options)
+    return lambda: _check(system.create_advanced_features(data, MAIN_COLUMNS), 'create_advanced_features')
+
+def setup_train_ensemble_models(data, options):
+    def run():
+        system = _prediction_system(options)
+        _check(system.train_ensemble_models(data), 'train_ensemble_models')
+    return run
+
+def setup_ensemble_predict(data, options):
+    system = _trained_system(data, options)
+    return lambda: _check(system.ensemble_predict(PREDICTION_SETS) or None, 'ensemble_predict')
+
+def _validator(options):
+    from models.validation import TimeSeriesCrossValidator
+    return TimeSeriesCrossValidator(fidelity=options['fidelity'])
+
+def setup_create_validation_features(data, options):
+    validator = _validator(options)
+    return lambda: _check(validator.create_validation_features(data, MAIN_COLUMNS), 'create_validation_features')
+
+def setup_train_validation_models(data, options):
+    validator = _validator(options)
+    features = validator.create_validation_features(data, MAIN_COLUMNS)
+    tier = 'full' if options['fidelity'] == 'full' else 'screening'
+    return lambda: _check(validator.train_validation_models(data, MAIN_COLUMNS, tier=tier, features=features),
+                          'train_validation_models')
+
+def setup_fixed_window_validation(data, options):
+    return lambda: _check(_validator(options).fixed_window_validation(data, MAIN_COLUMNS, ROUND_COLUMN),
+                          'fixed_window_validation')
+
+def setup_expanding_window_validation(data, options):
+    return lambda: _check(_validator(options).expanding_window_validation(data, MAIN_COLUMNS, ROUND_COLUMN, mode='exact'),
+                          'expanding_window_validation')
+
+def setup_expanding_window_validation_warm(data, options):
+    return lambda: _check(_validator(options).expanding_window_validation(data, MAIN_COLUMNS, ROUND_COLUMN, mode='warm_start'),
+                          'expanding_window_validation(warm_start)')
+
+def setup_save_model(data, options):
+    system = _trained_system(data, options)
+    file_manager = _file_manager(options)
+    return lambda: _check(file_manager.save_model(system), 'save_model')
+
+def setup_load_model(data, options):
+    file_manager = _file_manager(options)
+    file_manager.save_model(_trained_system(data, options))
+
+    def run():
+        # 読み込み済みモデルを外し、毎回ファイルから読む
+        file_manager._drop_loaded_model()
+        _check(file_manager.load_model(_prediction_system(options)), 'load_model')
+    return run
+
+def setup_save_data_cache(data, options):
+    file_manager = _file_manager(options)
+    return lambda: _check(file_manager.save_data_cache(data), 'save_data_cache')
+
+def setup_load_data_cache(data, options):
+    file_manager = _file_manager(options)
+    file_manager.save_data_cache(data)
+    return lambda: _check(file_manager.load_data_cache(), 'load_data_cache')
+
+def setup_save_history(data, options):
+    file_manager = _file_manager(options)
+    history = _history(len(data), options['seed'], verified=True)
+    return lambda: _check(file_manager.save_history(history), 'save_history')
+
+def setup_load_history(data, options):
+    from models.prediction_history import RoundAwarePredictionHistory
+
+    file_manager = _file_manager(options)
+    file_manager.save_history(_history(len(data), options['seed'], verified=True))
+    return lambda: _check(file_manager.load_history(RoundAwarePredictionHistory()), 'load_history')
+
+def setup_auto_verify(data, options):
+    state = {}
+
+    def prepare():
+        # 照合済みのエントリは再照合されないため、毎回未照合の履歴を作り直す（計測には含めない）
+        state['history'] = _history(len(data), options['seed'])
+
+    def run():
+        if state['history'].auto_verify_with_data(data, ROUND_COLUMN, MAIN_COLUMNS) != len(data):
+            raise RuntimeError("auto_verify_with_data の照合件数が行数と一致しません")
+    return prepare, run
+
+# シナリオ名 -> (グループ, 準備関数, 上限行数, 説明)
+SCENARIOS = {
+    'features.create_advanced_features': ('features', setup_create_advanced_features, None, '16次元特徴量の作成'),
+    'train.train_ensemble_models': ('train', setup_train_ensemble_models, 10000, 'アンサンブル学習（CV評価を含む）'),
+    'predict.ensemble_predict': ('predict', setup_ensemble_predict, 10000, '20セットのアンサンブル予測'),
+    'validation.create_validation_features': ('validation', setup_create_validation_features, None, '検証用特徴量の作成'),
+    'validation.train_validation_models': ('validation', setup_train_validation_models, 10000, '検証モデルの学習'),
+    'validation.fixed_window_validation': ('validation', setup_fixed_window_validation, 100000, '固定窓検証（10/20/30回）'),
+    'validation.expanding_window_validation': ('validation', setup_expanding_window_validation, 5000, '累積窓検証（exact）'),
+    'validation.expanding_window_validation_warm': ('validation', setup_expanding_window_validation_warm, 5000, '累積窓検証（warm_start）'),
+    'file_io.save_model': ('file_io', setup_save_model, 10000, 'model.pklの保存'),
+    'file_io.load_model': ('file_io', setup_load_model, 10000, 'model.pklの読み込み（キャッシュなし）'),
+    'file_io.save_data_cache': ('file_io', setup_save_data_cache, None, 'データキャッシュCSVの保存'),
+    'file_io.load_data_cache': ('file_io', setup_load_data_cache, None, 'データキャッシュCSVの読み込み'),
+    'file_io.save_history': ('file_io', setup_save_history, 100000, '予測履歴CSVの保存'),
+    'file_io.load_history': ('file_io', setup_load_history, 100000, '予測履歴CSVの読み込み'),
+    'history.auto_verify_with_data': ('history', setup_auto_verify, 100000, '予測履歴と抽選結果の自動照合'),
+}
+
+def select_scenarios(spec):
+    """カンマ区切りのシナリオ名・グループ名（train, file_io 等）から対象シナリオを選ぶ"""
+    if not spec or spec == 'all':
+        return list(SCENARIOS)
+    selected = []
+    for token in (t.strip() for t in spec.split(',') if t.strip()):
+        matches = [name for name, (group, *_) in SCENARIOS.items() if token in (name, group)]
+        if not matches:
+            raise ValueError(f"不明なシナリオ: {token}")
+        selected += [name for name in matches if name not in selected]
+    return selected
+
+def parse_rows(spec):
+    """'1000,10k,1m' 形式の行数指定"""
+    rows = []
+    for token in (t.strip().lower() for t in str(spec).split(',') if t.strip()):
+        scale = {'k': 1000, 'm': 1000000}.get(token[-1], 1)
+        rows.append(int(float(token.rstrip('km')) * scale))
+    return rows
+
+# === 計測（子プロセス側） ===
+
+def _rss_mb(value):
+    return round(value / 1024 / 1024, 1)
+
+def measure(prepare, run, repeat):
+    """処理をrepeat回実行し、経過時間・CPU時間・実行中のピークRSSを計測"""
+    from utils.task_metrics import RssSampler
+
+    walls, cpus = [], []
+    rss_before, peak = None, 0
+    for _ in range(repeat):
+        if prepare:
+            prepare()
+        gc.collect()
+        # 準備分を除くため、ピークは計測対象の処理の間だけサンプリングする
+        sampler = RssSampler(interval=0.01).start()
+        if rss_before is None:
+            rss_before = sampler.peak
+        wall, cpu = time.perf_counter(), time.process_time()
+        run()
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+        peak = max(peak, sampler.stop())
+
+    return {
+        'repeat': repeat,
+        'wall_s': round(float(np.median(walls)), 4),
+        'wall_min_s': round(min(walls), 4),
+        'cpu_s': round(float(np.median(cpus)), 4),
+        'rss_before_mb': _rss_mb(rss_before),
+        'peak_rss_mb': _rss_mb(peak),
+        # 準備・インポートを含むプロセス全体の最大RSS（ワーカーのメモリ上限との比較用）
+        'max_rss_mb': _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+    }
+
+def run_one(name, rows, options):
+    """1シナリオ×1行数を現在のプロセスで計測"""
+    group, setup, _, _ = SCENARIOS[name]
+    data = generate_draws(rows, seed=options['seed'])
+
+    setup_start = time.perf_counter()
+    prepared = setup(data, options)
+    prepare, run = prepared if isinstance(prepared, tuple) else (None, prepared)
+    setup_seconds = time.perf_counter() - setup_start
+
+    result = measure(prepare, run, options['repeat'])
+    result['setup_s'] = round(setup_seconds, 3)
+    return result
+
+# === 実行（親プロセス側） ===
+
+def run_scenario(name, rows, options, timeout=None):
+    """1シナリオ×1行数を子プロセスで実行（ピークRSSを他シナリオと分けるため）"""
+    group, _, max_rows, _ = SCENARIOS[name]
+    record = {'scenario': name, 'group': group, 'rows': rows}
+    if max_rows is not None and rows > max_rows and not options.get('no_row_limit'):
+        return {**record, 'status': 'skipped', 'reason': f'上限行数 {max_rows} を超えています'}
+
+    command = [
+        sys.executable, '-m', 'benchmarks.suite', '--run-one', name,
+        '--rows', str(rows), '--repeat', str(options['repeat']), '--seed', str(options['seed']),
+        '--models', options['models'], '--fidelity', options['fidelity'], '--workdir', options['workdir']
+    ]
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {**record, 'status': 'timeout', 'elapsed_s': round(time.perf_counter() - started, 1)}
+
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {**record, 'status': 'error', 'error': (completed.stderr or completed.stdout).strip()[-2000:]}
+    return {**record, 'status': 'ok', **json.loads(lines[-1])}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def environment_info():
+    return {
+        'created_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def run_suite(scenarios, rows_list, options, timeout=None, log=None):
+    """シナリオ×行数をすべて実行して結果のリストを返す"""
+    workdir = options.get('workdir')
+    owns_workdir = workdir is None
+    if owns_workdir:
+        workdir = tempfile.mkdtemp(prefix='loto7-bench-')
+    options = {**options, 'workdir': workdir}
+
+    results = []
+    try:
+        for rows in rows_list:
+            for name in scenarios:
+                result = run_scenario(name, rows, options, timeout=timeout)
+                results.append(result)
+                if log:
+                    log(result)
+    finally:
+        if owns_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def format_result(result):
+    """進捗表示用の1行"""
+    head = f"{result['scenario']:<45} {result['rows']:>8}行"
+    if result['status'] != 'ok':
+        return f"{head}  {result['status']}: {result.get('reason') or result.get('error', '')[-200:]}"
+    return (f"{head}  {result['wall_s']:>9.3f}s  cpu {result['cpu_s']:>9.3f}s  "
+            f"peak {result['peak_rss_mb']:>7.1f}MB  max {result['max_rss_mb']:>7.1f}MB")
+
+def add_common_arguments(parser):
+    parser.add_argument('--scenarios', default='all', help='シナリオ名またはグループ名（カンマ区切り、既定: all）')
+    parser.add_argument('--rows', default='1000', help='合成データの行数（カンマ区切り、10k・1m表記可）')
+    parser.add_argument('--repeat', type=int, default=3, help='1シナリオあたりの繰り返し回数（中央値を採用）')
+    parser.add_argument('--models', default='full', choices=MODEL_SETS,
+                        help='学習に使うモデル構成（screening: 検証の軽量モデル、短時間の計測用）')
+    parser.add_argument('--fidelity', default='screening', help='時系列検証の忠実度ティア（full / screening / tiered）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=3600, help='1シナリオあたりの制限時間（秒）')
+    parser.add_argument('--no-row-limit', action='store_true', help='シナリオごとの上限行数を無視する')
+
+def main():
+    parser = argparse.ArgumentParser(description='ロト7予測システムのベンチマークスイート')
+    add_common_arguments(parser)
+    parser.add_argument('--output', help='結果JSONの出力先（省略時は標準出力）')
+    parser.add_argument('--list', action='store_true', help='シナリオ一覧を表示')
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    options = {
+        'repeat': max(args.repeat, 1), 'seed': args.seed, 'models': args.models,
+        'fidelity': args.fidelity, 'workdir': args.workdir, 'no_row_limit': args.no_row_limit
+    }
+
+    if args.list:
+        for name, (group, _, max_rows, description) in SCENARIOS.items():
+            print(f"{name:<45} {description}（上限 {max_rows or '-'}行）")
+        return
+
+    if args.run_one:
+        # 子プロセス: 計測結果を最終行にJSONで出力
+        print(json.dumps(run_one(args.run_one, int(args.rows), options)))
+        return
+
+    scenarios = select_scenarios(args.scenarios)
+    rows_list = parse_rows(args.rows)
+    results = run_suite(scenarios, rows_list, options, timeout=args.timeout,
+                        log=lambda result: print(format_result(result), file=sys.stderr, flush=True))
+
+    report = {
+        'environment': environment_info(),
+        'options': {'scenarios': scenarios, 'rows': rows_list, 'repeat': options['repeat'],
+                    'models': args.models, 'fidelity': args.fidelity, 'seed': args.seed},
+        'results': results
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
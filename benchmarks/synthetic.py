@@ -0,0 +1,36 @@
+"""
+合成ロト7抽選データ生成
+本番CSVと同じスキーマ（開催回, 日付, 第1数字〜第7数字, BONUS1/2）のデータを作成
+"""
+
+import numpy as np
+import pandas as pd
+
+MAIN_COLUMNS = ['第1数字', '第2数字', '第3数字', '第4数字', '第5数字', '第6数字', '第7数字']
+BONUS_COLUMNS = ['BONUS1', 'BONUS2']
+ROUND_COLUMN = '開催回'
+DATE_COLUMN = '日付'
+
+def generate_draws(rows, seed=42, start_date='2013-04-05'):
+    """指定行数の合成抽選データを生成（1〜37から重複なしで9個）"""
+    rng = np.random.default_rng(seed)
+    
+    # 行ごとに37個の乱数を並べ替え、上位9個を抽選番号とする
+    # （大きな行数でも乱数配列が膨らまないよう分割して生成。乱数列は一括生成と同じ）
+    numbers = np.concatenate([
+        np.argsort(rng.random((min(100000, rows - start), 37)), axis=1)[:, :9].astype(np.int64) + 1
+        for start in range(0, rows, 100000)
+    ]) if rows else np.empty((0, 9), dtype=np.int64)
+    
+    df = pd.DataFrame(numbers[:, :7], columns=MAIN_COLUMNS)
+    df[BONUS_COLUMNS[0]] = numbers[:, 7]
+    df[BONUS_COLUMNS[1]] = numbers[:, 8]
+    
+    # 週1回開催（行数が多くpandasの日付範囲を超える場合は間隔を詰める）
+    start = pd.Timestamp(start_date)
+    step = min(pd.Timedelta(days=7), (pd.Timestamp.max - start) / max(rows, 1))
+    dates = pd.date_range(start, periods=rows, freq=step.floor('s'))
+    df.insert(0, DATE_COLUMN, dates.strftime('%Y/%m/%d'))
+    df.insert(0, ROUND_COLUMN, np.arange(1, rows + 1))
+    
+    return df
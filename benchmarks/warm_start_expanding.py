@@ -0,0 +1,42 @@
+"""
+累積窓検証ベンチマーク: exact再学習とwarm_startの速度・精度比較
+
+使い方:
+    python -m benchmarks.warm_start_expanding --rows 120 --initial-size 30
+"""
+
+import argparse
+import json
+import logging
+
+from benchmarks.synthetic import generate_draws, MAIN_COLUMNS, ROUND_COLUMN
+from models.validation import TimeSeriesCrossValidator
+
+def main():
+    parser = argparse.ArgumentParser(description='累積窓 exact / warm_start 比較ベンチマーク')
+    parser.add_argument('--rows', type=int, default=120, help='合成データの行数')
+    parser.add_argument('--initial-size', type=int, default=30, help='累積窓の初期サイズ')
+    parser.add_argument('--fidelity', default='full', choices=TimeSeriesCrossValidator.FIDELITY_TIERS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='結果JSONの出力先（省略時は標準出力）')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    data = generate_draws(args.rows, seed=args.seed)
+    validator = TimeSeriesCrossValidator(fidelity=args.fidelity)
+    
+    result = validator.compare_expanding_modes(
+        data, MAIN_COLUMNS, ROUND_COLUMN,
+        initial_size=args.initial_size, seed=args.seed
+    )
+    result.update({'rows': args.rows, 'initial_size': args.initial_size, 'fidelity': args.fidelity})
+    
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -59,7 +59,10 @@ def make_celery(app_name=__name__):
             'tasks.train_model_task': {'queue': 'training'},
             'tasks.predict_task': {'queue': 'prediction'},
             'tasks.validation_task': {'queue': 'validation'},
+            'tasks.validation_chunk_task': {'queue': 'validation'},
+            'tasks.validation_reduce_task': {'queue': 'validation'},
             'tasks.progressive_learning_stage_task': {'queue': 'learning'},
+            'tasks.progressive_learning_pipeline_task': {'queue': 'learning'},
         },
         
         # タイムアウト設定
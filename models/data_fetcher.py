@@ -9,6 +9,8 @@ import traceback
 import logging
 from datetime import datetime
 
+from utils.profiling import profiled, span
+
 logger = logging.getLogger(__name__)
 
 class AutoDataFetcher:
@@ -31,6 +33,7 @@ class AutoDataFetcher:
         """ファイル管理器を設定"""
         self.cache_manager = file_manager
         
+    @profiled('fetch_latest_data')
     def fetch_latest_data(self):
         """最新のロト7データを自動取得"""
         try:
@@ -38,13 +41,15 @@ class AutoDataFetcher:
             logger.info(f"URL: {self.csv_url}")
             
             # CSVデータを取得
-            response = requests.get(self.csv_url, timeout=30)
-            response.raise_for_status()
+            with span('download'):
+                response = requests.get(self.csv_url, timeout=30)
+                response.raise_for_status()
             
             logger.info(f"データ取得成功: {len(response.content)} bytes")
             
             # CSVをパース（文字エンコーディングを考慮）
-            df = self._parse_csv_content(response.content)
+            with span('parse'):
+                df = self._parse_csv_content(response.content)
             
             if df is None:
                 logger.error("CSVパースに失敗しました")
@@ -5,19 +5,43 @@
 
 import numpy as np
 import logging
-from collections import Counter
+from collections import Counter, deque
 from datetime import datetime
 
+from models.prediction_history import match_entries_with_data
+
 logger = logging.getLogger(__name__)
 
 class AutoVerificationLearner:
-    """自動照合と継続的学習改善を行うクラス"""
+    """自動照合と継続的学習改善を行うクラス
+    
+    照合結果は全件保持せず、一定サイズの状態（減衰付きの見逃し回数、
+    高精度パターンの移動平均、一致数ヒストグラム、直近K件の詳細分析）に集約する
+    """
+    
+    STATE_VERSION = 2
+    RECENT_ANALYSES = 20      # 詳細分析を保持する件数
+    LEARNED_ROUNDS = 500      # 学習済みとして個別に保持する開催回の件数
+    MISS_DECAY = 0.9          # 1回照合するごとの見逃し回数の減衰率
+    MAX_NUMBER = 37
+    MAX_MATCHES = 7
     
     def __init__(self):
-        self.verification_results = []
+        self.verification_results = deque(maxlen=self.RECENT_ANALYSES)
         self.learning_history = []
         self.improvement_metrics = {}
         self.feature_weights = {}
+        self._reset_running_state()
+    
+    def _reset_running_state(self):
+        """集約済みの学習状態を初期化"""
+        self.miss_counts = np.zeros(self.MAX_NUMBER + 1)
+        self.pattern_means = {'sample_size': 0, 'avg_sum': 0.0, 'avg_odd_count': 0.0}
+        self.match_histogram = [0] * (self.MAX_MATCHES + 1)
+        self.verified_total = 0
+        # 学習済みの開催回（古いものは learned_floor 以下として畳み込む）
+        self.learned_rounds = set()
+        self.learned_floor = None
         
     def verify_and_learn(self, prediction_history, latest_data, main_cols, round_col):
         """予測履歴と実際の結果を照合し、学習を改善"""
@@ -26,34 +50,31 @@ class AutoVerificationLearner:
         verified_count = 0
         total_improvements = []
         
-        for entry in prediction_history.predictions:
-            if entry['verified']:
+        # 開催回で一括突き合わせ（エントリごとの全行走査をしない）
+        results = match_entries_with_data(prediction_history.predictions, latest_data, main_cols=main_cols, round_col=round_col)
+        for result in sorted(results, key=lambda r: r['entry']['round']):
+            entry = result['entry']
+            
+            # 学習済みの開催回は二重に集計しない（遅れて照合できた古い回は学習する）
+            if self._is_learned(entry['round']):
                 continue
-                
-            # 該当する開催回のデータを検索
-            matching_data = latest_data[latest_data[round_col] == entry['round']]
             
-            if len(matching_data) > 0:
-                actual_row = matching_data.iloc[0]
-                actual_numbers = []
-                for col in main_cols:
-                    if col in actual_row.index:
-                        actual_numbers.append(int(actual_row[col]))
-                
-                if len(actual_numbers) == 7:
-                    # 照合と分析
-                    verification_result = self._analyze_prediction(
-                        entry['predictions'], 
-                        actual_numbers,
-                        entry['round']
-                    )
-                    
-                    self.verification_results.append(verification_result)
-                    verified_count += 1
-                    
-                    # 学習改善
-                    improvements = self._improve_from_result(verification_result, actual_row, main_cols)
-                    total_improvements.extend(improvements)
+            # 照合と分析
+            verification_result = self._analyze_prediction(
+                entry['predictions'], 
+                result['actual'],
+                entry['round']
+            )
+            
+            self.verification_results.append(verification_result)
+            self._record_matches(result['matches'])
+            self._mark_learned(entry['round'])
+            verified_count += 1
+            
+            # 学習改善
+            actual_row = latest_data.iloc[result['position']]
+            improvements = self._improve_from_result(verification_result, actual_row, main_cols)
+            total_improvements.extend(improvements)
         
         if verified_count > 0:
             logger.info(f"{verified_count}件の予測を照合・分析")
@@ -61,6 +82,20 @@ class AutoVerificationLearner:
         
         return verified_count
     
+    def _is_learned(self, round_num):
+        """開催回が学習済みか"""
+        if self.learned_floor is not None and round_num <= self.learned_floor:
+            return True
+        return round_num in self.learned_rounds
+    
+    def _mark_learned(self, round_num):
+        """開催回を学習済みにし、保持件数を超えた古い回は learned_floor に畳み込む"""
+        self.learned_rounds.add(round_num)
+        if len(self.learned_rounds) > self.LEARNED_ROUNDS:
+            evicted = sorted(self.learned_rounds)[:len(self.learned_rounds) - self.LEARNED_ROUNDS]
+            self.learned_rounds.difference_update(evicted)
+            self.learned_floor = max(evicted[-1], self.learned_floor) if self.learned_floor is not None else evicted[-1]
+    
     def _analyze_prediction(self, predictions, actual, round_num):
         """予測結果の詳細分析"""
         analysis = {
@@ -134,63 +169,80 @@ class AutoVerificationLearner:
             improvement = {
                 'type': 'frequently_missed',
                 'numbers': missed_freq.most_common(5),
+                'missed_counts': dict(missed_freq),
                 'round': verification_result['round']
             }
             improvements.append(improvement)
         
         return improvements
     
+    def _record_matches(self, matches):
+        """一致数ヒストグラムに1回分を加算"""
+        for match_count in matches:
+            self.match_histogram[min(int(match_count), self.MAX_MATCHES)] += 1
+        self.verified_total += 1
+    
     def _aggregate_improvements(self, improvements):
-        """改善点を集約して学習戦略を更新"""
+        """改善点を集約状態に取り込み、学習戦略を更新"""
         logger.info("=== 学習改善点の集約 ===")
         
-        # 高精度パターンの集約
-        high_acc_patterns = [imp for imp in improvements if imp['type'] == 'high_accuracy_pattern']
-        if high_acc_patterns:
-            avg_sum = np.mean([p['patterns']['actual_sum'] for p in high_acc_patterns])
-            avg_odd = np.mean([p['patterns']['actual_odd_count'] for p in high_acc_patterns])
-            logger.info(f"高精度予測パターン: 平均合計 {avg_sum:.1f}, 平均奇数 {avg_odd:.1f}")
+        for imp in improvements:
+            if imp['type'] == 'high_accuracy_pattern':
+                # 高精度パターンの移動平均
+                means = self.pattern_means
+                means['sample_size'] += 1
+                n = means['sample_size']
+                means['avg_sum'] += (imp['patterns']['actual_sum'] - means['avg_sum']) / n
+                means['avg_odd_count'] += (imp['patterns']['actual_odd_count'] - means['avg_odd_count']) / n
             
-            self.improvement_metrics['high_accuracy_patterns'] = {
-                'avg_sum': avg_sum,
-                'avg_odd_count': avg_odd,
-                'sample_size': len(high_acc_patterns)
-            }
+            elif imp['type'] == 'frequently_missed':
+                # 見逃し回数は古い回ほど減衰させる
+                self.miss_counts *= self.MISS_DECAY
+                for num, count in imp.get('missed_counts', dict(imp['numbers'])).items():
+                    if 0 < int(num) <= self.MAX_NUMBER:
+                        self.miss_counts[int(num)] += count
         
-        # 頻繁に見逃す数字の集約
-        missed_patterns = [imp for imp in improvements if imp['type'] == 'frequently_missed']
-        if missed_patterns:
-            all_missed_nums = Counter()
-            for pattern in missed_patterns:
-                for num, count in pattern['numbers']:
-                    all_missed_nums[num] += count
-            
-            logger.info(f"頻繁に見逃す数字TOP5: {all_missed_nums.most_common(5)}")
-            self.improvement_metrics['frequently_missed'] = all_missed_nums.most_common(10)
+        self._refresh_improvement_metrics()
+    
+    def _refresh_improvement_metrics(self):
+        """集約状態から改善メトリクスを組み立て"""
+        self.improvement_metrics = {}
+        
+        means = self.pattern_means
+        if means['sample_size'] > 0:
+            logger.info(f"高精度予測パターン: 平均合計 {means['avg_sum']:.1f}, 平均奇数 {means['avg_odd_count']:.1f}")
+            self.improvement_metrics['high_accuracy_patterns'] = dict(means)
+        
+        if self.miss_counts.any():
+            top = np.argsort(-self.miss_counts, kind='stable')[:10]
+            frequently_missed = [
+                (int(num), round(float(self.miss_counts[num]), 2))
+                for num in top if self.miss_counts[num] > 0
+            ]
+            logger.info(f"頻繁に見逃す数字TOP5: {frequently_missed[:5]}")
+            self.improvement_metrics['frequently_missed'] = frequently_missed
     
     def generate_improvement_report(self):
-        """学習改善レポートを生成"""
-        if not self.verification_results:
+        """学習改善レポートを生成（集約状態から作るため照合件数に依存しない）"""
+        if self.verified_total == 0:
             return {
                 'status': 'no_data',
                 'message': 'まだ照合結果がありません'
             }
         
-        # 全体的な精度計算
-        all_matches = []
-        for result in self.verification_results:
-            for detail in result['match_details']:
-                all_matches.append(detail['matches'])
+        histogram = self.match_histogram
+        total_sets = sum(histogram)
         
         report = {
             'status': 'success',
-            'verified_predictions': len(self.verification_results),
-            'total_prediction_sets': len(all_matches),
+            'verified_predictions': self.verified_total,
+            'total_prediction_sets': total_sets,
             'performance': {
-                'avg_matches': np.mean(all_matches) if all_matches else 0,
-                'max_matches': max(all_matches) if all_matches else 0,
-                'match_distribution': dict(Counter(all_matches)) if all_matches else {}
+                'avg_matches': sum(k * n for k, n in enumerate(histogram)) / total_sets if total_sets else 0,
+                'max_matches': max((k for k, n in enumerate(histogram) if n > 0), default=0),
+                'match_distribution': {k: n for k, n in enumerate(histogram) if n > 0}
             },
+            'recent_analyses': len(self.verification_results),
             'improvements': {}
         }
         
@@ -212,6 +264,33 @@ class AutoVerificationLearner:
         
         return report
     
+    def get_state(self):
+        """モデルと一緒に保存する学習状態"""
+        return {
+            'version': self.STATE_VERSION,
+            'miss_counts': self.miss_counts.tolist(),
+            'pattern_means': dict(self.pattern_means),
+            'match_histogram': list(self.match_histogram),
+            'verified_total': self.verified_total,
+            'learned_rounds': sorted(self.learned_rounds),
+            'learned_floor': self.learned_floor,
+            'recent_analyses': list(self.verification_results),
+            'improvement_metrics': self.improvement_metrics
+        }
+    
+    def load_state(self, state):
+        """保存された学習状態を復元"""
+        self._reset_running_state()
+        self.miss_counts = np.asarray(state.get('miss_counts', self.miss_counts), dtype=float)
+        self.pattern_means.update(state.get('pattern_means', {}))
+        self.match_histogram = list(state.get('match_histogram', self.match_histogram))
+        self.verified_total = state.get('verified_total', 0)
+        self.learned_rounds = set(state.get('learned_rounds', []))
+        # version 1 は最終学習回のみを保持していたため、それ以下を学習済みとみなす
+        self.learned_floor = state.get('learned_floor', state.get('last_learned_round'))
+        self.verification_results = deque(state.get('recent_analyses', []), maxlen=self.RECENT_ANALYSES)
+        self.improvement_metrics = state.get('improvement_metrics', {})
+    
     def get_learning_adjustments(self):
         """学習調整パラメータを取得"""
         adjustments = {
@@ -234,16 +313,18 @@ class AutoVerificationLearner:
     
     def reset_learning_data(self):
         """学習データをリセット"""
-        self.verification_results = []
+        self.verification_results = deque(maxlen=self.RECENT_ANALYSES)
         self.learning_history = []
         self.improvement_metrics = {}
         self.feature_weights = {}
+        self._reset_running_state()
         logger.info("学習データをリセットしました")
     
     def get_learning_summary(self):
         """学習状況のサマリーを取得"""
         return {
-            'verification_count': len(self.verification_results),
+            'verification_count': self.verified_total,
+            'recent_analyses': len(self.verification_results),
             'has_improvements': bool(self.improvement_metrics),
             'improvement_types': list(self.improvement_metrics.keys()),
             'learning_history_count': len(self.learning_history)
@@ -7,20 +7,100 @@ import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime
-from collections import Counter
+
+from utils.prediction_entry import PredictionEntry
 
 logger = logging.getLogger(__name__)
 
+def _predictions_array(entry):
+    """エントリの予測番号を (セット数, 7) の配列で取得"""
+    if isinstance(entry, PredictionEntry):
+        return entry.predictions_array
+    return np.asarray(entry['predictions']).reshape(-1, 7)
+
+def match_entries_with_data(entries, latest_data, round_col, main_cols):
+    """未照合エントリと抽選データを開催回で突き合わせ、一致数をまとめて計算
+    
+    開催回→行の索引を1回だけ作り、当選番号を1つの配列として取り出して
+    全予測セットの一致数を1回のベクトル演算で求める。
+    
+    Returns:
+        list: [{'entry': dict, 'position': int, 'actual': list, 'matches': list}]
+              （positionはlatest_data内の行位置）
+    """
+    pending = [entry for entry in entries if not entry['verified']]
+    if not pending or latest_data is None or len(latest_data) == 0:
+        return []
+    
+    present_cols = [col for col in main_cols if col in latest_data.columns]
+    if len(present_cols) != 7 or round_col not in latest_data.columns:
+        return []
+    
+    # 開催回 -> 先頭行位置の索引（重複時は最初の行を採用）
+    rounds = latest_data[round_col].to_numpy()
+    first_rows = np.flatnonzero(~pd.Series(rounds).duplicated().to_numpy())
+    round_index = pd.Index(rounds[first_rows])
+    found = round_index.get_indexer([entry['round'] for entry in pending])
+    
+    # 当選番号を一括取得（欠損を含む行は照合対象外）
+    actual_block = latest_data[present_cols].to_numpy(dtype=float)
+    candidates = []
+    for entry, index_pos in zip(pending, found):
+        if index_pos < 0:
+            continue
+        position = int(first_rows[index_pos])
+        if np.isnan(actual_block[position]).any() or len(_predictions_array(entry)) == 0:
+            continue
+        candidates.append((entry, position))
+    
+    if not candidates:
+        return []
+    
+    positions = np.array([position for _, position in candidates])
+    actual = actual_block[positions].astype(np.int64)
+    
+    # 全予測セットを1つの配列にまとめ、所属エントリとともに一致数を計算
+    set_counts = [len(_predictions_array(entry)) for entry, _ in candidates]
+    pred_block = np.concatenate([_predictions_array(entry) for entry, _ in candidates]).astype(np.int64)
+    owner = np.repeat(np.arange(len(candidates)), set_counts)
+    
+    width = int(max(actual.max(), pred_block.max())) + 1
+    actual_mask = np.zeros((len(candidates), width), dtype=bool)
+    actual_mask[np.arange(len(candidates))[:, None], actual] = True
+    match_counts = actual_mask[owner[:, None], pred_block].sum(axis=1)
+    
+    offsets = np.concatenate(([0], np.cumsum(set_counts)))
+    return [
+        {
+            'entry': entry,
+            'position': position,
+            'actual': actual[i].tolist(),
+            'matches': match_counts[offsets[i]:offsets[i + 1]].tolist()
+        }
+        for i, (entry, position) in enumerate(candidates)
+    ]
+
 class RoundAwarePredictionHistory:
     """開催回対応予測履歴管理クラス"""
     
+    MAX_MATCHES = 7
+    
     def __init__(self):
-        self.predictions = []  # [{'round': int, 'date': str, 'predictions': list, 'actual': list or None}]
+        self.predictions = []  # [PredictionEntry]（entry['round'] などの辞書形式で参照可能）
         self.accuracy_stats = {}
         
+        # 精度統計の累積値（一致数ごとのセット数と照合済み開催回数）
+        self.match_histogram = [0] * (self.MAX_MATCHES + 1)
+        self.verified_round_count = 0
+        
         # ファイル管理は外部から設定
         self.file_manager = None
         
+        # 開催回 -> エントリの索引（predictionsの差し替え・増減を検知して再構築）
+        self._round_index = {}
+        self._indexed_list = None
+        self._indexed_count = 0
+        
     def set_file_manager(self, file_manager):
         """ファイル管理器を設定"""
         self.file_manager = file_manager
@@ -36,102 +116,118 @@ class RoundAwarePredictionHistory:
             logger.warning(f"第{target_round}回の予測は既に存在します")
             return False
         
-        entry = {
-            'round': target_round,
-            'date': date,
-            'predictions': predictions.copy(),
-            'actual': None,
-            'matches': [],
-            'verified': False
-        }
+        entry = PredictionEntry(target_round, date, predictions)
         self.predictions.append(entry)
+        self._round_index[target_round] = entry
+        self._indexed_count = len(self.predictions)
         logger.info(f"予測記録: 第{target_round}回 - {date} - {len(predictions)}セット")
         
-        # ファイルに保存
-        if self.file_manager:
+        # ファイルに保存（SQLiteストアは1件のみ追加）
+        store = self._get_store()
+        if store is not None:
+            store.insert_prediction(entry)
+        elif self.file_manager:
             self.save_to_csv()
         
         return True
+    
+    def _get_store(self):
+        """SQLite履歴ストアを取得（未設定・CSVバックエンドの場合はNone）"""
+        if self.file_manager and hasattr(self.file_manager, 'get_history_store'):
+            return self.file_manager.get_history_store()
+        return None
+    
+    def _ensure_round_index(self):
+        """開催回索引を必要に応じて再構築"""
+        if self._indexed_list is not self.predictions or self._indexed_count != len(self.predictions):
+            self._round_index = {}
+            for entry in self.predictions:
+                self._round_index.setdefault(entry['round'], entry)
+            self._indexed_list = self.predictions
+            self._indexed_count = len(self.predictions)
         
     def find_prediction_by_round(self, round_number):
         """指定開催回の予測を検索"""
-        for entry in self.predictions:
-            if entry['round'] == round_number:
-                return entry
-        return None
+        self._ensure_round_index()
+        return self._round_index.get(round_number)
     
     def auto_verify_with_data(self, latest_data, round_col, main_cols):
         """最新データと自動照合"""
         verified_count = 0
+        verified_entries = []
         
-        for entry in self.predictions:
-            if entry['verified']:
-                continue
-                
-            # 該当する開催回のデータを検索
-            matching_data = latest_data[latest_data[round_col] == entry['round']]
+        for result in match_entries_with_data(self.predictions, latest_data, round_col, main_cols):
+            entry = result['entry']
+            entry['actual'] = result['actual']
+            entry['matches'] = result['matches']
+            entry['verified'] = True
+            verified_count += 1
+            verified_entries.append(entry)
+            self._apply_accuracy_delta(entry, 1)
             
-            if len(matching_data) > 0:
-                actual_row = matching_data.iloc[0]
-                actual_numbers = []
-                for col in main_cols:
-                    if col in actual_row.index and pd.notna(actual_row[col]):
-                        actual_numbers.append(int(actual_row[col]))
-                
-                if len(actual_numbers) == 7:
-                    entry['actual'] = actual_numbers
-                    
-                    # 各予測セットとの一致数を計算
-                    matches = []
-                    for pred_set in entry['predictions']:
-                        match_count = len(set(pred_set) & set(actual_numbers))
-                        matches.append(match_count)
-                    
-                    entry['matches'] = matches
-                    entry['verified'] = True
-                    verified_count += 1
-                    
-                    logger.info(f"自動照合完了: 第{entry['round']}回")
-                    logger.info(f"   当選番号: {actual_numbers}")
-                    logger.info(f"   一致数: {matches}")
-                    logger.info(f"   最高一致: {max(matches)}個")
+            logger.info(f"自動照合完了: 第{entry['round']}回")
+            logger.info(f"   当選番号: {entry['actual']}")
+            logger.info(f"   一致数: {entry['matches']}")
+            logger.info(f"   最高一致: {max(entry['matches'])}個")
         
         if verified_count > 0:
-            self._update_accuracy_stats()
+            self._refresh_accuracy_stats()
             logger.info(f"{verified_count}件の予測を自動照合しました")
             
-            # ファイルに保存
-            if self.file_manager:
+            # ファイルに保存（SQLiteストアは照合した行のみ更新）
+            store = self._get_store()
+            if store is not None:
+                store.update_verifications(verified_entries)
+            elif self.file_manager:
                 self.save_to_csv()
         
         return verified_count
     
     def _update_accuracy_stats(self):
-        """精度統計を更新"""
-        all_matches = []
-        verified_predictions = [entry for entry in self.predictions if entry['verified']]
+        """精度統計を全照合済みエントリから再計算"""
+        self.match_histogram = [0] * (self.MAX_MATCHES + 1)
+        self.verified_round_count = 0
+        for entry in self.predictions:
+            if entry['verified']:
+                self._apply_accuracy_delta(entry, 1)
+        self._refresh_accuracy_stats()
+    
+    def _apply_accuracy_delta(self, entry, sign):
+        """照合済みエントリ1件分を累積値に加算（sign=-1で取り消し）"""
+        for match_count in entry['matches']:
+            self.match_histogram[min(int(match_count), self.MAX_MATCHES)] += sign
+        self.verified_round_count += sign
+    
+    def restore_accuracy_aggregates(self, histogram, verified_rounds):
+        """保存済みの累積値から精度統計を復元"""
+        self.match_histogram = [int(n) for n in histogram]
+        self.verified_round_count = int(verified_rounds)
+        self._refresh_accuracy_stats()
+    
+    def get_accuracy_aggregates(self):
+        """保存用の累積値を取得"""
+        return {
+            'histogram': list(self.match_histogram),
+            'verified_rounds': self.verified_round_count
+        }
+    
+    def _refresh_accuracy_stats(self):
+        """累積値から精度統計を組み立て（履歴の長さに依存しない）"""
+        histogram = self.match_histogram
+        total = sum(histogram)
         
-        for entry in verified_predictions:
-            all_matches.extend(entry['matches'])
+        if total <= 0:
+            self.accuracy_stats = {}
+            return
         
-        if all_matches:
-            self.accuracy_stats = {
-                'total_predictions': len(all_matches),
-                'verified_rounds': len(verified_predictions),
-                'avg_matches': np.mean(all_matches),
-                'max_matches': max(all_matches),
-                'match_distribution': dict(Counter(all_matches)),
-                'accuracy_by_match': {
-                    '0_matches': all_matches.count(0),
-                    '1_matches': all_matches.count(1),
-                    '2_matches': all_matches.count(2),
-                    '3_matches': all_matches.count(3),
-                    '4_matches': all_matches.count(4),
-                    '5_matches': all_matches.count(5),
-                    '6_matches': all_matches.count(6),
-                    '7_matches': all_matches.count(7)
-                }
-            }
+        self.accuracy_stats = {
+            'total_predictions': total,
+            'verified_rounds': self.verified_round_count,
+            'avg_matches': sum(k * n for k, n in enumerate(histogram)) / total,
+            'max_matches': max(k for k, n in enumerate(histogram) if n > 0),
+            'match_distribution': {k: n for k, n in enumerate(histogram) if n > 0},
+            'accuracy_by_match': {f'{k}_matches': n for k, n in enumerate(histogram)}
+        }
     
     def get_accuracy_report(self):
         """精度レポートを生成"""
@@ -207,7 +303,7 @@ class RoundAwarePredictionHistory:
             'pending_rounds': len(self.predictions) - verified_count,
             'latest_round': max(rounds) if rounds else None,
             'earliest_round': min(rounds) if rounds else None,
-            'prediction_counts': [len(entry['predictions']) for entry in self.predictions]
+            'prediction_counts': [len(_predictions_array(entry)) for entry in self.predictions]
         }
     
     def get_recent_predictions(self, count=5):
@@ -288,21 +384,23 @@ class RoundAwarePredictionHistory:
     
     def remove_prediction(self, round_number):
         """指定開催回の予測を削除"""
-        initial_count = len(self.predictions)
-        self.predictions = [entry for entry in self.predictions if entry['round'] != round_number]
+        removed_entries = [entry for entry in self.predictions if entry['round'] == round_number]
         
-        removed = initial_count - len(self.predictions)
-        if removed > 0:
+        if removed_entries:
+            self.predictions = [entry for entry in self.predictions if entry['round'] != round_number]
             logger.info(f"第{round_number}回の予測を削除しました")
             
-            # 統計を更新
-            if any(entry['verified'] for entry in self.predictions):
-                self._update_accuracy_stats()
-            else:
-                self.accuracy_stats = {}
+            # 統計を更新（削除分を差し引く）
+            for entry in removed_entries:
+                if entry['verified']:
+                    self._apply_accuracy_delta(entry, -1)
+            self._refresh_accuracy_stats()
             
-            # ファイルに保存
-            if self.file_manager:
+            # ファイルに保存（SQLiteストアは該当開催回のみ削除）
+            store = self._get_store()
+            if store is not None:
+                store.delete_prediction(round_number)
+            elif self.file_manager:
                 self.save_to_csv()
             
             return True
@@ -17,6 +17,7 @@ from .data_fetcher import AutoDataFetcher
 from .prediction_history import RoundAwarePredictionHistory
 from .learning import AutoVerificationLearner
 from .validation import TimeSeriesCrossValidator
+from utils.profiling import profiled, span
 
 logger = logging.getLogger(__name__)
 
@@ -81,13 +82,13 @@ class AutoFetchEnsembleLoto7:
         self.data_fetcher.set_cache_manager(file_manager)
         self.history.set_file_manager(file_manager)
         
-    def load_models(self):
-        """保存済みモデルと統計情報を読み込み"""
+    def load_models(self, fresh=False):
+        """保存済みモデルと統計情報を読み込み（再学習する場合は fresh=True）"""
         if not self.file_manager:
             logger.warning("ファイル管理器が設定されていません")
             return False
             
-        return self.file_manager.load_model(self)
+        return self.file_manager.load_model(self, fresh=fresh)
     
     def save_models(self):
         """学習済みモデルと統計情報を保存"""
@@ -97,6 +98,7 @@ class AutoFetchEnsembleLoto7:
             
         return self.file_manager.save_model(self)
     
+    @profiled('auto_setup_and_train')
     def auto_setup_and_train(self, force_full_train=False):
         """自動セットアップ・学習"""
         try:
@@ -111,7 +113,7 @@ class AutoFetchEnsembleLoto7:
             
             # 2. 保存済みモデルの確認
             if not force_full_train and self.file_manager and self.file_manager.model_exists():
-                if self.load_models():
+                if self.load_models(fresh=True):
                     logger.info("保存済みモデルを使用")
                     
                     # 差分学習が必要かチェック
@@ -129,11 +131,12 @@ class AutoFetchEnsembleLoto7:
             logger.info("新規学習を実行")
             
             # 3. 過去の予測と自動照合
-            verified_count = self.history.auto_verify_with_data(
-                training_data, 
-                self.data_fetcher.round_column,
-                self.data_fetcher.main_columns
-            )
+            with span('auto_verify'):
+                verified_count = self.history.auto_verify_with_data(
+                    training_data, 
+                    self.data_fetcher.round_column,
+                    self.data_fetcher.main_columns
+                )
             
             if verified_count > 0:
                 logger.info(f"{verified_count}件の過去予測を自動照合・学習に反映")
@@ -155,6 +158,7 @@ class AutoFetchEnsembleLoto7:
             logger.error(f"自動セットアップエラー: {e}")
             return False
     
+    @profiled('train_ensemble_models')
     def train_ensemble_models(self, data):
         """アンサンブルモデル学習（データフレーム対応）"""
         try:
@@ -184,10 +188,12 @@ class AutoFetchEnsembleLoto7:
                     self.scalers[name] = scaler
                     
                     # 学習
-                    model.fit(X_scaled, y)
+                    with span(f'fit.{name}'):
+                        model.fit(X_scaled, y)
                     
                     # クロスバリデーション評価
-                    cv_score = np.mean(cross_val_score(model, X_scaled, y, cv=3))
+                    with span(f'cross_val.{name}'):
+                        cv_score = np.mean(cross_val_score(model, X_scaled, y, cv=3))
                     
                     self.trained_models[name] = model
                     self.model_scores[name] = cv_score
@@ -205,6 +211,7 @@ class AutoFetchEnsembleLoto7:
             logger.error(f"アンサンブル学習エラー: {str(e)}")
             return False
     
+    @profiled('create_advanced_features')
     def create_advanced_features(self, data, main_cols):
         """高度な特徴量エンジニアリング"""
         try:
@@ -294,6 +301,7 @@ class AutoFetchEnsembleLoto7:
             logger.error(f"特徴量エンジニアリングエラー: {e}")
             return None, None
     
+    @profiled('predict_next_round')
     def predict_next_round(self, count=20, use_learning=True):
         """次回開催回の予測（学習改善オプション付き）"""
         try:
@@ -331,6 +339,7 @@ class AutoFetchEnsembleLoto7:
             logger.error(f"次回予測エラー: {e}")
             return [], {}
     
+    @profiled('ensemble_predict')
     def ensemble_predict(self, count=20):
         """アンサンブル予測実行"""
         try:
@@ -390,6 +399,7 @@ class AutoFetchEnsembleLoto7:
             logger.error(f"アンサンブル予測エラー: {str(e)}")
             return []
     
+    @profiled('ensemble_predict_with_learning')
     def ensemble_predict_with_learning(self, count=20):
         """学習改善を適用したアンサンブル予測"""
         try:
@@ -466,7 +476,7 @@ class AutoFetchEnsembleLoto7:
             logger.error(f"学習改善予測エラー: {str(e)}")
             return []
     
-    def run_timeseries_validation(self):
+    def run_timeseries_validation(self, fidelity='full', expanding_mode='exact'):
         """時系列検証実行（第2段階）"""
         try:
             logger.info("=== 時系列検証開始 ===")
@@ -477,14 +487,15 @@ class AutoFetchEnsembleLoto7:
                 return None
             
             # 時系列検証器初期化
-            if not self.validator:
-                self.validator = TimeSeriesCrossValidator(self)
+            if not self.validator or self.validator.fidelity != fidelity:
+                self.validator = TimeSeriesCrossValidator(fidelity=fidelity)
             
             # 検証実行
             results = self.validator.run_validation(
                 self.data_fetcher.latest_data,
                 self.data_fetcher.main_columns,
-                self.data_fetcher.round_column
+                self.data_fetcher.round_column,
+                expanding_mode=expanding_mode
             )
             
             logger.info("時系列検証完了")
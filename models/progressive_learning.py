@@ -7,6 +7,10 @@ import numpy as np
 import pandas as pd
 import logging
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from contextlib import nullcontext
 from datetime import datetime
 from collections import Counter
 import os
@@ -18,75 +22,243 @@ class ProgressiveLearningManager:
     
     def __init__(self, prediction_system):
         self.prediction_system = prediction_system
-        self.learning_state = {
-            'stages_completed': [],
-            'accumulated_insights': {},
-            'feature_weights': {},
-            'pattern_adjustments': {},
-            'validation_results': {},
-            'last_updated': None
-        }
+        self.learning_state = self._empty_learning_state()
+        
+        # ジャーナル管理
+        self._journal_seq = 0
+        self._journal_length = 0
+        self._pending_events = []
+        self._insight_stages = set()
+        self._progress_only = False
+        
+        # 並列実行時の学習状態更新用ロック
+        self._state_lock = threading.RLock()
         
-        # 学習段階の定義
+        # 学習段階の定義（depends_on: 前提となる段階）
         self.learning_stages = {
             'stage1_fixed_10': {
                 'name': '固定窓検証（10回分）',
                 'description': '直近10回での予測パターン分析',
                 'estimated_time': '3-5分',
                 'window_size': 10,
-                'type': 'fixed_window'
+                'type': 'fixed_window',
+                'depends_on': []
             },
             'stage2_fixed_20': {
                 'name': '固定窓検証（20回分）',
                 'description': '中期20回での予測パターン分析',
                 'estimated_time': '5-8分',
                 'window_size': 20,
-                'type': 'fixed_window'
+                'type': 'fixed_window',
+                'depends_on': ['stage1_fixed_10']
             },
             'stage3_fixed_30': {
                 'name': '固定窓検証（30回分）',
                 'description': '長期30回での予測パターン分析',
                 'estimated_time': '8-12分',
                 'window_size': 30,
-                'type': 'fixed_window'
+                'type': 'fixed_window',
+                'depends_on': ['stage2_fixed_20']
             },
             'stage4_expanding': {
                 'name': '累積窓検証',
                 'description': '全履歴を活用した累積学習',
                 'estimated_time': '10-15分',
-                'type': 'expanding_window'
+                'type': 'expanding_window',
+                'depends_on': ['stage1_fixed_10']
             },
             'stage5_ensemble': {
                 'name': 'アンサンブル最適化',
                 'description': '全段階の結果を統合した最終調整',
                 'estimated_time': '2-3分',
-                'type': 'ensemble_optimization'
+                'type': 'ensemble_optimization',
+                'depends_on': ['stage1_fixed_10', 'stage2_fixed_20', 'stage3_fixed_30', 'stage4_expanding']
             }
         }
     
+    # 学習状態ファイル
+    # learning_state.json: 進捗ヘッダー（軽量スナップショット）
+    # learning_state.data.json: 洞察・重みなどの本体スナップショット
+    # learning_state.journal.jsonl: 追記専用イベント（"ヘッダーJSON<TAB>ペイロードJSON" の1行1イベント）
+    STATE_FILE = 'learning_state.json'
+    STATE_DATA_FILE = 'learning_state.data.json'
+    JOURNAL_FILE = 'learning_state.journal.jsonl'
+    STATE_FORMAT = 2
+    COMPACT_EVERY = 10  # ジャーナルがこのイベント数を超えたらスナップショットに圧縮
+    
+    def _state_path(self, filename):
+        return self.prediction_system.file_manager.get_file_path(filename)
+    
+    def _record_event(self, event_type, stage_id=None, payload=None):
+        """ジャーナルに追記するイベントを記録（保存時に書き出し）"""
+        # 読み込み前のインスタンスが追記しても既存スナップショットより後になるよう時刻を下限とする
+        self._journal_seq = max(self._journal_seq + 1, time.time_ns())
+        header = {
+            'seq': self._journal_seq,
+            'type': event_type,
+            'stage_id': stage_id,
+            'ts': datetime.now().isoformat()
+        }
+        line = json.dumps(header, ensure_ascii=False) + '\t' + json.dumps(payload or {}, ensure_ascii=False)
+        self._pending_events.append(line)
+    
+    def _record_stage_event(self, stage_id):
+        """段階完了イベントを記録（その時点の洞察・重みを保存）"""
+        self._record_event('stage', stage_id, {
+            'insight': self.learning_state['accumulated_insights'].get(stage_id, {}),
+            'feature_weights': self.learning_state.get('feature_weights', {}),
+            'pattern_adjustments': self.learning_state.get('pattern_adjustments', {})
+        })
+    
+    def _apply_event_header(self, header):
+        """イベントヘッダーを進捗情報に反映"""
+        if header['type'] == 'reset':
+            self.learning_state['stages_completed'] = []
+            self._insight_stages = set()
+        elif header['type'] == 'stage':
+            if header['stage_id'] not in self.learning_state['stages_completed']:
+                self.learning_state['stages_completed'].append(header['stage_id'])
+            self._insight_stages.add(header['stage_id'])
+        self.learning_state['last_updated'] = header['ts']
+    
+    def _apply_event_payload(self, header, payload):
+        """イベント本体を洞察・重みなどのデータに反映（進捗情報は変更しない）"""
+        if header['type'] == 'reset':
+            for key in ('accumulated_insights', 'feature_weights', 'pattern_adjustments', 'validation_results'):
+                self.learning_state[key] = {}
+        elif header['type'] == 'stage':
+            self.learning_state['accumulated_insights'][header['stage_id']] = payload.get('insight', {})
+            self.learning_state['feature_weights'] = payload.get('feature_weights', {})
+            self.learning_state['pattern_adjustments'] = payload.get('pattern_adjustments', {})
+    
+    def _read_journal(self, after_seq, headers_only=False):
+        """ジャーナルのうち指定seqより後のイベントを読み込み"""
+        journal_path = self._state_path(self.JOURNAL_FILE)
+        events = []
+        
+        if not os.path.exists(journal_path):
+            return events
+        
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                header_part, _, payload_part = line.rstrip('\n').partition('\t')
+                try:
+                    header = json.loads(header_part)
+                    if header['seq'] <= after_seq:
+                        continue
+                    payload = None if headers_only else json.loads(payload_part)
+                except (ValueError, KeyError):
+                    # 書きかけの末尾行は無視
+                    logger.warning("学習状態ジャーナルの不正な行をスキップしました")
+                    break
+                events.append((header, payload))
+        
+        return events
+    
+    @staticmethod
+    def _empty_learning_state():
+        return {
+            'stages_completed': [],
+            'accumulated_insights': {},
+            'feature_weights': {},
+            'pattern_adjustments': {},
+            'validation_results': {},
+            'last_updated': None
+        }
+    
+    def _compact_learning_state(self):
+        """スナップショットを書き出してジャーナルを空にする"""
+        data_snapshot = {
+            'seq': self._journal_seq,
+            'accumulated_insights': self.learning_state.get('accumulated_insights', {}),
+            'feature_weights': self.learning_state.get('feature_weights', {}),
+            'pattern_adjustments': self.learning_state.get('pattern_adjustments', {}),
+            'validation_results': self.learning_state.get('validation_results', {})
+        }
+        header_snapshot = {
+            'format': self.STATE_FORMAT,
+            'seq': self._journal_seq,
+            'stages_completed': self.learning_state['stages_completed'],
+            'insight_stages': sorted(self.learning_state.get('accumulated_insights', {}).keys()),
+            'last_updated': self.learning_state.get('last_updated')
+        }
+        
+        # 本体 → ヘッダー → ジャーナルの順に更新。ヘッダー書き込み前に中断した場合は
+        # ヘッダーのseqが本体より古くなるが、ジャーナルはまだ残っているので読み込み時に
+        # 進捗はヘッダーのseq以降、データは本体のseq以降を再生して復元できる
+        file_manager = self.prediction_system.file_manager
+        file_manager.write_json(self._state_path(self.STATE_DATA_FILE), data_snapshot)
+        file_manager.write_json(self._state_path(self.STATE_FILE), header_snapshot)
+        open(self._state_path(self.JOURNAL_FILE), 'w', encoding='utf-8').close()
+        self._journal_length = 0
+    
     def save_learning_state(self):
-        """学習状態を保存"""
+        """学習状態を保存（イベントをジャーナルに追記し、一定数ごとに圧縮）"""
         try:
             if self.prediction_system.file_manager:
-                state_path = self.prediction_system.file_manager.get_file_path('learning_state.json')
-                self.learning_state['last_updated'] = datetime.now().isoformat()
+                if self._progress_only:
+                    logger.warning("進捗のみ読み込んだ状態では学習状態を保存できません")
+                    return
                 
-                with open(state_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.learning_state, f, indent=2, ensure_ascii=False)
+                if self._pending_events:
+                    with open(self._state_path(self.JOURNAL_FILE), 'a', encoding='utf-8') as f:
+                        f.write('\n'.join(self._pending_events) + '\n')
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._journal_length += len(self._pending_events)
+                    self._pending_events = []
+                
+                if self._journal_length >= self.COMPACT_EVERY or not os.path.exists(self._state_path(self.STATE_FILE)):
+                    self._compact_learning_state()
                 
                 logger.info("学習状態を保存しました")
         except Exception as e:
             logger.error(f"学習状態保存エラー: {e}")
     
     def load_learning_state(self):
-        """学習状態を読み込み"""
+        """学習状態を読み込み（スナップショット + ジャーナル末尾を再生）"""
         try:
             if self.prediction_system.file_manager:
-                state_path = self.prediction_system.file_manager.get_file_path('learning_state.json')
+                state_path = self._state_path(self.STATE_FILE)
                 
                 if os.path.exists(state_path):
                     with open(state_path, 'r', encoding='utf-8') as f:
-                        self.learning_state = json.load(f)
+                        header = json.load(f)
+                    
+                    self.learning_state = self._empty_learning_state()
+                    self._progress_only = False
+                    
+                    if header.get('format') != self.STATE_FORMAT:
+                        # 旧形式（全体を1ファイルに保存）は次回保存時に新形式へ移行
+                        self.learning_state.update(header)
+                        self._journal_seq = 0
+                        self._journal_length = self.COMPACT_EVERY
+                    else:
+                        data_path = self._state_path(self.STATE_DATA_FILE)
+                        with open(data_path, 'r', encoding='utf-8') as f:
+                            data_snapshot = json.load(f)
+                        
+                        header_seq, data_seq = header['seq'], data_snapshot['seq']
+                        self._journal_seq = max(header_seq, data_seq)
+                        self.learning_state.update({
+                            'stages_completed': header['stages_completed'],
+                            'last_updated': header['last_updated'],
+                            'accumulated_insights': data_snapshot['accumulated_insights'],
+                            'feature_weights': data_snapshot['feature_weights'],
+                            'pattern_adjustments': data_snapshot['pattern_adjustments'],
+                            'validation_results': data_snapshot['validation_results']
+                        })
+                        
+                        # 圧縮の途中で中断していると2つのseqがずれるため、それぞれの続きから再生
+                        events = self._read_journal(min(header_seq, data_seq))
+                        for event_header, payload in events:
+                            if event_header['seq'] > data_seq:
+                                self._apply_event_payload(event_header, payload)
+                            if event_header['seq'] > header_seq:
+                                self._apply_event_header(event_header)
+                            self._journal_seq = max(self._journal_seq, event_header['seq'])
+                        self._journal_length = len(events)
+                        self._insight_stages = set(self.learning_state['accumulated_insights'].keys())
                     
                     logger.info(f"学習状態を読み込みました: {len(self.learning_state['stages_completed'])}段階完了")
                     return True
@@ -95,6 +267,56 @@ class ProgressiveLearningManager:
         
         return False
     
+    def load_learning_progress(self):
+        """進捗情報のみ読み込み（洞察・検証結果の本体は読み込まない）"""
+        try:
+            if self.prediction_system.file_manager:
+                state_path = self._state_path(self.STATE_FILE)
+                
+                if os.path.exists(state_path):
+                    with open(state_path, 'r', encoding='utf-8') as f:
+                        header = json.load(f)
+                    
+                    if header.get('format') != self.STATE_FORMAT:
+                        # 旧形式は全体読み込みで対応
+                        return self.load_learning_state()
+                    
+                    self.learning_state = self._empty_learning_state()
+                    self.learning_state['stages_completed'] = header['stages_completed']
+                    self.learning_state['last_updated'] = header['last_updated']
+                    self._insight_stages = set(header.get('insight_stages', []))
+                    self._progress_only = True
+                    
+                    for event_header, _ in self._read_journal(header['seq'], headers_only=True):
+                        self._apply_event_header(event_header)
+                    
+                    return True
+        except Exception as e:
+            logger.error(f"学習進捗読み込みエラー: {e}")
+        
+        return False
+    
+    def get_stage_order(self):
+        """依存関係に従った段階の実行順（トポロジカル順）を取得"""
+        order = []
+        visiting = set()
+        
+        def visit(stage_id):
+            if stage_id in order:
+                return
+            if stage_id in visiting:
+                raise ValueError(f"学習段階の依存関係が循環しています: {stage_id}")
+            visiting.add(stage_id)
+            for dependency in self.learning_stages[stage_id]['depends_on']:
+                visit(dependency)
+            visiting.discard(stage_id)
+            order.append(stage_id)
+        
+        for stage_id in self.learning_stages:
+            visit(stage_id)
+        
+        return order
+    
     def get_available_stages(self):
         """実行可能な学習段階を取得"""
         completed = set(self.learning_state['stages_completed'])
@@ -104,13 +326,7 @@ class ProgressiveLearningManager:
             status = 'completed' if stage_id in completed else 'available'
             
             # 前提条件チェック
-            if stage_id == 'stage2_fixed_20' and 'stage1_fixed_10' not in completed:
-                status = 'locked'
-            elif stage_id == 'stage3_fixed_30' and 'stage2_fixed_20' not in completed:
-                status = 'locked'
-            elif stage_id == 'stage4_expanding' and 'stage1_fixed_10' not in completed:
-                status = 'locked'
-            elif stage_id == 'stage5_ensemble' and len(completed) < 3:
+            if not all(dependency in completed for dependency in stage_info['depends_on']):
                 status = 'locked'
             
             available.append({
@@ -118,6 +334,7 @@ class ProgressiveLearningManager:
                 'name': stage_info['name'],
                 'description': stage_info['description'],
                 'estimated_time': stage_info['estimated_time'],
+                'depends_on': stage_info['depends_on'],
                 'status': status
             })
         
@@ -136,41 +353,168 @@ class ProgressiveLearningManager:
             if not self.prediction_system.data_fetcher.fetch_latest_data():
                 raise Exception("データ取得に失敗しました")
             
-            data = self.prediction_system.data_fetcher.latest_data
-            main_cols = self.prediction_system.data_fetcher.main_columns
-            round_col = self.prediction_system.data_fetcher.round_column
+            result = self._run_stage(stage_id)
             
-            # 段階に応じた処理実行
-            if stage_info['type'] == 'fixed_window':
-                result = self._execute_fixed_window_stage(
-                    data, main_cols, round_col, 
-                    stage_info['window_size'], stage_id
-                )
-            elif stage_info['type'] == 'expanding_window':
-                result = self._execute_expanding_window_stage(
-                    data, main_cols, round_col, stage_id
-                )
-            elif stage_info['type'] == 'ensemble_optimization':
-                result = self._execute_ensemble_optimization_stage(stage_id)
+            logger.info(f"✅ {stage_info['name']} 完了")
+            return result
             
+        except Exception as e:
+            logger.error(f"❌ {stage_info['name']} エラー: {e}")
+            raise e
+    
+    def _run_stage(self, stage_id, validator=None):
+        """取得済みデータで学習段階を実行し、結果を学習状態に反映"""
+        stage_info = self.learning_stages[stage_id]
+        fetcher = self.prediction_system.data_fetcher
+        
+        data = fetcher.latest_data
+        main_cols = fetcher.main_columns
+        round_col = fetcher.round_column
+        
+        # 段階に応じた処理実行
+        if stage_info['type'] == 'fixed_window':
+            result = self._execute_fixed_window_stage(
+                data, main_cols, round_col, 
+                stage_info['window_size'], stage_id, validator
+            )
+        elif stage_info['type'] == 'expanding_window':
+            result = self._execute_expanding_window_stage(
+                data, main_cols, round_col, stage_id, validator
+            )
+        elif stage_info['type'] == 'ensemble_optimization':
+            result = self._execute_ensemble_optimization_stage(stage_id)
+        
+        with self._state_lock:
             # 結果を学習状態に蓄積
-            self._accumulate_learning_insights(stage_id, result)
+            self._accumulate_learning_insights(stage_id, result, fetcher.latest_round,
+                                               fidelity=getattr(validator, 'fidelity', 'full'))
             
             # 完了段階に追加
             if stage_id not in self.learning_state['stages_completed']:
                 self.learning_state['stages_completed'].append(stage_id)
+            self.learning_state['last_updated'] = datetime.now().isoformat()
+            self._record_stage_event(stage_id)
             
             # 学習状態保存
             self.save_learning_state()
+        
+        return result
+    
+    def _is_stage_current(self, stage_id, data_round, fidelity='full'):
+        """完了済みかつ同じデータ（最新開催回）・同等以上の忠実度で実行された段階か判定"""
+        if stage_id not in self.learning_state['stages_completed']:
+            return False
+        insight = self.learning_state['accumulated_insights'].get(stage_id, {})
+        # フル検証の結果はどの忠実度の要求も満たす
+        return insight.get('data_round') == data_round and insight.get('fidelity', 'full') in ('full', fidelity)
+    
+    def run_pipeline(self, stage_ids=None, force=False, max_workers=1, progress_callback=None, fidelity='full'):
+        """依存関係に従って全段階を実行（データ・モデルは全段階で共有）
+
+        max_workers=1（既定）では呼び出し元スレッドで順に実行する。2以上で独立した段階を並列実行するが、
+        段階ごとに検証用モデルを持つためメモリが段階数に比例して増え、スレッド単位の計測
+        （スパン・cProfile）には段階の処理が含まれなくなる。
+        fidelity は各段階の検証器の忠実度ティア（full / screening / tiered）
+        """
+        from models.validation import TimeSeriesCrossValidator
+        if fidelity not in TimeSeriesCrossValidator.FIDELITY_TIERS:
+            raise ValueError(f"無効な忠実度ティア: {fidelity}")
+        
+        order = self.get_stage_order()
+        targets = [stage_id for stage_id in order if stage_ids is None or stage_id in stage_ids]
+        
+        pipeline_start = time.perf_counter()
+        
+        # データ取得は1回のみ（全段階で共有）
+        fetcher = self.prediction_system.data_fetcher
+        if not fetcher.fetch_latest_data():
+            raise Exception("データ取得に失敗しました")
+        data_round = fetcher.latest_round
+        
+        stage_reports = {}
+        done = set()
+        
+        # 完了済みで同じデータに対して有効な段階はスキップ
+        for stage_id in targets:
+            if not force and self._is_stage_current(stage_id, data_round, fidelity):
+                stage_reports[stage_id] = {'status': 'skipped', 'seconds': 0.0}
+                done.add(stage_id)
+        
+        pending = [stage_id for stage_id in targets if stage_id not in done]
+        total = len(targets)
+        
+        def dependencies_met(stage_id):
+            for dependency in self.learning_stages[stage_id]['depends_on']:
+                if dependency in targets:
+                    if dependency not in done:
+                        return False
+                elif dependency not in self.learning_state['stages_completed']:
+                    return False
+            return True
+        
+        def timed_run(stage_id):
+            start = time.perf_counter()
+            # 並列実行中の段階同士で検証結果が混ざらないよう、段階ごとに検証器を用意
+            result = self._run_stage(stage_id, validator=TimeSeriesCrossValidator(fidelity=fidelity))
+            return result, time.perf_counter() - start
+        
+        def run_inline(stage_id):
+            future = Future()
+            try:
+                future.set_result(timed_run(stage_id))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        logger.info(f"=== 段階的学習パイプライン開始: {len(pending)}段階実行 / {len(done)}段階スキップ"
+                    f"（並列数 {max_workers}, 忠実度 {fidelity}）===")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else nullcontext() as executor:
+            running = {}
             
-            logger.info(f"✅ {stage_info['name']} 完了")
-            return result
-            
-        except Exception as e:
-            logger.error(f"❌ {stage_info['name']} エラー: {e}")
-            raise e
+            while pending or running:
+                for stage_id in [s for s in pending if dependencies_met(s)]:
+                    pending.remove(stage_id)
+                    logger.info(f"段階開始: {stage_id}")
+                    future = executor.submit(timed_run, stage_id) if executor else run_inline(stage_id)
+                    running[future] = stage_id
+                
+                if not running:
+                    # 前提段階が失敗した段階は実行不可
+                    for stage_id in pending:
+                        stage_reports[stage_id] = {'status': 'blocked', 'seconds': 0.0}
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage_id = running.pop(future)
+                    try:
+                        result, seconds = future.result()
+                        stage_reports[stage_id] = {
+                            'status': 'completed',
+                            'seconds': round(seconds, 3),
+                            'error': result.get('error')
+                        }
+                        done.add(stage_id)
+                        logger.info(f"✅ 段階完了: {stage_id}（{seconds:.1f}秒）")
+                    except Exception as e:
+                        stage_reports[stage_id] = {'status': 'failed', 'seconds': 0.0, 'error': str(e)}
+                        logger.error(f"❌ 段階失敗: {stage_id}: {e}")
+                    
+                    if progress_callback:
+                        progress_callback(len(stage_reports), total, stage_id)
+        
+        return {
+            'data_round': data_round,
+            'fidelity': fidelity,
+            'stages': stage_reports,
+            'total_seconds': round(time.perf_counter() - pipeline_start, 3),
+            'completed': [s for s, r in stage_reports.items() if r['status'] == 'completed'],
+            'skipped': [s for s, r in stage_reports.items() if r['status'] == 'skipped'],
+            'failed': [s for s, r in stage_reports.items() if r['status'] in ('failed', 'blocked')]
+        }
     
-    def _execute_fixed_window_stage(self, data, main_cols, round_col, window_size, stage_id):
+    def _execute_fixed_window_stage(self, data, main_cols, round_col, window_size, stage_id, validator=None):
         """固定窓段階の実行"""
         logger.info(f"固定窓検証開始: {window_size}回分")
         
@@ -178,7 +522,8 @@ class ProgressiveLearningManager:
         feature_adjustments = self._get_accumulated_feature_adjustments()
         
         # 固定窓検証の実行（フル機能）
-        validator = self.prediction_system.validator
+        if validator is None:
+            validator = self.prediction_system.validator
         if not validator:
             from models.validation import TimeSeriesCrossValidator
             validator = TimeSeriesCrossValidator()
@@ -212,11 +557,12 @@ class ProgressiveLearningManager:
         
         return {'stage_id': stage_id, 'error': '検証結果なし'}
     
-    def _execute_expanding_window_stage(self, data, main_cols, round_col, stage_id):
+    def _execute_expanding_window_stage(self, data, main_cols, round_col, stage_id, validator=None):
         """累積窓段階の実行"""
         logger.info("累積窓検証開始")
         
-        validator = self.prediction_system.validator
+        if validator is None:
+            validator = self.prediction_system.validator
         if not validator:
             from models.validation import TimeSeriesCrossValidator
             validator = TimeSeriesCrossValidator()
@@ -274,11 +620,13 @@ class ProgressiveLearningManager:
             'stages_integrated': len(accumulated)
         }
     
-    def _accumulate_learning_insights(self, stage_id, result):
+    def _accumulate_learning_insights(self, stage_id, result, data_round=None, fidelity='full'):
         """学習洞察を蓄積"""
         insights = self.learning_state['accumulated_insights']
         insights[stage_id] = {
             'timestamp': datetime.now().isoformat(),
+            'data_round': data_round,
+            'fidelity': fidelity,
             'analysis': result.get('analysis', {}),
             'feature_weights': result.get('feature_weights', {}),
             'pattern_insights': result.get('pattern_insights', {})
@@ -466,18 +814,21 @@ class ProgressiveLearningManager:
             'progress_percentage': (completed_stages / total_stages) * 100,
             'available_stages': self.get_available_stages(),
             'last_updated': self.learning_state.get('last_updated'),
-            'accumulated_insights': len(self.learning_state.get('accumulated_insights', {}))
+            'accumulated_insights': len(self._insight_stages) if self._progress_only
+                                    else len(self.learning_state.get('accumulated_insights', {}))
         }
     
     def reset_learning_progress(self):
         """学習進捗をリセット"""
-        self.learning_state = {
-            'stages_completed': [],
-            'accumulated_insights': {},
-            'feature_weights': {},
-            'pattern_adjustments': {},
-            'validation_results': {},
-            'last_updated': None
-        }
-        self.save_learning_state()
+        self.learning_state = self._empty_learning_state()
+        self.learning_state['last_updated'] = datetime.now().isoformat()
+        self._insight_stages = set()
+        self._progress_only = False
+        self._pending_events = []
+        
+        if self.prediction_system.file_manager:
+            try:
+                self._compact_learning_state()
+            except Exception as e:
+                logger.error(f"学習状態保存エラー: {e}")
         logger.info("学習進捗をリセットしました")
\ No newline at end of file
@@ -6,24 +6,48 @@
 import numpy as np
 import pandas as pd
 import logging
+import time
 from collections import Counter
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.neural_network import MLPClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import cross_val_score
 
+from utils.profiling import profiled, span
+
 logger = logging.getLogger(__name__)
 
 class TimeSeriesCrossValidator:
     """本格的な時系列交差検証クラス（モデル学習・20セット予測対応）"""
     
-    def __init__(self, min_train_size=10):
+    # 検証の忠実度ティア
+    FIDELITY_TIERS = ('full', 'screening', 'tiered')
+    
+    # 累積窓の学習モード（exact: 毎窓再学習 / warm_start: 学習済みモデルを引き継ぎ）
+    EXPANDING_MODES = ('exact', 'warm_start')
+    
+    # warm_startモードの1窓あたりの更新量
+    WARM_MLP_EPOCHS = 5
+    
+    def __init__(self, min_train_size=10, fidelity='full', confirm_rate=0.2, confirm_threshold=4):
+        if fidelity not in self.FIDELITY_TIERS:
+            raise ValueError(f"無効な忠実度ティア: {fidelity}")
+        
         self.min_train_size = min_train_size
         self.fixed_window_results = {}  # 窓サイズ別の結果
         self.expanding_window_results = []
         self.validation_history = []
         self.feature_importance_history = {}
         
+        # 忠実度設定
+        # full: 全窓をフルモデルで検証（従来動作）
+        # screening: 全窓を軽量モデルで検証
+        # tiered: 全窓を軽量モデルで検証し、抽出した窓のみフルモデルで確認
+        self.fidelity = fidelity
+        self.confirm_every = max(1, int(round(1.0 / confirm_rate))) if confirm_rate > 0 else 0
+        self.confirm_threshold = confirm_threshold
+        self.fidelity_pairs = {}  # 検証キー別の (軽量, フル) 平均一致数ペア
+        
         # 本番と同じフルモデル
         self.validation_models = {
             'random_forest': RandomForestClassifier(
@@ -37,6 +61,19 @@ class TimeSeriesCrossValidator:
             )
         }
         
+        # スクリーニング用の軽量モデル（シングルスレッドで固定オーバーヘッドを削減）
+        self.screening_models = {
+            'random_forest': RandomForestClassifier(
+                n_estimators=20, max_depth=8, random_state=42, n_jobs=1
+            ),
+            'gradient_boost': GradientBoostingClassifier(
+                n_estimators=15, max_depth=4, random_state=42
+            ),
+            'neural_network': MLPClassifier(
+                hidden_layer_sizes=(32,), max_iter=100, random_state=42
+            )
+        }
+        
         self.model_weights = {
             'random_forest': 0.4,
             'gradient_boost': 0.35,
@@ -160,18 +197,21 @@ class TimeSeriesCrossValidator:
             logger.error(f"特徴量エンジニアリングエラー: {e}")
             return None, None, Counter()
     
-    def train_validation_models(self, train_data, main_cols):
-        """本番と同じフルモデルを学習"""
+    def train_validation_models(self, train_data, main_cols, tier='full', features=None):
+        """検証モデルを学習（tier='full'で本番と同じフルモデル、'screening'で軽量モデル）"""
         try:
-            # 本番と同じ16次元特徴量作成
-            X, y, freq_counter = self.create_validation_features(train_data, main_cols)
+            # 本番と同じ16次元特徴量作成（作成済みなら再利用）
+            if features is None:
+                features = self.create_validation_features(train_data, main_cols)
+            X, y, freq_counter = features
             if X is None or len(X) < 50:  # 最低限必要なデータ数
                 return None
             
+            models = self.screening_models if tier == 'screening' else self.validation_models
             trained_models = {}
             scalers = {}
             
-            for name, model in self.validation_models.items():
+            for name, model in models.items():
                 try:
                     # スケーリング
                     scaler = StandardScaler()
@@ -263,6 +303,164 @@ class TimeSeriesCrossValidator:
             logger.error(f"検証用予測生成エラー: {e}")
             return []
     
+    def _evaluate_tier(self, features, actual_numbers, tier):
+        """指定ティアのモデルで1窓分を学習・予測・評価"""
+        model_data = self.train_validation_models(None, None, tier=tier, features=features)
+        
+        if not model_data or not model_data['models']:
+            return None
+        
+        predicted_sets = self.generate_validation_predictions(
+            model_data, 
+            model_data['freq_counter'], 
+            20
+        )
+        
+        if not predicted_sets:
+            return None
+        
+        eval_result = self.evaluate_prediction_sets(predicted_sets, actual_numbers)
+        eval_result['fidelity'] = tier
+        return eval_result
+    
+    def _needs_confirmation(self, screening_result, window_index):
+        """フルモデルでの確認が必要な窓か判定（抽出サンプル or 高一致で要確認）"""
+        if self.confirm_every and window_index % self.confirm_every == 0:
+            return True
+        return screening_result['max_matches'] >= self.confirm_threshold
+    
+    def _evaluate_window(self, train_data, main_cols, actual_numbers, validation_key, window_index):
+        """忠実度設定に従って1窓分を評価"""
+        features = self.create_validation_features(train_data, main_cols)
+        return self._evaluate_tiers(
+            lambda tier: self._evaluate_tier(features, actual_numbers, tier), validation_key, window_index
+        )
+    
+    def _evaluate_tiers(self, evaluate, validation_key, window_index):
+        """忠実度設定に従ってティアを選び1窓分を評価（evaluate(tier) が指定ティアの評価結果を返す）"""
+        if self.fidelity == 'full':
+            return evaluate('full')
+        
+        eval_result = evaluate('screening')
+        if eval_result is None or self.fidelity == 'screening':
+            return eval_result
+        
+        # tiered: 抽出・要確認の窓のみフルモデルで再評価
+        if self._needs_confirmation(eval_result, window_index):
+            full_result = evaluate('full')
+            if full_result:
+                eval_result['confirmation'] = {
+                    'avg_matches': full_result['avg_matches'],
+                    'max_matches': full_result['max_matches'],
+                    'sets_4_plus': full_result['sets_4_plus']
+                }
+                self.fidelity_pairs.setdefault(validation_key, []).append(
+                    (float(eval_result['avg_matches']), float(full_result['avg_matches']))
+                )
+        
+        return eval_result
+    
+    def get_fidelity_report(self):
+        """軽量ティアとフルティアの相関レポートを取得"""
+        def summarize(pairs):
+            screening = np.array([p[0] for p in pairs])
+            full = np.array([p[1] for p in pairs])
+            correlation = None
+            if len(pairs) >= 3 and np.std(screening) > 0 and np.std(full) > 0:
+                correlation = float(np.corrcoef(screening, full)[0, 1])
+            return {
+                'confirmed_windows': len(pairs),
+                'correlation': correlation,
+                'screening_avg_matches': float(np.mean(screening)) if len(pairs) else None,
+                'full_avg_matches': float(np.mean(full)) if len(pairs) else None,
+                'mean_bias': float(np.mean(full - screening)) if len(pairs) else None
+            }
+        
+        all_pairs = [p for pairs in self.fidelity_pairs.values() for p in pairs]
+        
+        return {
+            'fidelity': self.fidelity,
+            'confirm_every': self.confirm_every,
+            'confirm_threshold': self.confirm_threshold,
+            'by_validation': {key: summarize(pairs) for key, pairs in self.fidelity_pairs.items()},
+            'overall': summarize(all_pairs)
+        }
+    
+    @staticmethod
+    def _fixed_window_test_indices(total_rounds, window_size):
+        """固定窓のテスト位置候補と最大テスト数（効率化：一定間隔でサンプリング）"""
+        test_span = total_rounds - window_size - 1
+        if test_span <= 0:
+            return [], 0
+        
+        max_tests = min(test_span, 50)  # 最大50回のテストに制限
+        step = max(1, test_span // max_tests)
+        return [window_size + i for i in range(0, test_span, step)], max_tests
+    
+    @staticmethod
+    def _expanding_test_indices(total_rounds, initial_size):
+        """累積窓のテスト位置候補と最大テスト数（効率化：一定間隔でサンプリング）"""
+        test_span = total_rounds - initial_size
+        if test_span <= 0:
+            return [], 0
+        
+        max_tests = min(test_span, 30)  # 最大30回のテストに制限
+        step = max(1, test_span // max_tests)
+        return [initial_size + i for i in range(0, test_span, step)], max_tests
+    
+    def _actual_numbers_at(self, data, main_cols, test_idx):
+        """テスト位置の当選番号を取得"""
+        actual_numbers = []
+        for col in main_cols:
+            if col in data.columns:
+                actual_numbers.append(int(data.iloc[test_idx][col]))
+        return actual_numbers
+    
+    def _evaluate_fixed_index(self, data, main_cols, round_col, window_size, test_idx, window_index):
+        """固定窓の1テスト位置を評価"""
+        # 訓練データ: test_idx-window_size〜test_idx-1
+        train_start = test_idx - window_size
+        train_end = test_idx
+        
+        actual_numbers = self._actual_numbers_at(data, main_cols, test_idx)
+        if len(actual_numbers) != 7:
+            return None
+        
+        # 忠実度設定に従って学習・20セット予測・詳細評価
+        eval_result = self._evaluate_window(
+            data.iloc[train_start:train_end], main_cols, actual_numbers,
+            f'fixed_{window_size}', window_index
+        )
+        
+        if eval_result:
+            eval_result['train_range'] = f"第{train_start + 1}回〜第{train_end}回"
+            eval_result['test_round'] = int(data.iloc[test_idx][round_col])
+            eval_result['test_idx'] = test_idx
+            eval_result['window_size'] = window_size
+        
+        return eval_result
+    
+    def _evaluate_expanding_index(self, data, main_cols, round_col, test_idx, window_index):
+        """累積窓の1テスト位置をexact再学習で評価"""
+        actual_numbers = self._actual_numbers_at(data, main_cols, test_idx)
+        if len(actual_numbers) != 7:
+            return None
+        
+        # 訓練データ: 0〜test_idx-1（累積）
+        eval_result = self._evaluate_window(
+            data.iloc[0:test_idx], main_cols, actual_numbers, 'expanding', window_index
+        )
+        
+        if eval_result:
+            eval_result['train_range'] = f"第1回〜第{test_idx}回"
+            eval_result['test_round'] = int(data.iloc[test_idx][round_col])
+            eval_result['test_idx'] = test_idx
+            eval_result['train_size'] = test_idx
+            eval_result['mode'] = 'exact'
+        
+        return eval_result
+    
+    @profiled('fixed_window_validation')
     def fixed_window_validation(self, data, main_cols, round_col, window_sizes=[10, 20, 30]):
         """複数窓サイズによる固定窓検証（効率化版）"""
         logger.info(f"=== 固定窓検証開始（窓サイズ: {window_sizes}回） ===")
@@ -274,52 +472,19 @@ class TimeSeriesCrossValidator:
             logger.info(f"🔄 {window_size}回分窓での検証開始")
             results = []
             
-            # 効率化：全回ではなく一定間隔でサンプリング
-            max_tests = min(total_rounds - window_size - 1, 50)  # 最大50回のテストに制限
-            step = max(1, (total_rounds - window_size - 1) // max_tests)
+            test_indices, max_tests = self._fixed_window_test_indices(total_rounds, window_size)
+            logger.info(f"検証範囲: {max_tests}回（候補{len(test_indices)}件）")
             
-            logger.info(f"検証範囲: {max_tests}回（step={step}）")
-            
-            for i in range(0, total_rounds - window_size - 1, step):
+            for window_index, test_idx in enumerate(test_indices):
                 if len(results) >= max_tests:
                     break
-                    
-                # 訓練データ: i〜i+window_size-1
-                train_start = i
-                train_end = i + window_size
-                test_idx = train_end
-                
-                if test_idx >= total_rounds:
-                    break
                 
-                # 訓練データ取得
-                train_data = data.iloc[train_start:train_end]
-                test_round = data.iloc[test_idx][round_col]
-                actual_numbers = []
-                for col in main_cols:
-                    if col in data.columns:
-                        actual_numbers.append(int(data.iloc[test_idx][col]))
-                
-                if len(actual_numbers) == 7:
-                    # フルモデル学習
-                    model_data = self.train_validation_models(train_data, main_cols)
-                    
-                    if model_data and model_data['models']:
-                        # 本番と同じ20セット予測生成
-                        predicted_sets = self.generate_validation_predictions(
-                            model_data, 
-                            model_data['freq_counter'], 
-                            20
-                        )
-                        
-                        if predicted_sets:
-                            # 詳細評価
-                            eval_result = self.evaluate_prediction_sets(predicted_sets, actual_numbers)
-                            eval_result['train_range'] = f"第{train_start + 1}回〜第{train_end}回"
-                            eval_result['test_round'] = test_round
-                            eval_result['window_size'] = window_size
-                            
-                            results.append(eval_result)
+                with span(f'window_{window_size}'):
+                    eval_result = self._evaluate_fixed_index(
+                        data, main_cols, round_col, window_size, test_idx, window_index
+                    )
+                if eval_result:
+                    results.append(eval_result)
                 
                 # 進捗表示
                 if (len(results) + 1) % 10 == 0:
@@ -333,63 +498,153 @@ class TimeSeriesCrossValidator:
             if results:
                 avg_matches = np.mean([r['avg_matches'] for r in results])
                 max_matches = max([r['max_matches'] for r in results])
-                sets_4_plus = np.mean([r['sets_4_plus'] for r in results])
                 logger.info(f"📊 {window_size}回分窓 結果:")
                 logger.info(f"    検証回数: {len(results)}回 | 平均一致: {avg_matches:.3f}個 | 最高一致: {max_matches}個")
         
         self.fixed_window_results = results_by_window
         return results_by_window
     
-    def expanding_window_validation(self, data, main_cols, round_col, initial_size=30):
+    def _warm_update_model(self, model, scaler, template, X_all, y_all, X_new, y_new):
+        """学習済みモデルを新規サンプルで追加学習"""
+        known_classes = set(model.classes_.tolist())
+        
+        if isinstance(model, MLPClassifier):
+            # MLPはスケーラーを逐次更新し、新規サンプルでpartial_fitのエポックを追加
+            if set(np.unique(y_new).tolist()) <= known_classes:
+                scaler.partial_fit(X_new)
+                X_new_scaled = scaler.transform(X_new)
+                for _ in range(self.WARM_MLP_EPOCHS):
+                    model.partial_fit(X_new_scaled, y_new)
+                return model, scaler
+        
+        elif set(np.unique(y_all).tolist()) == known_classes:
+            # 決定木系はスケール不変のため、既存の木と整合するよう初回のスケーラーを維持
+            X_scaled = scaler.transform(X_all)
+            
+            if isinstance(model, RandomForestClassifier):
+                # 古い木を入れ替え、累積データで新しい木を追加（木の総数は一定）
+                replace_count = max(1, template.n_estimators // 10)
+                model.set_params(warm_start=True)
+                model.estimators_ = model.estimators_[replace_count:]
+                model.fit(X_scaled, y_all)
+            elif isinstance(model, GradientBoostingClassifier):
+                # ステージを追加（初期ステージ数の2倍まで）。上限に達したら累積データで学習し直し、
+                # ステージ数を初期値に戻して追加学習を続ける
+                stage_limit = template.n_estimators * 2
+                if model.n_estimators < stage_limit:
+                    model.set_params(
+                        warm_start=True,
+                        n_estimators=min(stage_limit, model.n_estimators + max(1, template.n_estimators // 10))
+                    )
+                    model.fit(X_scaled, y_all)
+                else:
+                    logger.info(f"勾配ブースティングのステージ数が上限（{stage_limit}）に達したため再学習します")
+                    model = type(template)(**template.get_params())
+                    model.fit(X_scaled, y_all)
+            
+            return model, scaler
+        
+        # 新しいクラスが出現した場合は追加学習できないため再学習
+        scaler = StandardScaler()
+        model = type(template)(**template.get_params())
+        model.fit(scaler.fit_transform(X_all), y_all)
+        return model, scaler
+    
+    def _advance_warm_chain(self, chain, data, main_cols, train_end, tier):
+        """指定ティアの累積窓の学習済みモデルを次の窓まで進める（初回は通常学習）"""
+        templates = self.screening_models if tier == 'screening' else self.validation_models
+        
+        if chain is None:
+            features = self.create_validation_features(data.iloc[0:train_end], main_cols)
+            model_data = self.train_validation_models(None, None, tier=tier, features=features)
+            if not model_data or not model_data['models']:
+                return None
+            
+            model_data['X'], model_data['y'] = features[0], features[1]
+            model_data['n_rows'] = train_end
+            return model_data
+        
+        prev_rows = chain['n_rows']
+        if train_end <= prev_rows:
+            return chain
+        
+        # 特徴量は行順に追加されるため、前回の最終行以降のみ作成すれば累積分と一致する
+        X_new, y_new, _ = self.create_validation_features(data.iloc[prev_rows - 1:train_end], main_cols)
+        _, _, freq_delta = self.create_validation_features(data.iloc[prev_rows:train_end], main_cols)
+        chain['freq_counter'].update(freq_delta)
+        chain['n_rows'] = train_end
+        
+        if X_new is None or len(X_new) == 0:
+            return chain
+        
+        chain['X'] = np.vstack([chain['X'], X_new])
+        chain['y'] = np.concatenate([chain['y'], y_new])
+        
+        for name in list(chain['models'].keys()):
+            try:
+                chain['models'][name], chain['scalers'][name] = self._warm_update_model(
+                    chain['models'][name], chain['scalers'][name], templates[name],
+                    chain['X'], chain['y'], X_new, y_new
+                )
+            except Exception as e:
+                logger.warning(f"モデル {name} の追加学習でエラー: {e}")
+                continue
+        
+        return chain
+    
+    def _evaluate_warm_window(self, chain, actual_numbers, tier):
+        """引き継いだモデルで1窓分を予測・評価"""
+        predicted_sets = self.generate_validation_predictions(chain, chain['freq_counter'], 20)
+        
+        if not predicted_sets:
+            return None
+        
+        eval_result = self.evaluate_prediction_sets(predicted_sets, actual_numbers)
+        eval_result['fidelity'] = tier
+        return eval_result
+    
+    @profiled('expanding_window_validation')
+    def expanding_window_validation(self, data, main_cols, round_col, initial_size=30, mode='exact'):
         """累積窓による時系列交差検証（効率化版）"""
-        logger.info(f"=== 累積窓検証開始（初期サイズ: {initial_size}回） ===")
+        if mode not in self.EXPANDING_MODES:
+            raise ValueError(f"無効な累積窓モード: {mode}")
         
-        results = []
-        total_rounds = len(data)
+        logger.info(f"=== 累積窓検証開始（初期サイズ: {initial_size}回, モード: {mode}） ===")
         
-        # 効率化：全回ではなく一定間隔でサンプリング
-        max_tests = min(total_rounds - initial_size, 30)  # 最大30回のテストに制限
-        step = max(1, (total_rounds - initial_size) // max_tests)
+        results = []
+        chains = {}  # warm_startモードでティアごとに引き継ぐ学習済みモデル
         
-        logger.info(f"検証範囲: {max_tests}回（step={step}）")
+        test_indices, max_tests = self._expanding_test_indices(len(data), initial_size)
+        logger.info(f"検証範囲: {max_tests}回（候補{len(test_indices)}件）")
         
-        for i in range(0, total_rounds - initial_size, step):
+        for window_index, test_idx in enumerate(test_indices):
             if len(results) >= max_tests:
                 break
-                
-            test_idx = initial_size + i
-            
-            if test_idx >= total_rounds:
-                break
             
-            # 訓練データ: 0〜test_idx-1（累積）
-            train_data = data.iloc[0:test_idx]
-            test_round = data.iloc[test_idx][round_col]
-            actual_numbers = []
-            for col in main_cols:
-                if col in data.columns:
-                    actual_numbers.append(int(data.iloc[test_idx][col]))
-            
-            if len(actual_numbers) == 7:
-                # フルモデル学習
-                model_data = self.train_validation_models(train_data, main_cols)
-                
-                if model_data and model_data['models']:
-                    # 本番と同じ20セット予測生成
-                    predicted_sets = self.generate_validation_predictions(
-                        model_data, 
-                        model_data['freq_counter'], 
-                        20
-                    )
+            if mode == 'warm_start':
+                # 前の窓のモデルを追加学習して引き継ぐ（tieredのフルモデルは確認する窓でのみ進める）
+                eval_result = None
+                actual_numbers = self._actual_numbers_at(data, main_cols, test_idx)
+                if len(actual_numbers) == 7:
+                    def evaluate(tier):
+                        chains[tier] = self._advance_warm_chain(chains.get(tier), data, main_cols, test_idx, tier)
+                        return self._evaluate_warm_window(chains[tier], actual_numbers, tier) if chains[tier] else None
                     
-                    if predicted_sets:
-                        # 詳細評価
-                        eval_result = self.evaluate_prediction_sets(predicted_sets, actual_numbers)
-                        eval_result['train_range'] = f"第1回〜第{test_idx}回"
-                        eval_result['test_round'] = test_round
-                        eval_result['train_size'] = len(train_data)
-                        
-                        results.append(eval_result)
+                    eval_result = self._evaluate_tiers(evaluate, 'expanding', window_index)
+                
+                if eval_result:
+                    eval_result['train_range'] = f"第1回〜第{test_idx}回"
+                    eval_result['test_round'] = int(data.iloc[test_idx][round_col])
+                    eval_result['test_idx'] = test_idx
+                    eval_result['train_size'] = test_idx
+                    eval_result['mode'] = mode
+            else:
+                eval_result = self._evaluate_expanding_index(
+                    data, main_cols, round_col, test_idx, window_index
+                )
+            
+            if eval_result:
+                results.append(eval_result)
             
             # 進捗表示
             if (len(results) + 1) % 10 == 0:
@@ -403,12 +658,142 @@ class TimeSeriesCrossValidator:
         if results:
             avg_matches = np.mean([r['avg_matches'] for r in results])
             max_matches = max([r['max_matches'] for r in results])
-            sets_4_plus = np.mean([r['sets_4_plus'] for r in results])
             logger.info(f"📊 累積窓 結果:")
             logger.info(f"    検証回数: {len(results)}回 | 平均一致: {avg_matches:.3f}個 | 最高一致: {max_matches}個")
         
         return results
     
+    @classmethod
+    def plan_validation_chunks(cls, total_rounds, window_sizes=[10, 20, 30], initial_size=30, chunk_size=5):
+        """検証をテスト位置単位のチャンクに分割（分散実行用）"""
+        chunks = []
+        
+        plans = [
+            ('fixed', window_size, *cls._fixed_window_test_indices(total_rounds, window_size))
+            for window_size in window_sizes
+        ]
+        plans.append(('expanding', initial_size, *cls._expanding_test_indices(total_rounds, initial_size)))
+        
+        for kind, size, test_indices, max_tests in plans:
+            # 分散実行では失敗窓の補充をしないため、候補の先頭max_tests件を対象とする
+            test_indices = test_indices[:max_tests]
+            
+            for start in range(0, len(test_indices), chunk_size):
+                chunks.append({
+                    'chunk_id': f'{kind}_{size}:{start}',
+                    'kind': kind,
+                    'size': size,
+                    'start_index': start,
+                    'test_indices': test_indices[start:start + chunk_size],
+                    'total_rounds': total_rounds
+                })
+        
+        return chunks
+    
+    def evaluate_chunk(self, data, main_cols, round_col, chunk):
+        """1チャンク分のテスト位置を評価（分散実行用）"""
+        # 計画時と同じ行数で評価（計画後に追加された回は対象外）
+        data = data.iloc[:chunk['total_rounds']]
+        results = []
+        
+        for offset, test_idx in enumerate(chunk['test_indices']):
+            window_index = chunk['start_index'] + offset
+            
+            if chunk['kind'] == 'fixed':
+                eval_result = self._evaluate_fixed_index(
+                    data, main_cols, round_col, chunk['size'], test_idx, window_index
+                )
+            else:
+                eval_result = self._evaluate_expanding_index(
+                    data, main_cols, round_col, test_idx, window_index
+                )
+            
+            if eval_result:
+                results.append(eval_result)
+        
+        return {
+            'chunk_id': chunk['chunk_id'],
+            'kind': chunk['kind'],
+            'size': chunk['size'],
+            'results': results,
+            'fidelity_pairs': {key: [list(p) for p in pairs] for key, pairs in self.fidelity_pairs.items()}
+        }
+    
+    def merge_chunk_results(self, chunk_outputs):
+        """チャンク結果を固定窓・累積窓の結果構造に集約（冪等：同一チャンク・同一テスト位置は1回のみ計上）"""
+        seen_chunks = set()
+        fixed_by_key = {}
+        expanding_by_key = {}
+        fidelity_pairs = {}
+        
+        for output in chunk_outputs:
+            if not output or output['chunk_id'] in seen_chunks:
+                continue
+            seen_chunks.add(output['chunk_id'])
+            
+            for result in output['results']:
+                if output['kind'] == 'fixed':
+                    fixed_by_key.setdefault(output['size'], {})[result['test_idx']] = result
+                else:
+                    expanding_by_key[result['test_idx']] = result
+            
+            for key, pairs in output.get('fidelity_pairs', {}).items():
+                fidelity_pairs.setdefault(key, []).extend(tuple(p) for p in pairs)
+        
+        self.fixed_window_results = {
+            window_size: [by_idx[idx] for idx in sorted(by_idx)]
+            for window_size, by_idx in sorted(fixed_by_key.items())
+        }
+        self.expanding_window_results = [expanding_by_key[idx] for idx in sorted(expanding_by_key)]
+        self.fidelity_pairs = fidelity_pairs
+        
+        logger.info(f"分散検証結果を集約: {len(seen_chunks)}チャンク")
+        
+        return {
+            'comparison': self.compare_validation_methods(),
+            'summary': self.get_validation_summary()
+        }
+    
+    def compare_expanding_modes(self, data, main_cols, round_col, initial_size=30, seed=42):
+        """累積窓のexact再学習とwarm_startを実行し、速度と精度のずれを比較"""
+        results = {}
+        timings = {}
+        
+        for mode in self.EXPANDING_MODES:
+            np.random.seed(seed)  # 予測サンプリングの乱数を揃える
+            start = time.perf_counter()
+            results[mode] = self.expanding_window_validation(
+                data, main_cols, round_col, initial_size=initial_size, mode=mode
+            )
+            timings[mode] = time.perf_counter() - start
+        
+        exact_by_round = {r['test_round']: r for r in results['exact']}
+        drift = [
+            r['avg_matches'] - exact_by_round[r['test_round']]['avg_matches']
+            for r in results['warm_start'] if r['test_round'] in exact_by_round
+        ]
+        
+        return {
+            'exact_seconds': timings['exact'],
+            'warm_start_seconds': timings['warm_start'],
+            'speedup': timings['exact'] / timings['warm_start'] if timings['warm_start'] > 0 else None,
+            'compared_windows': len(drift),
+            'exact_avg_matches': float(np.mean([r['avg_matches'] for r in results['exact']])) if results['exact'] else None,
+            'warm_start_avg_matches': float(np.mean([r['avg_matches'] for r in results['warm_start']])) if results['warm_start'] else None,
+            'mean_drift': float(np.mean(drift)) if drift else None,
+            'mean_abs_drift': float(np.mean(np.abs(drift))) if drift else None
+        }
+    
+    def run_validation(self, data, main_cols, round_col, expanding_mode='exact'):
+        """固定窓・累積窓検証を一括実行して比較結果を返す"""
+        self.fixed_window_validation(data, main_cols, round_col)
+        self.expanding_window_validation(data, main_cols, round_col, mode=expanding_mode)
+        
+        return {
+            'comparison': self.compare_validation_methods(),
+            'summary': self.get_validation_summary()
+        }
+    
     def compare_validation_methods(self):
         """固定窓（複数サイズ）と累積窓の結果を比較"""
         logger.info("=== 検証手法の詳細比較分析 ===")
@@ -513,4 +898,7 @@ class TimeSeriesCrossValidator:
                 'avg_sets_4_plus': np.mean([r['sets_4_plus'] for r in self.expanding_window_results])
             }
         
+        if self.fidelity != 'full':
+            summary['fidelity_report'] = self.get_fidelity_report()
+        
         return summary
\ No newline at end of file
@@ -9,6 +9,10 @@ class API {
         this.isOnline = navigator.onLine;
         this.requestCount = 0;
         this.activePolling = new Map(); // アクティブなポーリング管理
+        this.sseSupported = null;       // SSEが使えないと分かったらfalse（以降はポーリング）
+        this.sseFailures = 0;           // 接続数超過（503）以外でSSEを受信できなかった連続回数
+        this.sseMaxFailures = 3;        // この回数続けて失敗したらSSEを使わない
+        this.taskHints = new Map();     // タスク開始時にサーバーが返したETA・推奨ポーリング間隔
         
         console.log('API class initialized with baseURL:', this.baseURL);
         
@@ -112,6 +116,12 @@ class API {
         const response = await this.post(endpoint, data);
         
         if (response.status === 'success' && response.data.task_id) {
+            if (response.data.poll_interval_ms) {
+                this.taskHints.set(response.data.task_id, {
+                    pollInterval: response.data.poll_interval_ms,
+                    eta: response.data.eta
+                });
+            }
             return response.data.task_id;
         } else {
             throw new Error(response.message || 'タスクの開始に失敗しました');
@@ -119,59 +129,160 @@ class API {
     }
     
     /**
-     * 🔥 タスクの状態をポーリング
+     * 🔥 タスクの状態を監視（SSEで受信し、使えない場合はポーリング）
      * @param {string} taskId - タスクID
      * @param {Function} onProgress - 進捗コールバック
      * @param {Function} onComplete - 完了コールバック
      * @param {Function} onError - エラーコールバック
-     * @param {number} pollInterval - ポーリング間隔（ミリ秒）
+     * @param {number} pollInterval - ポーリング間隔（ミリ秒、サーバーの推奨値があればそちらを使用）
      */
     async pollTaskStatus(taskId, onProgress, onComplete, onError, pollInterval = 2000) {
-        // 既存のポーリングがあれば停止
+        const hint = this.taskHints.get(taskId);
+        if (hint) {
+            pollInterval = hint.pollInterval;
+        }
+        
+        // 既存の監視があれば停止
         this.stopPolling(taskId);
         
+        if (this.sseSupported !== false && typeof EventSource !== 'undefined') {
+            this.streamTaskEvents(taskId, onProgress, onComplete, onError, pollInterval);
+        } else {
+            this.startPolling(taskId, onProgress, onComplete, onError, pollInterval);
+        }
+    }
+    
+    /**
+     * タスク状態をコールバックへ反映
+     * @returns {boolean} タスクが終了したか
+     */
+    handleTaskStatus(taskId, taskStatus, onProgress, onComplete, onError) {
+        switch (taskStatus.state) {
+            case 'PENDING':
+                onProgress && onProgress({
+                    progress: 0,
+                    status: taskStatus.status || 'タスク開始待ち...'
+                });
+                return false;
+                
+            case 'PROGRESS':
+                onProgress && onProgress({
+                    progress: taskStatus.progress || 0,
+                    current: taskStatus.current || 0,
+                    total: taskStatus.total || 1,
+                    status: taskStatus.status || '処理中...'
+                });
+                return false;
+                
+            case 'SUCCESS':
+                this.stopPolling(taskId);
+                onComplete && onComplete(taskStatus.result);
+                return true;
+                
+            case 'FAILURE':
+            case 'REVOKED':
+                this.stopPolling(taskId);
+                onError && onError(new Error(taskStatus.error || 'タスクでエラーが発生しました'));
+                return true;
+        }
+        return false;
+    }
+    
+    /**
+     * SSEでタスクの進捗を受信
+     */
+    streamTaskEvents(taskId, onProgress, onComplete, onError, pollInterval) {
+        const source = new EventSource(`${this.baseURL}/api/task/${taskId}/events`);
+        let received = false;
+        this.activePolling.set(taskId, { source });
+        
+        source.onmessage = (event) => {
+            received = true;
+            this.sseFailures = 0;
+            try {
+                this.handleTaskStatus(taskId, JSON.parse(event.data), onProgress, onComplete, onError);
+            } catch (error) {
+                console.error(`タスクイベント処理エラー (${taskId}):`, error);
+            }
+        };
+        
+        source.onerror = () => {
+            // 1件も受信できない・再接続を諦めた場合はこのタスクだけポーリングへ切り替え
+            // （接続済みの切断はEventSourceが自動で再接続する）
+            if (!received || source.readyState === EventSource.CLOSED) {
+                if (!received) {
+                    console.warn(`SSEで受信できないためポーリングに切り替えます (${taskId})`);
+                    this.checkSseAvailability(taskId);
+                }
+                this.stopPolling(taskId);
+                this.startPolling(taskId, onProgress, onComplete, onError, pollInterval);
+            }
+        };
+    }
+    
+    /**
+     * SSEの失敗理由を確認し、接続数超過（503）以外の失敗が続いたときだけSSEを使わなくする
+     * EventSourceからはステータスコードが分からないため、HEADで同じURLに問い合わせる
+     * （Service Workerがオフライン時の503に置き換えないよう、SSEと同じAcceptを付ける）
+     */
+    async checkSseAvailability(taskId) {
+        try {
+            const response = await fetch(`${this.baseURL}/api/task/${taskId}/events`, {
+                method: 'HEAD',
+                headers: { 'Accept': 'text/event-stream' }
+            });
+            if (response.status === 503) {
+                return; // 一時的な混雑（次のタスクでは再びSSEを試す）
+            }
+        } catch (error) {
+            // ネットワーク断などは失敗として数える
+        }
+        
+        this.sseFailures += 1;
+        if (this.sseFailures >= this.sseMaxFailures) {
+            console.warn('SSEが利用できないため以降はポーリングを使用します');
+            this.sseSupported = false;
+        }
+    }
+    
+    /**
+     * ロングポーリングでタスクの状態を確認
+     * サーバー側で状態・進捗が変わるまで待機するため、変化が無い間はリクエストが発生しない
+     */
+    startPolling(taskId, onProgress, onComplete, onError, pollInterval) {
+        let lastState = null;
+        let lastProgress = null;
+        let interval = pollInterval;
+        const maxInterval = pollInterval * 4;
+        
         const poll = async () => {
             try {
-                const response = await this.get(`/api/task/${taskId}`);
+                const params = { timeout: 25 };
+                if (lastState !== null) {
+                    params.since_state = lastState;
+                    params.since_progress = lastProgress;
+                }
+                const response = await this.get(`/api/task/${taskId}/wait`, params);
                 
                 if (response.status === 'success') {
                     const taskStatus = response.data;
-                    
-                    switch (taskStatus.state) {
-                        case 'PENDING':
-                            onProgress && onProgress({
-                                progress: 0,
-                                status: taskStatus.status || 'タスク開始待ち...'
-                            });
-                            break;
-                            
-                        case 'PROGRESS':
-                            onProgress && onProgress({
-                                progress: taskStatus.progress || 0,
-                                current: taskStatus.current || 0,
-                                total: taskStatus.total || 1,
-                                status: taskStatus.status || '処理中...'
-                            });
-                            break;
-                            
-                        case 'SUCCESS':
-                            this.stopPolling(taskId);
-                            onComplete && onComplete(taskStatus.result);
-                            return; // ポーリング終了
-                            
-                        case 'FAILURE':
-                            this.stopPolling(taskId);
-                            onError && onError(new Error(taskStatus.error || 'タスクでエラーが発生しました'));
-                            return; // ポーリング終了
+                    if (this.handleTaskStatus(taskId, taskStatus, onProgress, onComplete, onError)) {
+                        return; // ポーリング終了
                     }
+                    
+                    // 状態が変わらずに戻った場合だけ間隔を空け、変化が無い間は徐々に延ばす
+                    const changed = taskStatus.state !== lastState || (taskStatus.progress || 0) !== lastProgress;
+                    lastState = taskStatus.state;
+                    lastProgress = taskStatus.progress || 0;
+                    interval = changed ? pollInterval : Math.min(interval * 1.5, maxInterval);
+                    
+                    // 次のポーリングをスケジュール
+                    const timeoutId = setTimeout(poll, changed ? 0 : interval);
+                    this.activePolling.set(taskId, { timeoutId });
                 } else {
                     throw new Error(response.message || 'タスク状態の取得に失敗しました');
                 }
                 
-                // 次のポーリングをスケジュール
-                const timeoutId = setTimeout(poll, pollInterval);
-                this.activePolling.set(taskId, timeoutId);
-                
             } catch (error) {
                 console.error(`タスク状態確認エラー (${taskId}):`, error);
                 this.stopPolling(taskId);
@@ -184,13 +295,19 @@ class API {
     }
     
     /**
-     * ポーリングを停止
+     * 監視（SSE・ポーリング）を停止
      * @param {string} taskId - タスクID
      */
     stopPolling(taskId) {
-        const timeoutId = this.activePolling.get(taskId);
-        if (timeoutId) {
-            clearTimeout(timeoutId);
+        this.taskHints.delete(taskId);
+        const active = this.activePolling.get(taskId);
+        if (active) {
+            if (active.source) {
+                active.source.close();
+            }
+            if (active.timeoutId) {
+                clearTimeout(active.timeoutId);
+            }
             this.activePolling.delete(taskId);
         }
     }
@@ -232,13 +349,11 @@ class API {
      * ファイルアップロード
      */
     async uploadFile(endpoint, file) {
-        const formData = new FormData();
-        formData.append('file', file);
-        
+        // multipart はサーバー側で全体がバッファされるため、ファイル本体をそのまま送る
         return this.request(endpoint, {
             method: 'POST',
-            headers: {}, // Content-Typeを設定しない
-            body: formData
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: file
         });
     }
     
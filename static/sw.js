@@ -107,7 +107,12 @@ self.addEventListener('fetch', (event) => {
     if (url.origin !== self.location.origin) {
         return;
     }
-    
+
+    // SSE（タスク進捗ストリーム）は横取りせずブラウザに直接処理させる
+    if ((request.headers.get('Accept') || '').includes('text/event-stream')) {
+        return;
+    }
+
     // リクエストタイプに応じた処理
     if (url.pathname.startsWith('/api/')) {
         // APIリクエストの処理
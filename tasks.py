@@ -3,31 +3,223 @@ Celeryタスク定義（段階的学習対応版）
 各学習段階を独立したタスクとして実行
 """
 
+import os
+import time
 import traceback
 import logging
-from celery import current_task
+import functools
+from datetime import datetime
+from celery import current_task, chord, group, states
+from celery.signals import worker_ready, worker_process_init, task_postrun, task_prerun, before_task_publish
 from celery_app import celery_app
 from models.prediction_system import AutoFetchEnsembleLoto7
 from utils.file_manager import FileManager
+from utils.task_events import TaskEventBus
+from utils.task_metrics import TaskMetricsStore, RssSampler
+from utils.task_durations import TaskDurationStore, parse_estimated_time
+from utils.profiling import profile_session, append_perf_log, TaskCapture, CAPTURE_MODES
 
 logger = logging.getLogger(__name__)
 
+_task_events = None
+
+def get_task_events():
+    """タスク進捗イベントの送信先（ブローカーと同じRedis）"""
+    global _task_events
+    if _task_events is None:
+        _task_events = TaskEventBus.from_url(celery_app.conf.broker_url)
+    return _task_events
+
+def publish_task_event(task_id, state, **info):
+    """進捗・完了イベントを送信（送信失敗はタスクを止めない）"""
+    try:
+        get_task_events().publish(task_id, state, **info)
+    except Exception as e:
+        logger.debug(f"タスクイベント送信失敗: {e}")
+
 def update_task_progress(current, total, status_message):
-    """タスクの進捗を更新"""
+    """タスクの進捗を更新（結果バックエンドへの保存と同時にイベントを送信）"""
     if current_task:
-        current_task.update_state(
-            state='PROGRESS',
-            meta={
-                'current': current,
-                'total': total,
-                'status': status_message,
-                'progress': int((current / total) * 100) if total > 0 else 0
-            }
-        )
+        meta = {
+            'current': current,
+            'total': total,
+            'status': status_message,
+            'progress': int((current / total) * 100) if total > 0 else 0
+        }
+        current_task.update_state(state='PROGRESS', meta=meta)
+        if current_task.request.id:
+            publish_task_event(current_task.request.id, 'PROGRESS', **meta)
+
+@task_postrun.connect
+def publish_task_finished(task_id=None, state=None, **kwargs):
+    """タスク終了を通知（結果本体は受信側が結果バックエンドから取得する）
+    
+    task.replace で置き換えられたタスクは IGNORED で終わるが、同じタスクIDで置き換え先が
+    続けて実行されるため通知しない（受信側は置き換え先の終了状態を待つ）"""
+    if task_id and state and state != states.IGNORED:
+        publish_task_event(task_id, state)
+
+# === タスク計測（待ち時間・実行時間・ピークRSS） ===
+
+_task_metrics = None
+_running_tasks = {}
+
+def get_task_metrics():
+    """タスク計測値の集計先（ブローカーと同じRedis）"""
+    global _task_metrics
+    if _task_metrics is None:
+        _task_metrics = TaskMetricsStore.from_url(celery_app.conf.broker_url)
+    return _task_metrics
+
+_task_durations = None
+_local_file_manager = None
+
+def get_task_durations():
+    """タスク所要時間の履歴（ETA予測用、ブローカーと同じRedis）"""
+    global _task_durations
+    if _task_durations is None:
+        _task_durations = TaskDurationStore.from_url(celery_app.conf.broker_url)
+    return _task_durations
+
+def current_data_size():
+    """ローカルのデータキャッシュ行数（ETAの系列分けに使用）"""
+    global _local_file_manager
+    if _local_file_manager is None:
+        _local_file_manager = FileManager(artifact_backend='local')
+    return _local_file_manager.data_row_count()
+
+def annotate_stage_estimates(stages):
+    """学習段階一覧の固定の目安を、過去の所要時間に基づくETAで置き換える"""
+    try:
+        durations = get_task_durations()
+        data_size = current_data_size()
+        for stage in stages:
+            stage.update(durations.estimate(
+                'tasks.progressive_learning_stage_task', stage=stage['id'], data_size=data_size,
+                default=parse_estimated_time(stage.get('estimated_time'))
+            ))
+    except Exception as e:
+        logger.warning(f"段階ETAの取得に失敗（既定の目安を使用）: {e}")
+    return stages
+
+def task_stage(task_name, args, kwargs):
+    """学習段階タスクの段階ID（それ以外はNone）"""
+    if task_name != 'tasks.progressive_learning_stage_task':
+        return None
+    return (kwargs or {}).get('stage_id') or (args[0] if args else None)
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    """投入時刻をメッセージヘッダーに付ける（実行側で待ち時間を計算）"""
+    if headers is not None:
+        headers.setdefault('enqueued_at', time.time())
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    enqueued_at = getattr(task.request, 'enqueued_at', None) if task else None
+    _running_tasks[task_id] = {
+        'started': time.perf_counter(),
+        'queue_wait': time.time() - float(enqueued_at) if enqueued_at else None,
+        'rss': RssSampler().start()
+    }
+
+@task_postrun.connect
+def record_task_metrics(task_id=None, task=None, state=None, args=None, kwargs=None, retval=None, **extra):
+    """待ち時間・実行時間・ピークRSS・結果を集計（記録失敗はタスクに影響させない）"""
+    running = _running_tasks.pop(task_id, None)
+    if running is None or task is None:
+        return
+    run_time = time.perf_counter() - running['started']
+    peak_rss = running['rss'].stop()
+    queue = (task.request.delivery_info or {}).get('routing_key') or 'celery'
+    try:
+        get_task_metrics().record(task.name, queue, run_time, state or 'UNKNOWN',
+                                  queue_wait=running['queue_wait'], peak_rss=peak_rss)
+        
+        # 正常に完了したタスクだけをETA予測の履歴に加える
+        failed = isinstance(retval, dict) and retval.get('status') == 'error'
+        if state == 'SUCCESS' and not failed:
+            get_task_durations().record(task.name, run_time, stage=task_stage(task.name, args, kwargs),
+                                        data_size=current_data_size())
+    except Exception as e:
+        logger.debug(f"タスク計測の記録失敗: {e}")
+
+def save_task_capture(task_id, capture):
+    """詳細計測の結果をレポートとして保存し、ホットスポットの要約を返す"""
+    summary = capture.summary()
+    filename = f"{task_id}.{capture.extension}"
+    try:
+        FileManager().save_profile_report(filename, capture.report_bytes())
+        summary['report'] = filename
+        summary['download_url'] = f"/api/profile/{filename}"
+    except Exception as e:
+        logger.warning(f"計測レポートの保存に失敗: {e}")
+        summary['report_error'] = str(e)
+    return summary
+
+def with_task_profile(func):
+    """タスク本体の処理区間を計測し、スパン木を結果の'profile'に付ける
+
+    キーワード引数 profile='cpu'|'memory' が指定されたときだけcProfile・tracemallocでも計測し、
+    レポートを保存してホットスポットを 'profile' の 'capture' に付ける。
+    LOTO7_PERF_LOG が設定されていれば同じ内容をJSONLに追記する
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        mode = kwargs.get('profile')
+        if mode and mode not in CAPTURE_MODES:
+            logger.warning(f"不明な計測モードを無視します: {mode}")
+            mode = None
+        
+        with profile_session(self.name) as profile:
+            if mode is None:
+                result = func(self, *args, **kwargs)
+            else:
+                with TaskCapture(mode) as capture:
+                    result = func(self, *args, **kwargs)
+        
+        tree = profile.to_dict()
+        if mode is not None:
+            tree['capture'] = save_task_capture(self.request.id, capture)
+        if isinstance(result, dict):
+            result['profile'] = tree
+        append_perf_log({
+            'timestamp': datetime.now().isoformat(),
+            'task': self.name,
+            'task_id': self.request.id,
+            'status': result.get('status') if isinstance(result, dict) else None,
+            'profile': tree
+        })
+        return result
+    return wrapper
+
+# === 共有アーティファクトの監視 ===
+
+_artifact_watcher_pid = None
+
+def start_artifact_watcher(**kwargs):
+    """ワーカー起動時に共有アーティファクトを先読みし、更新通知で再取得する"""
+    global _artifact_watcher_pid
+    if _artifact_watcher_pid == os.getpid():
+        return
+    _artifact_watcher_pid = os.getpid()
+    
+    try:
+        file_manager = FileManager()
+        # アップロード等で更新されたファイルを次のタスク実行前にローカルへ取り込む
+        file_manager.watch_artifacts(lambda name, version: file_manager.sync_artifact(name))
+        for filename in ('model.pkl', 'loto7_data.csv'):
+            file_manager.sync_artifact(filename)
+    except Exception as e:
+        logger.warning(f"アーティファクト監視の開始に失敗: {e}")
+
+worker_ready.connect(start_artifact_watcher)
+worker_process_init.connect(start_artifact_watcher)
 
 # === 既存タスク（そのまま維持） ===
 
 @celery_app.task(bind=True, name='tasks.heavy_init_task')
+@with_task_profile
 def heavy_init_task(self):
     """重いコンポーネントの初期化タスク"""
     try:
@@ -75,6 +267,7 @@ def heavy_init_task(self):
         }
 
 @celery_app.task(bind=True, name='tasks.predict_task')
+@with_task_profile
 def predict_task(self, round_number=None):
     """予測生成タスク"""
     try:
@@ -119,8 +312,9 @@ def predict_task(self, round_number=None):
 # === 🔥 新規追加：段階的学習タスク ===
 
 @celery_app.task(bind=True, name='tasks.progressive_learning_stage_task')
-def progressive_learning_stage_task(self, stage_id):
-    """段階的学習の単一段階実行タスク"""
+@with_task_profile
+def progressive_learning_stage_task(self, stage_id, profile=None):
+    """段階的学習の単一段階実行タスク（profile: 'cpu'|'memory' で詳細計測）"""
     try:
         update_task_progress(0, 5, f"段階的学習準備: {stage_id}")
         
@@ -129,8 +323,8 @@ def progressive_learning_stage_task(self, stage_id):
         prediction_system = AutoFetchEnsembleLoto7()
         prediction_system.set_file_manager(file_manager)
         
-        # 保存済みデータ読み込み
-        prediction_system.load_models()
+        # 保存済みデータ読み込み（学習でモデルを更新するため、共有しない複製を読み込む）
+        prediction_system.load_models(fresh=True)
         prediction_system.history.load_from_csv()
         
         update_task_progress(1, 5, "段階的学習マネージャー初期化中...")
@@ -174,6 +368,62 @@ def progressive_learning_stage_task(self, stage_id):
             'traceback': traceback.format_exc()
         }
 
+@celery_app.task(
+    bind=True, name='tasks.progressive_learning_pipeline_task',
+    soft_time_limit=3300, time_limit=3600
+)
+@with_task_profile
+def progressive_learning_pipeline_task(self, options=None):
+    """段階的学習の全段階を依存関係に従って一括実行するタスク"""
+    try:
+        if options is None:
+            options = {}
+        
+        update_task_progress(0, 1, "段階的学習パイプライン準備中...")
+        
+        # システム初期化（データ・モデルは全段階で共有）
+        file_manager = FileManager()
+        prediction_system = AutoFetchEnsembleLoto7()
+        prediction_system.set_file_manager(file_manager)
+        
+        prediction_system.load_models(fresh=True)
+        prediction_system.history.load_from_csv()
+        
+        from models.progressive_learning import ProgressiveLearningManager
+        learning_manager = ProgressiveLearningManager(prediction_system)
+        learning_manager.load_learning_state()
+        
+        def on_stage_finished(finished, total, stage_id):
+            update_task_progress(finished, total, f"段階 {stage_id} が終了しました（{finished}/{total}）")
+        
+        pipeline_result = learning_manager.run_pipeline(
+            stage_ids=options.get('stage_ids'),
+            force=options.get('force', False),
+            max_workers=options.get('max_workers', 1),
+            progress_callback=on_stage_finished,
+            fidelity=options.get('fidelity', 'full')
+        )
+        
+        # モデル・状態保存
+        file_manager.save_model(prediction_system)
+        learning_manager.save_learning_state()
+        
+        return {
+            'status': 'success' if not pipeline_result['failed'] else 'error',
+            'message': '段階的学習パイプラインが完了しました' if not pipeline_result['failed']
+                       else f"失敗した段階があります: {pipeline_result['failed']}",
+            'pipeline': pipeline_result,
+            'learning_progress': learning_manager.get_learning_progress()
+        }
+        
+    except Exception as e:
+        logger.error(f"段階的学習パイプラインエラー: {e}")
+        return {
+            'status': 'error',
+            'message': str(e),
+            'traceback': traceback.format_exc()
+        }
+
 @celery_app.task(bind=True, name='tasks.get_learning_progress_task')
 def get_learning_progress_task(self):
     """学習進捗状況を取得するタスク"""
@@ -184,9 +434,10 @@ def get_learning_progress_task(self):
         
         from models.progressive_learning import ProgressiveLearningManager
         learning_manager = ProgressiveLearningManager(prediction_system)
-        learning_manager.load_learning_state()
+        learning_manager.load_learning_progress()
         
         progress_info = learning_manager.get_learning_progress()
+        annotate_stage_estimates(progress_info['available_stages'])
         
         return {
             'status': 'success',
@@ -227,8 +478,9 @@ def reset_learning_progress_task(self):
 # === 既存の一括学習タスク（後方互換性のため維持） ===
 
 @celery_app.task(bind=True, name='tasks.train_model_task')
-def train_model_task(self, options=None):
-    """モデル学習タスク（一括処理版）"""
+@with_task_profile
+def train_model_task(self, options=None, profile=None):
+    """モデル学習タスク（一括処理版 / profile: 'cpu'|'memory' で詳細計測）"""
     try:
         if options is None:
             options = {}
@@ -324,8 +576,15 @@ def train_model_task(self, options=None):
         }
 
 @celery_app.task(bind=True, name='tasks.validation_task')
-def validation_task(self):
-    """時系列検証タスク（一括処理版）"""
+@with_task_profile
+def validation_task(self, options=None):
+    """時系列検証タスク（一括処理版 / distributed=Trueで窓チャンク単位に分散）"""
+    if options is None:
+        options = {}
+    
+    if options.get('distributed'):
+        return _dispatch_distributed_validation(self, options)
+    
     try:
         update_task_progress(0, 3, "検証準備を開始しています...")
         
@@ -343,8 +602,11 @@ def validation_task(self):
         
         update_task_progress(2, 3, "時系列検証を実行しています...")
         
-        # 検証実行
-        validation_result = prediction_system.run_timeseries_validation()
+        # 検証実行（fidelity: full / screening / tiered, expanding_mode: exact / warm_start）
+        validation_result = prediction_system.run_timeseries_validation(
+            fidelity=options.get('fidelity', 'full'),
+            expanding_mode=options.get('expanding_mode', 'exact')
+        )
         
         update_task_progress(3, 3, "検証が完了しました")
         
@@ -360,4 +622,106 @@ def validation_task(self):
             'status': 'error',
             'message': str(e),
             'traceback': traceback.format_exc()
-        }
\ No newline at end of file
+        }
+
+# === 分散検証タスク ===
+
+def _load_validation_data(prediction_system, file_manager):
+    """検証用データを読み込み（キャッシュ優先、なければ取得）"""
+    fetcher = prediction_system.data_fetcher
+    cached_data = file_manager.load_data_cache()
+    
+    if cached_data is not None and len(cached_data) > 0:
+        fetcher.latest_data = cached_data
+    elif not fetcher.fetch_latest_data():
+        raise Exception("データ取得に失敗しました")
+    
+    return fetcher.latest_data, fetcher.main_columns, fetcher.round_column
+
+def _dispatch_distributed_validation(task, options):
+    """検証をチャンクに分割し、validationキューへchordで配布"""
+    from models.validation import TimeSeriesCrossValidator
+    
+    try:
+        update_task_progress(0, 2, "分散検証の準備を開始しています...")
+        
+        file_manager = FileManager()
+        prediction_system = AutoFetchEnsembleLoto7()
+        prediction_system.set_file_manager(file_manager)
+        
+        # 最新データを取得してキャッシュを更新（各チャンクはキャッシュから読み込む）
+        if not prediction_system.data_fetcher.fetch_latest_data():
+            raise Exception("データ取得に失敗しました")
+        
+        chunks = TimeSeriesCrossValidator.plan_validation_chunks(
+            len(prediction_system.data_fetcher.latest_data),
+            chunk_size=options.get('chunk_size', 5)
+        )
+        if not chunks:
+            raise Exception("検証対象の窓がありません")
+        
+        update_task_progress(1, 2, f"{len(chunks)}チャンクに分割しました")
+        
+    except Exception as e:
+        logger.error(f"分散検証準備エラー: {e}")
+        return {
+            'status': 'error',
+            'message': str(e),
+            'traceback': traceback.format_exc()
+        }
+    
+    # 集約タスクの結果がこのタスクIDの結果になる
+    header = group(
+        validation_chunk_task.s(chunk, options).set(queue='validation')
+        for chunk in chunks
+    )
+    return task.replace(chord(header, validation_reduce_task.s(options).set(queue='validation')))
+
+@celery_app.task(
+    bind=True, name='tasks.validation_chunk_task',
+    autoretry_for=(Exception,), max_retries=2, default_retry_delay=10
+)
+def validation_chunk_task(self, chunk, options=None):
+    """検証チャンク（複数テスト位置）を評価するタスク"""
+    if options is None:
+        options = {}
+    
+    from models.validation import TimeSeriesCrossValidator
+    
+    file_manager = FileManager()
+    prediction_system = AutoFetchEnsembleLoto7()
+    prediction_system.set_file_manager(file_manager)
+    
+    data, main_cols, round_col = _load_validation_data(prediction_system, file_manager)
+    if len(data) < chunk['total_rounds']:
+        raise Exception(f"データ件数が不足しています: {len(data)} < {chunk['total_rounds']}")
+    
+    validator = TimeSeriesCrossValidator(fidelity=options.get('fidelity', 'full'))
+    return validator.evaluate_chunk(data, main_cols, round_col, chunk)
+
+@celery_app.task(bind=True, name='tasks.validation_reduce_task')
+def validation_reduce_task(self, chunk_outputs, options=None):
+    """チャンク結果を集約するタスク（再試行されたチャンクは重複計上しない）"""
+    if options is None:
+        options = {}
+    
+    try:
+        from models.validation import TimeSeriesCrossValidator
+        
+        validator = TimeSeriesCrossValidator(fidelity=options.get('fidelity', 'full'))
+        validation_result = validator.merge_chunk_results(chunk_outputs)
+        
+        return {
+            'status': 'success',
+            'message': '時系列検証が完了しました',
+            'result': validation_result,
+            'chunks': len(chunk_outputs)
+        }
+        
+    except Exception as e:
+        logger.error(f"分散検証集約エラー: {e}")
+        return {
+            'status': 'error',
+            'message': str(e),
+            'traceback': traceback.format_exc()
+        }
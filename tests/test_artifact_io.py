@@ -0,0 +1,98 @@
+"""
+utils.artifact_io の制限付きUnpicklerのテスト
+"""
+
+import io
+import pickle
+from collections import Counter
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from utils.artifact_io import RestrictedUnpickler, ArtifactValidationError, restricted_load, validate_model_file
+
+
+class _RunstringGadget:
+    """numpy.testing._private.utils.runstring(code, dict) を呼び出すpickle"""
+
+    def __init__(self, code):
+        self.code = code
+
+    def __reduce__(self):
+        from numpy.testing._private.utils import runstring
+        return runstring, (self.code, {})
+
+
+def test_rejects_numpy_runstring_gadget(tmp_path):
+    marker = tmp_path / 'executed'
+    payload = pickle.dumps(_RunstringGadget(f"open({str(marker)!r}, 'w').close()"))
+
+    with pytest.raises(ArtifactValidationError, match='runstring'):
+        restricted_load(io.BytesIO(payload))
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize('module, name', [
+    ('numpy.testing._private.utils', 'runstring'),
+    ('numpy.lib.utils', 'safe_eval'),
+    ('builtins', 'eval'),
+    ('os', 'system'),
+    ('sklearn.utils', 'Bunch'),
+])
+def test_rejects_globals_outside_allowlist(module, name):
+    with pytest.raises(ArtifactValidationError):
+        RestrictedUnpickler(io.BytesIO(b'')).find_class(module, name)
+
+
+def test_loads_model_file(tmp_path):
+    X = np.random.default_rng(0).random((40, 5))
+    y = np.arange(40) % 4
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=3, max_depth=3, random_state=0).fit(scaler.transform(X), y)
+    model_data = {
+        'trained_models': {'random_forest': model}, 'scalers': {'random_forest': scaler},
+        'model_weights': {'random_forest': 1.0}, 'model_scores': {'random_forest': 0.5},
+        'freq_counter': Counter({1: 3}), 'pair_freq': {}, 'pattern_stats': {}, 'data_count': 40
+    }
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(pickle.dumps(model_data))
+
+    assert validate_model_file(str(path)) == {'models': 1, 'data_count': 40}
+    with open(path, 'rb') as f:
+        loaded = restricted_load(f)
+    np.testing.assert_array_equal(loaded['trained_models']['random_forest'].predict(X[:5]), model.predict(X[:5]))
+
+
+def test_round_trips_saved_ensemble_model(tmp_path):
+    """save_model が書く3モデル構成（RF・GB・MLP＋スケーラー）を制限付きで読み戻せる"""
+    from sklearn.base import clone
+
+    from benchmarks.synthetic import generate_draws, MAIN_COLUMNS, ROUND_COLUMN
+    from models.prediction_system import AutoFetchEnsembleLoto7
+    from models.validation import TimeSeriesCrossValidator
+    from utils.file_manager import FileManager
+
+    def build_system():
+        system = AutoFetchEnsembleLoto7()
+        system.data_fetcher.main_columns = MAIN_COLUMNS
+        system.data_fetcher.round_column = ROUND_COLUMN
+        system.models = {name: clone(model) for name, model in TimeSeriesCrossValidator().screening_models.items()}
+        return system
+
+    system = build_system()
+    assert system.train_ensemble_models(generate_draws(120, seed=0))
+    assert set(system.trained_models) == {'random_forest', 'gradient_boost', 'neural_network'}
+
+    file_manager = FileManager(base_dir=str(tmp_path), history_backend='csv', artifact_backend='local')
+    assert file_manager.save_model(system)
+    assert validate_model_file(file_manager.model_path) == {'models': 3, 'data_count': system.data_count}
+
+    restored = build_system()
+    assert file_manager.load_model(restored)
+    assert set(restored.trained_models) == set(system.trained_models)
+    assert set(restored.scalers) == set(system.scalers)
+    for name, model in system.trained_models.items():
+        X = np.random.default_rng(1).random((3, model.n_features_in_))
+        np.testing.assert_array_equal(restored.trained_models[name].predict(X), model.predict(X))
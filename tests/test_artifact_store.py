@@ -0,0 +1,273 @@
+"""
+utils.artifact_store のテスト（プロセス内のRedis互換スタンドインを使用）
+"""
+
+import re
+import json
+import random
+import threading
+
+import pytest
+
+from utils.artifact_store import (
+    RedisArtifactStore, LocalArtifactCache, ArtifactManifest, ArtifactIntegrityError, ArtifactTooLargeError
+)
+
+
+class FakeRedis:
+    """RedisArtifactStore が使うコマンドだけを実装したインメモリのRedis互換クライアント
+
+    eval は公開用Luaスクリプトと同じ処理をロック下で行う。
+    before_eval に関数を入れると、メタ情報の切り替え直前に1回だけ呼ぶ（競合の再現用）
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.RLock()
+        self.before_eval = None
+        self.memory = {'used_memory': 0, 'maxmemory': 0}
+
+    @staticmethod
+    def _bytes(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def incr(self, key):
+        with self.lock:
+            value = int(self.data.get(key, b'0')) + 1
+            self.data[key] = self._bytes(value)
+            return value
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.data[key] = self._bytes(value)
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def expire(self, key, ttl):
+        return key in self.data
+
+    def info(self, section=None):
+        return dict(self.memory)
+
+    def publish(self, channel, message):
+        return 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def eval(self, script, numkeys, *args):
+        hook, self.before_eval = self.before_eval, None
+        if hook is not None:
+            hook()
+
+        meta_key = args[0]
+        version, fields = int(args[numkeys]), args[numkeys + 2:]
+        with self.lock:
+            current = self.data.get(meta_key, {})
+            current_version = int(current.get(b'version', b'0'))
+            current_chunks = int(current.get(b'chunks', b'0'))
+            if current_version >= version:
+                return [-1, current_version]
+            self.data[meta_key] = {
+                self._bytes(fields[i]): self._bytes(fields[i + 1]) for i in range(0, len(fields), 2)
+            }
+            return [current_version, current_chunks]
+
+    def chunk_keys(self, namespace='loto7:artifacts'):
+        pattern = re.compile(re.escape(namespace) + r':.+:v\d+:\d+$')
+        return sorted(key for key in self.data if pattern.match(key))
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+        return self
+
+    def execute(self):
+        return [self.client.set(key, value, ex=ex) for key, value, ex in self.commands]
+
+
+@pytest.fixture
+def client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def store(client):
+    # 小さいチャンクで分割保存を確認する
+    return RedisArtifactStore(client, chunk_size=64)
+
+
+def _payload(size, seed=0):
+    return random.Random(seed).randbytes(size)
+
+
+def test_put_splits_into_chunks_and_reads_back(store, client):
+    data = _payload(1000)
+
+    meta = store.put('model.pkl', data)
+
+    assert meta['version'] == 1
+    assert meta['size'] == 1000
+    assert meta['chunks'] > 1
+    assert len(client.chunk_keys()) == meta['chunks']
+    assert store.get('model.pkl') == (data, store.get_meta('model.pkl'))
+
+
+def test_put_replaces_previous_version_chunks(store, client):
+    store.put('model.pkl', _payload(1000, seed=1))
+    data = _payload(600, seed=2)
+
+    meta = store.put('model.pkl', data)
+
+    assert meta['version'] == 2
+    assert all(':v2:' in key for key in client.chunk_keys())
+    assert store.get('model.pkl')[0] == data
+
+
+def test_put_accepts_file_objects(store, tmp_path):
+    path = tmp_path / 'loto7_data.csv'
+    path.write_bytes(_payload(300))
+
+    with open(path, 'rb') as f:
+        store.put('loto7_data.csv', f)
+
+    assert store.get('loto7_data.csv')[0] == path.read_bytes()
+
+
+def test_get_rejects_sha256_mismatch(store, client):
+    meta = store.put('model.pkl', _payload(500))
+    client.data[store._key('model.pkl', 'meta')][b'sha256'] = b'0' * 64
+
+    with pytest.raises(ArtifactIntegrityError, match='ハッシュ'):
+        store.get('model.pkl')
+
+    # メタ情報を渡した場合も同じく検証する
+    with pytest.raises(ArtifactIntegrityError):
+        store.get('model.pkl', dict(meta, sha256='0' * 64))
+
+
+def test_get_rejects_missing_chunks(store, client):
+    meta = store.put('model.pkl', _payload(500))
+    client.delete(store._key('model.pkl', f"v{meta['version']}", 0))
+
+    with pytest.raises(ArtifactIntegrityError, match='欠けています'):
+        store.get('model.pkl')
+
+
+def test_get_unknown_artifact(store):
+    assert store.get('model.pkl') == (None, None)
+    assert store.version('model.pkl') == 0
+
+
+def test_put_rejects_artifact_over_size_cap(client):
+    store = RedisArtifactStore(client, chunk_size=64, max_bytes=256)
+    published = _payload(100, seed=5)
+    store.put('model.pkl', published)
+
+    with pytest.raises(ArtifactTooLargeError):
+        store.put('model.pkl', _payload(1000, seed=6))
+
+    # 書きかけのチャンクは残さず、公開中のバージョンはそのまま読める
+    assert all(':v1:' in key for key in client.chunk_keys())
+    assert store.get('model.pkl')[0] == published
+
+
+def test_put_keeps_redis_memory_headroom(client):
+    store = RedisArtifactStore(client, chunk_size=64, max_bytes=0, memory_headroom=0.5)
+    client.memory = {'used_memory': 9000, 'maxmemory': 20000}
+
+    with pytest.raises(ArtifactTooLargeError):
+        store.put('model.pkl', _payload(2000, seed=7))
+    assert client.chunk_keys() == []
+
+    store.put('model.pkl', _payload(500, seed=8))
+    assert store.version('model.pkl') == 2
+
+    client.memory = {'used_memory': 10000, 'maxmemory': 20000}
+    with pytest.raises(ArtifactTooLargeError, match='空きメモリ'):
+        store.put('model.pkl', b'x')
+
+
+def test_older_writer_loses_publish_race(store, client):
+    older, newer = _payload(400, seed=3), _payload(700, seed=4)
+
+    # 先に番号を取った書き手がメタ情報を切り替える直前に、後の書き手が公開を終える
+    client.before_eval = lambda: store.put('model.pkl', newer)
+    meta = store.put('model.pkl', older)
+
+    assert meta['version'] == 2
+    assert store.get('model.pkl')[0] == newer
+    # 負けた側のチャンクは削除され、公開中のチャンクは残る
+    assert client.chunk_keys() and all(':v2:' in key for key in client.chunk_keys())
+
+
+def test_local_cache_pulls_only_new_versions(store, tmp_path):
+    worker_dir, web_dir = tmp_path / 'worker', tmp_path / 'web'
+    worker_dir.mkdir()
+    web_dir.mkdir()
+    worker = LocalArtifactCache(store, str(worker_dir))
+    web = LocalArtifactCache(store, str(web_dir))
+
+    assert web.pull('model.pkl') is False
+
+    (worker_dir / 'model.pkl').write_bytes(b'first')
+    worker.push('model.pkl')
+    assert web.pull('model.pkl') is True
+    assert (web_dir / 'model.pkl').read_bytes() == b'first'
+    assert web.synced_version('model.pkl') == 1
+
+    # バージョンが変わらなければ再取得しない
+    assert web.pull('model.pkl') is False
+
+    (worker_dir / 'model.pkl').write_bytes(b'second')
+    worker.push('model.pkl')
+    assert web.pull('model.pkl') is True
+    assert (web_dir / 'model.pkl').read_bytes() == b'second'
+    assert web.manifest.entry('model.pkl')['store_version'] == 2
+
+
+def test_manifest_versions_survive_concurrent_writers(tmp_path):
+    writers, records = 8, 25
+    names = ('model.pkl', 'loto7_data.csv')
+    errors = []
+
+    def write(index):
+        # プロセス間と同じく、書き手ごとに別のマニフェストインスタンスを使う
+        manifest = ArtifactManifest(str(tmp_path))
+        try:
+            for _ in range(records):
+                manifest.record(names[index % len(names)], writer=index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with open(tmp_path / ArtifactManifest.MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for name in names:
+        assert manifest[name]['version'] == writers * records // len(names)
+    assert ArtifactManifest(str(tmp_path)).version('model.pkl') == writers * records // len(names)
@@ -0,0 +1,37 @@
+"""
+utils.celery_health のスナップショット取得のテスト
+"""
+
+from types import SimpleNamespace
+
+from utils.celery_health import CeleryHealthMonitor
+
+
+class _UnreachableBroker(SimpleNamespace):
+    def connection_for_read(self):
+        raise ConnectionError('broker down')
+
+
+def _monitor():
+    return CeleryHealthMonitor(_UnreachableBroker(conf=SimpleNamespace(task_routes={}, task_default_queue=None)))
+
+
+def test_collectors_run_with_snapshot_even_when_broker_is_down():
+    monitor = _monitor()
+    calls = []
+    monitor.add_collector('files', lambda: calls.append('files') or {'model_exists': True})
+    monitor.add_collector('tasks', lambda: 1 / 0)
+
+    assert monitor.collected('files') is None
+    assert monitor.collected('tasks', {}) == {}
+
+    snapshot = monitor.collect()
+
+    assert snapshot['broker_connected'] is False
+    assert calls == ['files']
+    assert monitor.collected('files') == {'model_exists': True}
+    assert 'error' in monitor.collected('tasks')
+
+    # 参照しても再取得しない
+    monitor.collected('files')
+    assert calls == ['files']
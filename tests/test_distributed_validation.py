@@ -0,0 +1,126 @@
+"""
+分散時系列検証（validation_task の chord 分配と validation_reduce_task の集約）のテスト
+Celeryはeagerモード・メモリ上の結果バックエンドで実行する
+"""
+
+import functools
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.neural_network import MLPClassifier
+
+import tasks
+from benchmarks.synthetic import generate_draws
+from celery_app import celery_app
+from models.data_fetcher import AutoDataFetcher
+from models.validation import TimeSeriesCrossValidator
+from utils.file_manager import FileManager
+
+ROWS = 45
+
+
+@pytest.fixture
+def eager_celery(monkeypatch):
+    for key, value in {
+        'task_always_eager': True,
+        'task_eager_propagates': True,
+        'broker_url': 'memory://',
+        'result_backend': 'cache+memory://',
+    }.items():
+        monkeypatch.setitem(celery_app.conf, key, value)
+
+
+@pytest.fixture(autouse=True)
+def tiny_screening_models(monkeypatch):
+    """窓ごとの学習・予測を短くするため、スクリーニング用モデルを最小構成にし予測セット数を減らす"""
+    init = TimeSeriesCrossValidator.__init__
+    generate = TimeSeriesCrossValidator.generate_validation_predictions
+
+    def patched_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self.screening_models = {
+            'random_forest': RandomForestClassifier(n_estimators=2, max_depth=3, random_state=0, n_jobs=1),
+            'gradient_boost': GradientBoostingClassifier(n_estimators=1, max_depth=1, random_state=0),
+            'neural_network': MLPClassifier(hidden_layer_sizes=(4,), max_iter=5, random_state=0),
+        }
+
+    monkeypatch.setattr(TimeSeriesCrossValidator, '__init__', patched_init)
+    monkeypatch.setattr(TimeSeriesCrossValidator, 'generate_validation_predictions',
+                        lambda self, model_data, freq_counter, count=20: generate(self, model_data, freq_counter, 2))
+
+
+@pytest.fixture
+def draws(monkeypatch, tmp_path):
+    """ネットワークの代わりに合成データを返し、ファイルは一時ディレクトリに置く"""
+    data = generate_draws(ROWS, seed=0)
+
+    def fetch_latest_data(self):
+        self.latest_data = data.copy()
+        self.cache_manager.save_data_cache(self.latest_data)
+        return True
+
+    monkeypatch.setattr(AutoDataFetcher, 'fetch_latest_data', fetch_latest_data)
+    monkeypatch.setattr(tasks, 'FileManager', functools.partial(
+        FileManager, base_dir=str(tmp_path), history_backend='csv', artifact_backend='local'
+    ))
+    return data
+
+
+def test_chord_fans_out_chunks_and_merges(eager_celery, draws, monkeypatch):
+    options = {'distributed': True, 'fidelity': 'screening', 'chunk_size': 4}
+    chunks = TimeSeriesCrossValidator.plan_validation_chunks(ROWS, chunk_size=4)
+
+    evaluated, merged = [], []
+    evaluate_chunk = TimeSeriesCrossValidator.evaluate_chunk
+    merge_chunk_results = TimeSeriesCrossValidator.merge_chunk_results
+
+    def spy_evaluate(self, data, main_cols, round_col, chunk):
+        evaluated.append(chunk['chunk_id'])
+        return evaluate_chunk(self, data, main_cols, round_col, chunk)
+
+    def spy_merge(self, chunk_outputs):
+        merged.append(self)
+        return merge_chunk_results(self, chunk_outputs)
+
+    monkeypatch.setattr(TimeSeriesCrossValidator, 'evaluate_chunk', spy_evaluate)
+    monkeypatch.setattr(TimeSeriesCrossValidator, 'merge_chunk_results', spy_merge)
+
+    result = tasks.validation_task.apply(kwargs={'options': options}).get()
+
+    assert result['status'] == 'success'
+    assert result['chunks'] == len(chunks) > 1
+    assert sorted(evaluated) == sorted(chunk['chunk_id'] for chunk in chunks)
+
+    # 全チャンクのテスト位置が窓ごとに1回ずつ集約される
+    validator, = merged
+    for chunk in chunks:
+        if chunk['kind'] == 'fixed':
+            tested = [r['test_idx'] for r in validator.fixed_window_results[chunk['size']]]
+        else:
+            tested = [r['test_idx'] for r in validator.expanding_window_results]
+        assert set(chunk['test_indices']) <= set(tested)
+    assert sum(len(results) for results in validator.fixed_window_results.values()) == \
+        sum(len(chunk['test_indices']) for chunk in chunks if chunk['kind'] == 'fixed')
+
+
+def test_reduce_ignores_duplicate_chunk_outputs(eager_celery, draws):
+    options = {'fidelity': 'screening'}
+    chunks = TimeSeriesCrossValidator.plan_validation_chunks(ROWS, chunk_size=4)
+    outputs = [tasks.validation_chunk_task.apply(args=(chunk, options)).get() for chunk in chunks]
+
+    once = tasks.validation_reduce_task.apply(args=(outputs, options)).get()
+    # 再試行で同じチャンクが重複して届いても結果は変わらない
+    twice = tasks.validation_reduce_task.apply(args=(outputs + outputs[:2] + [None], options)).get()
+
+    assert once['status'] == twice['status'] == 'success'
+    assert once['result'] == twice['result']
+
+
+def test_replaced_task_does_not_publish_ignored(monkeypatch):
+    events = []
+    monkeypatch.setattr(tasks, 'publish_task_event', lambda task_id, state, **info: events.append(state))
+
+    tasks.publish_task_finished(task_id='abc', state='IGNORED')
+    tasks.publish_task_finished(task_id='abc', state='SUCCESS')
+
+    assert events == ['SUCCESS']
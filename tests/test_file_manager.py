@@ -0,0 +1,89 @@
+"""
+utils.file_manager の読み込み済みモデルの再利用のテスト
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from models.learning import AutoVerificationLearner
+from utils.file_manager import FileManager
+
+
+class _CapturingEvents:
+    """受信スレッドを起動せず、更新通知のコールバックだけを受け取るイベントバス"""
+
+    def start_listener(self, callback, **kwargs):
+        self.callback = callback
+        kwargs['on_connect']()
+
+
+def _system():
+    return SimpleNamespace(
+        trained_models={}, scalers={}, model_weights={}, model_scores={},
+        freq_counter=None, pair_freq=None, pattern_stats=None, data_count=0,
+        auto_learner=AutoVerificationLearner()
+    )
+
+
+def _trained_system(n_estimators=3):
+    X = np.random.default_rng(0).random((40, 5))
+    y = np.arange(40) % 4
+    scaler = StandardScaler().fit(X)
+    system = _system()
+    system.trained_models = {'random_forest': RandomForestClassifier(n_estimators=n_estimators, max_depth=3, random_state=0).fit(scaler.transform(X), y)}
+    system.scalers = {'random_forest': scaler}
+    system.model_weights = {'random_forest': 1.0}
+    system.data_count = 40
+    return system
+
+
+@pytest.fixture
+def file_manager(tmp_path):
+    file_manager = FileManager(base_dir=str(tmp_path), history_backend='csv', artifact_backend='local')
+    file_manager.save_model(_trained_system())
+    return file_manager
+
+
+def test_read_only_loads_share_estimators_until_version_changes(file_manager):
+    first, second = _system(), _system()
+    assert file_manager.load_model(first) and file_manager.load_model(second)
+
+    assert second.trained_models['random_forest'] is first.trained_models['random_forest']
+    # コンテナは呼び出しごとに別物なので、差し替えても他に影響しない
+    second.model_weights['random_forest'] = 0.5
+    second.auto_learner.improvement_metrics['frequently_missed'] = [(1, 2)]
+    third = _system()
+    file_manager.load_model(third)
+    assert third.model_weights['random_forest'] == 1.0
+    assert 'frequently_missed' not in third.auto_learner.improvement_metrics
+
+    file_manager.save_model(_trained_system(n_estimators=4))
+    reloaded = _system()
+    file_manager.load_model(reloaded)
+    assert reloaded.trained_models['random_forest'].n_estimators == 4
+
+
+def test_fresh_load_does_not_share_estimators(file_manager):
+    shared, fresh = _system(), _system()
+    file_manager.load_model(shared)
+    file_manager.load_model(fresh, fresh=True)
+
+    assert fresh.trained_models['random_forest'] is not shared.trained_models['random_forest']
+
+
+def test_update_notification_drops_loaded_model(file_manager):
+    events = _CapturingEvents()
+    file_manager._events = events
+    assert file_manager.watch_artifacts()
+
+    before = _system()
+    file_manager.load_model(before)
+    events.callback('model.pkl', 2)
+
+    after = _system()
+    file_manager.load_model(after)
+    assert after.trained_models['random_forest'] is not before.trained_models['random_forest']
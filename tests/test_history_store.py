@@ -0,0 +1,63 @@
+"""
+utils.history_store のSQLite予測履歴ストアのテスト
+"""
+
+from utils.file_manager import FileManager
+from utils.history_store import SQLiteHistoryStore
+from utils.prediction_entry import PredictionEntry
+
+
+def _entry(round_number, verified=False):
+    predictions = [[(round_number + i + k) % 37 + 1 for k in range(7)] for i in range(3)]
+    entry = PredictionEntry(round_number, '2024-01-01 00:00:00', predictions)
+    if verified:
+        entry['actual'] = list(range(1, 8))
+        entry['matches'] = [len(set(p) & set(range(1, 8))) for p in predictions]
+        entry['verified'] = True
+    return entry
+
+
+def test_upsert_writes_only_new_and_changed_rounds(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    entries = [_entry(1), _entry(2), _entry(3)]
+
+    assert store.upsert_entries(entries) == 3
+    assert store.upsert_entries(entries) == 0
+
+    entries[1] = _entry(2, verified=True)
+    entries.append(_entry(4))
+    assert store.upsert_entries(entries) == 2
+
+    loaded = {entry['round']: entry for entry in store.load_entries()}
+    assert sorted(loaded) == [1, 2, 3, 4]
+    assert loaded[2]['verified'] and list(loaded[2]['matches']) == list(entries[1]['matches'])
+    assert store.unverified_rounds() == [1, 3, 4]
+
+    histogram, verified_rounds = store.load_accuracy_aggregates()
+    assert verified_rounds == 1
+    assert sum(histogram) == len(entries[1]['matches'])
+
+    # 照合結果が変わった開催回はヒストグラムを差し替える（二重に数えない）
+    entries[1]['matches'] = [7, 7, 7]
+    entries[1]['actual'] = entries[1]['predictions'][0]
+    assert store.upsert_entries(entries) == 1
+    histogram, _ = store.load_accuracy_aggregates()
+    assert histogram[7] == 3 and sum(histogram) == 3
+
+
+def test_upsert_keeps_rounds_missing_from_entries(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    store.upsert_entries([_entry(1), _entry(2)])
+
+    assert store.upsert_entries([_entry(2)]) == 0
+    assert store.count() == 2
+
+
+def test_sqlite_history_is_not_used_with_shared_artifacts(tmp_path):
+    file_manager = FileManager(base_dir=str(tmp_path), history_backend='sqlite', artifact_backend='local')
+    assert file_manager.get_history_store() is not None
+
+    file_manager.set_artifact_store(object())
+
+    assert file_manager.history_backend == 'csv'
+    assert file_manager.get_history_store() is None
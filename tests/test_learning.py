@@ -0,0 +1,55 @@
+"""
+models.learning の学習済み開催回の管理のテスト
+"""
+
+from types import SimpleNamespace
+
+import pandas as pd
+
+from models.learning import AutoVerificationLearner
+
+MAIN_COLUMNS = [f'main{i}' for i in range(1, 8)]
+
+
+def _history(rounds):
+    predictions = [{'round': round_num, 'verified': False, 'predictions': [[1, 2, 3, 4, 5, 6, 7]]} for round_num in rounds]
+    return SimpleNamespace(predictions=predictions)
+
+
+def _draws(rounds):
+    return pd.DataFrame([[round_num, 1, 2, 3, 10, 11, 12, 13] for round_num in rounds], columns=['round'] + MAIN_COLUMNS)
+
+
+def _learn(learner, rounds, drawn):
+    return learner.verify_and_learn(_history(rounds), _draws(drawn), MAIN_COLUMNS, 'round')
+
+
+def test_late_round_is_learned_once():
+    learner = AutoVerificationLearner()
+    assert _learn(learner, [100, 102], [100, 102]) == 2
+
+    # 古い回の結果が後から届いても学習する
+    assert _learn(learner, [100, 101, 102], [100, 101, 102]) == 1
+    assert _learn(learner, [100, 101, 102], [100, 101, 102]) == 0
+    assert learner.verified_total == 3
+
+
+def test_learned_rounds_are_bounded_and_survive_state_round_trip(monkeypatch):
+    monkeypatch.setattr(AutoVerificationLearner, 'LEARNED_ROUNDS', 3)
+    learner = AutoVerificationLearner()
+    _learn(learner, [1, 2, 4, 5, 6], [1, 2, 4, 5, 6])
+
+    assert learner.learned_rounds == {4, 5, 6}
+    assert learner.learned_floor == 2
+
+    restored = AutoVerificationLearner()
+    restored.load_state(learner.get_state())
+    # 畳み込み済みの回は再学習せず、保持範囲内の欠番は学習する
+    assert _learn(restored, [1, 3, 5], [1, 3, 5]) == 1
+
+
+def test_version_1_state_treats_watermark_as_learned():
+    learner = AutoVerificationLearner()
+    learner.load_state({'version': 1, 'last_learned_round': 10})
+
+    assert _learn(learner, [9, 10, 11], [9, 10, 11]) == 1
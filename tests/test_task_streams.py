@@ -0,0 +1,90 @@
+"""
+タスク進捗のSSE・ロングポーリングAPIの同時接続数制限のテスト
+"""
+
+import threading
+
+import pytest
+
+import app as app_module
+from utils.task_events import TaskEventBus
+
+
+class _NoListenerBus(TaskEventBus):
+    """受信スレッドを起動しないイベントバス（購読の登録・解除だけを確認する）"""
+
+    def __init__(self):
+        super().__init__(client=None)
+        self._listener = threading.Thread()
+        self._listener.is_alive = lambda: True
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = _NoListenerBus()
+    monkeypatch.setattr(app_module.tasks, 'get_task_events', lambda: bus)
+    monkeypatch.setattr(app_module, 'get_task_status', lambda task_id: {'task_id': task_id, 'state': 'PENDING'})
+    monkeypatch.setattr(app_module, 'wait_slots', threading.BoundedSemaphore(2))
+    return bus
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def test_stream_returns_503_when_slots_are_taken(bus, client):
+    app_module.wait_slots.acquire()
+    app_module.wait_slots.acquire()
+
+    response = client.get('/api/task/abc/events')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    assert response.get_json()['details']['poll_url'] == '/api/task/abc/wait'
+    assert bus._subscriptions == {}
+
+
+def test_unread_stream_releases_slot_without_subscribing(bus, client):
+    for _ in range(3):
+        response = client.get('/api/task/abc/events', buffered=False)
+        assert response.status_code == 200
+        # 本文を読まずに切断しても購読は作られず、枠は返される
+        response.close()
+
+    assert bus._subscriptions == {}
+    assert app_module.wait_slots.acquire(blocking=False)
+    assert app_module.wait_slots.acquire(blocking=False)
+
+
+def test_stream_closes_subscription_after_terminal_state(bus, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_task_status', lambda task_id: {'task_id': task_id, 'state': 'SUCCESS'})
+
+    response = client.get('/api/task/abc/events')
+
+    assert b'SUCCESS' in response.data
+    assert bus._subscriptions == {}
+    assert app_module.wait_slots.acquire(blocking=False)
+
+
+def test_wait_answers_immediately_when_slots_are_taken(bus, client, monkeypatch):
+    app_module.wait_slots.acquire()
+    app_module.wait_slots.acquire()
+    monkeypatch.setattr(app_module, 'wait_for_task_status', lambda *args: pytest.fail('待機してはいけない'))
+
+    response = client.get('/api/task/abc/wait?timeout=30')
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['state'] == 'PENDING'
+
+
+def test_head_probe_reports_busy_slots_without_holding_one(bus, client):
+    # クライアントはSSEの失敗理由（接続数超過か）をHEADで確認する
+    assert client.head('/api/task/abc/events').status_code == 200
+    assert bus._subscriptions == {}
+    assert app_module.wait_slots.acquire(blocking=False)
+    app_module.wait_slots.release()
+
+    app_module.wait_slots.acquire()
+    app_module.wait_slots.acquire()
+    assert client.head('/api/task/abc/events').status_code == 503
@@ -0,0 +1,68 @@
+"""
+models.validation の累積窓warm_start検証のテスト
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from benchmarks.synthetic import generate_draws, MAIN_COLUMNS, ROUND_COLUMN
+from models.validation import TimeSeriesCrossValidator
+
+
+def _tiny_models(n_estimators):
+    return {
+        'random_forest': RandomForestClassifier(n_estimators=n_estimators, max_depth=3, random_state=0, n_jobs=1),
+        'gradient_boost': GradientBoostingClassifier(n_estimators=n_estimators, max_depth=1, random_state=0),
+        'neural_network': MLPClassifier(hidden_layer_sizes=(4,), max_iter=5, random_state=0),
+    }
+
+
+@pytest.fixture
+def validator():
+    validator = TimeSeriesCrossValidator(fidelity='tiered', confirm_rate=0.5, confirm_threshold=8)
+    # ティアの区別がつくよう、軽量とフルで木の数を変える
+    validator.screening_models = _tiny_models(2)
+    validator.validation_models = _tiny_models(3)
+    return validator
+
+
+def test_tiered_warm_start_screens_and_confirms_with_full_chain(validator, monkeypatch):
+    advanced = []
+    advance = TimeSeriesCrossValidator._advance_warm_chain
+
+    def spy(self, chain, data, main_cols, train_end, tier):
+        advanced.append(tier)
+        return advance(self, chain, data, main_cols, train_end, tier)
+
+    monkeypatch.setattr(TimeSeriesCrossValidator, '_advance_warm_chain', spy)
+    data = generate_draws(40, seed=0)
+
+    results = validator.expanding_window_validation(data, MAIN_COLUMNS, ROUND_COLUMN, initial_size=30, mode='warm_start')
+
+    assert results and all(result['fidelity'] == 'screening' for result in results)
+    confirmed = [result for result in results if 'confirmation' in result]
+    # 2窓に1回（confirm_rate=0.5）だけフルモデルのチェーンを進めて確認する
+    assert len(confirmed) == (len(results) + 1) // 2
+    assert advanced.count('screening') == len(results)
+    assert advanced.count('full') == len(confirmed)
+    assert len(validator.fidelity_pairs['expanding']) == len(confirmed)
+
+
+def test_gradient_boost_refits_when_stage_cap_is_reached(validator):
+    rng = np.random.default_rng(0)
+    X_all = rng.random((60, 4))
+    y_all = np.arange(60) % 3
+    template = validator.validation_models['gradient_boost']
+    scaler = StandardScaler().fit(X_all)
+
+    model = GradientBoostingClassifier(n_estimators=template.n_estimators * 2, max_depth=1, random_state=0)
+    model.fit(scaler.transform(X_all), y_all)
+
+    updated, _ = validator._warm_update_model(model, scaler, template, X_all, y_all, X_all[-5:], y_all[-5:])
+
+    assert updated is not model
+    assert updated.n_estimators == template.n_estimators
+    assert len(updated.estimators_) == template.n_estimators
@@ -0,0 +1,33 @@
+"""
+app.FileViewCache の生成済みレスポンス保持のテスト
+"""
+
+import app as app_module
+from app import FileViewCache
+
+
+def test_only_common_counts_are_kept(tmp_path, monkeypatch):
+    cache = FileViewCache()
+    monkeypatch.setattr(app_module, 'view_cache', cache)
+    path = tmp_path / 'data.csv'
+    path.write_text('x')
+    entry = cache.get('data', [str(path)], lambda: 'data')
+    monkeypatch.setattr(app_module, '_build_recent_results', lambda data, count: {'count': count})
+
+    for count in (5, 7, 10, 13):
+        assert app_module.recent_results_response(entry, count) == {'count': count}
+
+    assert set(entry['responses']) == {('recent', 5), ('recent', 10)}
+
+
+def test_recent_response_is_bounded_and_skips_misses(tmp_path):
+    cache = FileViewCache()
+    path = tmp_path / 'history.csv'
+    path.write_text('x')
+    entry = cache.get('history', [str(path)], lambda: {1: 'a', 2: 'b', 3: 'c'})
+
+    for key in (1, 2, 99, 1, 3):
+        cache.recent_response(entry, ('detail', key), lambda history, key=key: history.get(key), limit=2)
+
+    # 見つからなかった開催回は保持せず、古いものから追い出す
+    assert list(entry['recent_responses']) == [('detail', 1), ('detail', 3)]
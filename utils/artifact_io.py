@@ -0,0 +1,203 @@
+"""
+アーティファクト入出力ユーティリティ
+アップロードのストリーミング保存・SHA-256計算・モデル/CSVの構造検証
+"""
+
+import os
+import uuid
+import pickle
+import hashlib
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+MAIN_NUMBER_RANGE = (1, 37)
+
+# CSVアーティファクトの必須列と番号列
+CSV_SCHEMAS = {
+    'prediction_history.csv': {
+        'required': ['round', 'date', 'verified', 'prediction_idx'] + [f'pred_{i+1}' for i in range(7)],
+        'integer': ['round', 'prediction_idx'],
+        'numbers': [f'pred_{i+1}' for i in range(7)]
+    },
+    'loto7_data.csv': {
+        'required': ['開催回'] + [f'第{i+1}数字' for i in range(7)],
+        'integer': ['開催回'],
+        'numbers': [f'第{i+1}数字' for i in range(7)]
+    }
+}
+
+MODEL_REQUIRED_KEYS = (
+    'trained_models', 'scalers', 'model_weights', 'model_scores',
+    'freq_counter', 'pair_freq', 'pattern_stats', 'data_count'
+)
+
+class ArtifactValidationError(Exception):
+    """アップロードされたアーティファクトが不正"""
+
+def file_sha256(path, chunk_size=STREAM_CHUNK_SIZE):
+    """ファイルのSHA-256を計算"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def stream_to_temp(stream, dest_dir, prefix='upload', chunk_size=STREAM_CHUNK_SIZE, max_bytes=None):
+    """ストリームを一時ファイルへ分割コピーし、(一時パス, SHA-256, サイズ) を返す"""
+    tmp_path = os.path.join(dest_dir, f".{prefix}.{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ArtifactValidationError(f"ファイルサイズが上限（{max_bytes} bytes）を超えています")
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+class RestrictedUnpickler(pickle.Unpickler):
+    """モデルファイル用の制限付きUnpickler（学習モデルの構成に必要なクラスのみ許可）
+
+    モジュール単位で許可すると numpy.testing などに含まれる任意コード実行の関数まで
+    読み込めてしまうため、(モジュール, 名前) の組で明示的に許可する。
+    学習モデルの構成を変えたときは model.pkl が参照するグローバルをここに追加すること
+    """
+
+    ALLOWED_GLOBALS = frozenset({
+        # 標準ライブラリ
+        ('collections', 'Counter'),
+        ('collections', 'OrderedDict'),
+        ('collections', 'defaultdict'),
+        ('datetime', 'datetime'),
+        ('datetime', 'date'),
+        ('datetime', 'timedelta'),
+        ('copyreg', '_reconstructor'),
+        ('_codecs', 'encode'),
+        # numpy（配列・スカラー・乱数状態。numpy<2 の旧モジュール名も含む）
+        ('numpy', 'dtype'),
+        ('numpy', 'ndarray'),
+        ('numpy._core.multiarray', '_reconstruct'),
+        ('numpy._core.multiarray', 'scalar'),
+        ('numpy._core.numeric', '_frombuffer'),
+        ('numpy.core.multiarray', '_reconstruct'),
+        ('numpy.core.multiarray', 'scalar'),
+        ('numpy.core.numeric', '_frombuffer'),
+        ('numpy.random._pickle', '__bit_generator_ctor'),
+        ('numpy.random._pickle', '__randomstate_ctor'),
+        ('numpy.random._pickle', '__generator_ctor'),
+        ('numpy.random._mt19937', 'MT19937'),
+        ('numpy.random._pcg64', 'PCG64'),
+        # scikit-learn（アンサンブルで使う推定器とその内部状態）
+        ('sklearn.ensemble._forest', 'RandomForestClassifier'),
+        ('sklearn.ensemble._gb', 'GradientBoostingClassifier'),
+        ('sklearn.ensemble._gb_losses', 'BinomialDeviance'),
+        ('sklearn.ensemble._gb_losses', 'MultinomialDeviance'),
+        ('sklearn.ensemble._gb_losses', 'ExponentialLoss'),
+        ('sklearn.neural_network._multilayer_perceptron', 'MLPClassifier'),
+        ('sklearn.neural_network._stochastic_optimizers', 'AdamOptimizer'),
+        ('sklearn.neural_network._stochastic_optimizers', 'SGDOptimizer'),
+        ('sklearn.tree._classes', 'DecisionTreeClassifier'),
+        ('sklearn.tree._classes', 'DecisionTreeRegressor'),
+        ('sklearn.tree._tree', 'Tree'),
+        ('sklearn.dummy', 'DummyClassifier'),
+        ('sklearn.preprocessing._data', 'StandardScaler'),
+        ('sklearn.preprocessing._label', 'LabelBinarizer'),
+        ('sklearn._loss.loss', 'HalfMultinomialLoss'),
+        ('sklearn._loss.loss', 'HalfBinomialLoss'),
+        ('sklearn._loss.link', 'Interval'),
+        ('sklearn._loss.link', 'MultinomialLogit'),
+        ('sklearn._loss.link', 'LogitLink'),
+        ('sklearn._loss._loss', 'CyHalfMultinomialLoss'),
+        ('sklearn._loss._loss', '__pyx_unpickle_CyHalfMultinomialLoss'),
+        ('sklearn._loss._loss', 'CyHalfBinomialLoss'),
+        ('sklearn._loss._loss', '__pyx_unpickle_CyHalfBinomialLoss'),
+    })
+    SAFE_BUILTINS = {
+        'dict', 'list', 'tuple', 'set', 'frozenset', 'int', 'float', 'complex',
+        'bool', 'str', 'bytes', 'bytearray', 'slice', 'range', 'object'
+    }
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED_GLOBALS:
+            return super().find_class(module, name)
+        if module == 'builtins' and name in self.SAFE_BUILTINS:
+            return super().find_class(module, name)
+        raise ArtifactValidationError(f"許可されていないオブジェクトを含みます: {module}.{name}")
+
+def restricted_load(f):
+    """制限付きUnpicklerでpickleを読み込む（モデルファイルの読み込みは必ずこれを通す）"""
+    return RestrictedUnpickler(f).load()
+
+def validate_model_file(path):
+    """モデルpickleの構造を検証（制限付きUnpicklerで読み込み）"""
+    try:
+        with open(path, 'rb') as f:
+            model_data = restricted_load(f)
+    except ArtifactValidationError:
+        raise
+    except Exception as e:
+        raise ArtifactValidationError(f"モデルファイルを読み込めません: {e}")
+
+    if not isinstance(model_data, dict):
+        raise ArtifactValidationError("モデルファイルの形式が不正です（辞書ではありません）")
+
+    missing = [key for key in MODEL_REQUIRED_KEYS if key not in model_data]
+    if missing:
+        raise ArtifactValidationError(f"モデルファイルに必須項目がありません: {missing}")
+
+    trained_models = model_data['trained_models']
+    if not isinstance(trained_models, dict) or not all(hasattr(m, 'predict') for m in trained_models.values()):
+        raise ArtifactValidationError("trained_models の形式が不正です")
+
+    return {'models': len(trained_models), 'data_count': model_data['data_count']}
+
+def validate_csv_file(path, filename):
+    """CSVアーティファクトの列・値を検証"""
+    schema = CSV_SCHEMAS.get(filename)
+    if schema is None:
+        raise ArtifactValidationError(f"スキーマが定義されていないCSVです: {filename}")
+
+    try:
+        df = pd.read_csv(path, encoding='utf-8')
+    except Exception as e:
+        raise ArtifactValidationError(f"CSVを読み込めません: {e}")
+
+    missing = [col for col in schema['required'] if col not in df.columns]
+    if missing:
+        raise ArtifactValidationError(f"必須列がありません: {missing}")
+
+    for col in schema['integer'] + schema['numbers']:
+        values = pd.to_numeric(df[col], errors='coerce')
+        if values.isna().any() or (values % 1 != 0).any():
+            raise ArtifactValidationError(f"列 {col} に整数でない値があります")
+
+    low, high = MAIN_NUMBER_RANGE
+    numbers = df[schema['numbers']].to_numpy()
+    if len(numbers) and (numbers.min() < low or numbers.max() > high):
+        raise ArtifactValidationError(f"番号が範囲外です（{low}〜{high}）")
+
+    return {'rows': len(df), 'columns': list(df.columns)}
+
+def validate_artifact(path, filename):
+    """ファイル名に応じてアーティファクトを検証"""
+    if filename.endswith('.pkl'):
+        return validate_model_file(path)
+    if filename.endswith('.csv'):
+        return validate_csv_file(path, filename)
+    raise ArtifactValidationError(f"検証方法が定義されていないファイルです: {filename}")
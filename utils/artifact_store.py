@@ -0,0 +1,380 @@
+"""
+共有アーティファクトストア（Redis版）
+Webとワーカーでディスクが分かれていても model.pkl・履歴CSV・データキャッシュを共有する。
+ファイルは圧縮・分割してバージョン付きで保存し、各プロセスはローカルディスクを
+読み込みキャッシュとして使う（バージョンが変わったときだけ再取得）。
+バージョンはマニフェストに記録し、変更はPub/Subで他プロセスへ通知する
+"""
+
+import io
+import os
+import json
+import zlib
+import fcntl
+import socket
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class ArtifactIntegrityError(Exception):
+    """取得したアーティファクトのハッシュが一致しない"""
+
+class ArtifactTooLargeError(Exception):
+    """アーティファクトがサイズ上限またはRedisの空きメモリを超える"""
+
+class RedisArtifactStore:
+    """バージョン付きアーティファクトをRedisに保存するストア
+
+    キー構成:
+        {namespace}:{name}:version            最新バージョン番号（INCR）
+        {namespace}:{name}:meta               最新バージョンのメタ情報（ハッシュ）
+        {namespace}:{name}:v{version}:{index} 圧縮データの分割チャンク
+    """
+
+    CHUNK_SIZE = 512 * 1024
+    COMPRESS_LEVEL = 6
+
+    # RedisはCeleryのブローカーを兼ねるため、アーティファクトで満杯にしない。
+    # 1ファイルの圧縮後サイズの上限と、書き込み後の使用量がmaxmemoryに占める割合の上限
+    MAX_BYTES = 16 * 1024 * 1024
+    MEMORY_HEADROOM = 0.5
+
+    def __init__(self, client, namespace='loto7:artifacts', chunk_size=None, max_bytes=None, memory_headroom=None):
+        self.client = client
+        self.namespace = namespace
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        self.memory_headroom = self.MEMORY_HEADROOM if memory_headroom is None else memory_headroom
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Redis URLからストアを作成"""
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _key(self, name, *parts):
+        return ':'.join([self.namespace, name, *[str(p) for p in parts]])
+
+    # メタ情報の切り替えをバージョン比較と一緒に原子的に行う。
+    # 既に同じか新しいバージョンが公開されていれば何もしない（-1）。
+    # 切り替えた場合は置き換えたバージョン番号とそのチャンク数を返す（初回は0）
+    _PUBLISH_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '0')
+local current_chunks = tonumber(redis.call('HGET', KEYS[1], 'chunks') or '0')
+local version = tonumber(ARGV[1])
+if current >= version then
+    return {-1, current}
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+local ttl = tonumber(ARGV[2])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return {current, current_chunks}
+"""
+
+    def _chunk_keys(self, name, version, count):
+        return [self._key(name, f'v{version}', index) for index in range(count)]
+
+    def _write_budget(self):
+        """今回の書き込みで使える圧縮後バイト数（上限なしならNone）
+
+        max_bytes と、maxmemory × memory_headroom から現在の使用量を引いた残りの小さい方"""
+        budget = self.max_bytes or None
+        if not self.memory_headroom:
+            return budget
+
+        try:
+            info = self.client.info('memory')
+        except Exception as e:
+            logger.warning(f"Redisのメモリ情報を取得できません（サイズ上限のみ適用）: {e}")
+            return budget
+        maxmemory = int(info.get('maxmemory', 0))
+        if maxmemory > 0:
+            available = max(int(maxmemory * self.memory_headroom) - int(info.get('used_memory', 0)), 0)
+            budget = available if budget is None else min(budget, available)
+        return budget
+
+    def put(self, name, data, ttl=None):
+        """データを新しいバージョンとして保存し、メタ情報を返す（ttl秒を指定すると期限付き）
+
+        dataはbytesまたはバイナリのファイルオブジェクト。ファイルは分割して読み、
+        圧縮しながらチャンク単位で書き込むため全体をメモリに載せない。
+        同時に保存された場合は番号の大きいバージョンが残り、負けた側は自分のチャンクだけを削除して
+        公開中のメタ情報を返す。
+        圧縮後のサイズが上限またはRedisの空きメモリを超える場合は、書いたチャンクを削除して
+        ArtifactTooLargeError を送出する（公開中のバージョンはそのまま残る）
+        """
+        stream = io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+        budget = self._write_budget()
+        if budget == 0:
+            raise ArtifactTooLargeError(f"{name}: Redisの空きメモリがありません")
+        version = int(self.client.incr(self._key(name, 'version')))
+        expire = int(ttl) if ttl else 0
+
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj(self.COMPRESS_LEVEL)
+        size = compressed_size = chunk_count = 0
+        buffer = b''
+
+        def write_chunks(final=False):
+            nonlocal buffer, compressed_size, chunk_count
+            pipe = self.client.pipeline(transaction=False)
+            while len(buffer) >= self.chunk_size or (final and (buffer or chunk_count == 0)):
+                chunk, buffer = buffer[:self.chunk_size], buffer[self.chunk_size:]
+                if budget is not None and compressed_size + len(chunk) > budget:
+                    raise ArtifactTooLargeError(
+                        f"{name}: 圧縮後のサイズが書き込み上限（{budget} bytes）を超えます"
+                    )
+                key = self._key(name, f'v{version}', chunk_count)
+                pipe.set(key, chunk, ex=expire or None)
+                compressed_size += len(chunk)
+                chunk_count += 1
+            pipe.execute()
+
+        # チャンクを書いてからメタ情報を切り替える（読み手は常に完全なバージョンを見る）
+        try:
+            while True:
+                block = stream.read(self.chunk_size)
+                if not block:
+                    break
+                digest.update(block)
+                size += len(block)
+                buffer += compressor.compress(block)
+                if len(buffer) >= self.chunk_size:
+                    write_chunks()
+            buffer += compressor.flush()
+            write_chunks(final=True)
+        except Exception:
+            if chunk_count:
+                self.client.delete(*self._chunk_keys(name, version, chunk_count))
+            raise
+
+        meta = {
+            'version': version,
+            'sha256': digest.hexdigest(),
+            'size': size,
+            'compressed_size': compressed_size,
+            'chunks': chunk_count,
+            'updated_at': datetime.now().isoformat()
+        }
+        fields = [item for key, value in meta.items() for item in (key, str(value))]
+        replaced_version, replaced_info = (int(value) for value in self.client.eval(
+            self._PUBLISH_SCRIPT, 2, self._key(name, 'meta'), self._key(name, 'version'), version, expire, *fields
+        ))
+
+        if replaced_version < 0:
+            # より新しいバージョンが先に公開された（自分のチャンクだけ片付ける）
+            self.client.delete(*self._chunk_keys(name, version, chunk_count))
+            logger.info(f"アーティファクト保存: {name} v{version} は公開中の v{replaced_info} より古いため破棄しました")
+            return self.get_meta(name)
+
+        # 置き換えたバージョンのチャンクを削除（公開中のバージョンには触れない）
+        if replaced_version > 0 and replaced_info > 0:
+            self.client.delete(*self._chunk_keys(name, replaced_version, replaced_info))
+
+        logger.info(f"アーティファクト保存: {name} v{version} ({size} -> {compressed_size} bytes, {chunk_count}チャンク)")
+        return meta
+
+    def get_meta(self, name):
+        """最新バージョンのメタ情報（未保存ならNone）"""
+        raw = self.client.hgetall(self._key(name, 'meta'))
+        if not raw:
+            return None
+        meta = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        for field in ('version', 'size', 'compressed_size', 'chunks'):
+            meta[field] = int(meta[field])
+        return meta
+
+    def version(self, name):
+        """最新バージョン番号（未保存なら0）"""
+        meta = self.get_meta(name)
+        return meta['version'] if meta else 0
+
+    def get(self, name, meta=None):
+        """最新バージョンのデータを取得（ハッシュ検証付き）"""
+        meta = meta or self.get_meta(name)
+        if meta is None:
+            return None, None
+
+        keys = [self._key(name, f"v{meta['version']}", index) for index in range(meta['chunks'])]
+        chunks = self.client.mget(keys)
+        if any(chunk is None for chunk in chunks):
+            # 取得中に新しいバージョンへ置き換わった場合は最新メタで取り直す
+            latest = self.get_meta(name)
+            if latest and latest['version'] != meta['version']:
+                return self.get(name, latest)
+            raise ArtifactIntegrityError(f"{name} v{meta['version']} のチャンクが欠けています")
+
+        data = zlib.decompress(b''.join(chunks))
+        if hashlib.sha256(data).hexdigest() != meta['sha256']:
+            raise ArtifactIntegrityError(f"{name} v{meta['version']} のハッシュが一致しません")
+        return data, meta
+
+class ArtifactManifest:
+    """アーティファクトのバージョン台帳（base_dir/artifacts.manifest.json）
+
+    各ファイルの単調増加するバージョン番号・サイズ・更新日時を記録する。
+    更新はファイルロック下で行い、同じディスクを使う複数プロセス間でも番号が戻らない
+    """
+
+    MANIFEST_FILE = 'artifacts.manifest.json'
+
+    def __init__(self, base_dir):
+        self.path = os.path.join(base_dir, self.MANIFEST_FILE)
+        self.lock_path = self.path + '.lock'
+        self._cache = None
+        self._cache_signature = None
+
+    def _read(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._cache_signature:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                self._cache = {}
+            self._cache_signature = signature
+        return self._cache
+
+    def entries(self):
+        return dict(self._read())
+
+    def version(self, name):
+        """記録済みバージョン（未記録なら0）"""
+        return self._read().get(name, {}).get('version', 0)
+
+    def entry(self, name):
+        return dict(self._read().get(name, {}))
+
+    def record(self, name, **info):
+        """バージョンを1つ進めて記録し、新しいバージョンを返す"""
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._cache_signature = None
+                manifest = dict(self._read())
+                new_version = manifest.get(name, {}).get('version', 0) + 1
+
+                manifest[name] = {'version': new_version, 'updated_at': datetime.now().isoformat(), **info}
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+                self._cache_signature = None
+                return new_version
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class LocalArtifactCache:
+    """ローカルディスクを読み込みキャッシュとして使うアーティファクト同期
+
+    取得済みバージョンはマニフェストに記録し、ストアのバージョンが変わったときだけダウンロードする
+    """
+
+    def __init__(self, store, base_dir, manifest=None):
+        self.store = store
+        self.base_dir = base_dir
+        self.manifest = manifest or ArtifactManifest(base_dir)
+
+    def synced_version(self, name):
+        """最後に同期したストア側のバージョン"""
+        return self.manifest.entry(name).get('store_version', 0)
+
+    def pull(self, name):
+        """ストアが新しければローカルファイルを更新（更新したらTrue）"""
+        meta = self.store.get_meta(name)
+        if meta is None or meta['version'] == self.synced_version(name):
+            return False
+
+        data, meta = self.store.get(name, meta)
+        path = os.path.join(self.base_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.manifest.record(name, store_version=meta['version'], size=meta['size'], sha256=meta['sha256'])
+
+        logger.info(f"アーティファクト取得: {name} v{meta['version']}")
+        return True
+
+    def push(self, name):
+        """ローカルファイルをストアへ新しいバージョンとして保存"""
+        path = os.path.join(self.base_dir, name)
+        with open(path, 'rb') as f:
+            return self.store.put(name, f)
+
+class ArtifactEventBus:
+    """アーティファクトのバージョン変更をRedis Pub/Subで通知"""
+
+    CHANNEL = 'loto7:artifacts:events'
+    RECONNECT_DELAY = 5
+
+    def __init__(self, client, channel=None):
+        self.client = client
+        self.channel = channel or self.CHANNEL
+        self.source = f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def publish(self, name, version):
+        """バージョン変更イベントを送信"""
+        message = json.dumps({'name': name, 'version': version, 'source': self.source})
+        self.client.publish(self.channel, message)
+
+    def listen(self, callback, on_connect=None, on_disconnect=None, stop_event=None):
+        """イベントを受信してcallback(name, version)を呼ぶ（切断時は再接続）"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if on_connect:
+                    on_connect()
+
+                while not stop_event.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message or message.get('type') != 'message':
+                        continue
+                    data = message['data']
+                    event = json.loads(data.decode() if isinstance(data, bytes) else data)
+                    if event.get('source') == self.source:
+                        continue
+                    callback(event['name'], int(event['version']))
+
+            except Exception as e:
+                logger.warning(f"アーティファクト通知の受信エラー（再接続します）: {e}")
+                if on_disconnect:
+                    on_disconnect()
+                stop_event.wait(self.RECONNECT_DELAY)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start_listener(self, callback, **kwargs):
+        """受信用のデーモンスレッドを開始"""
+        thread = threading.Thread(target=self.listen, args=(callback,), kwargs=kwargs,
+                                  name='artifact-events', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,150 @@
+"""
+Celery稼働状況の監視
+ブロードキャスト（inspect）はリクエストごとに行わず、バックグラウンドスレッドで定期的に取得して
+スナップショットとして保持する。エンドポイントはスナップショットと取得からの経過秒数を返す。
+Redisへの問い合わせが必要な他の状態値も、登録しておけば同じスレッドで一緒に取得する
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+from kombu.exceptions import ChannelError
+
+logger = logging.getLogger(__name__)
+
+class CeleryHealthMonitor:
+    """ワーカー生存・実行中/予約済みタスク数・キュー滞留数を定期取得"""
+
+    INTERVAL = 15          # 取得間隔（秒）
+    INSPECT_TIMEOUT = 1.0  # inspectの応答待ち（秒）
+    DEFAULT_QUEUE = 'celery'
+
+    def __init__(self, celery_app, interval=None, inspect_timeout=None):
+        self.celery_app = celery_app
+        self.interval = interval or self.INTERVAL
+        self.inspect_timeout = inspect_timeout or self.INSPECT_TIMEOUT
+        self._snapshot = None
+        self._collectors = {}
+        self._collected = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add_collector(self, name, func):
+        """スナップショットと一緒に定期取得する値を登録（結果は collected(name) で参照）"""
+        self._collectors[name] = func
+
+    def collected(self, name, default=None):
+        """登録した値の最新の取得結果（未取得ならdefault、取得失敗なら {'error': ...}）"""
+        with self._lock:
+            return self._collected.get(name, default)
+
+    def _run_collectors(self):
+        values = {}
+        for name, func in list(self._collectors.items()):
+            try:
+                values[name] = func()
+            except Exception as e:
+                values[name] = {'error': str(e)}
+                logger.warning(f"状態値 {name} の取得に失敗: {e}")
+        return values
+
+    def queue_names(self):
+        """監視対象のキュー（タスクルートのキューと既定キュー）"""
+        routes = self.celery_app.conf.task_routes or {}
+        names = {route['queue'] for route in routes.values() if isinstance(route, dict) and 'queue' in route}
+        names.add(self.celery_app.conf.task_default_queue or self.DEFAULT_QUEUE)
+        return sorted(names)
+
+    def _queue_depths(self):
+        depths = {}
+        with self.celery_app.connection_for_read() as conn:
+            conn.ensure_connection(max_retries=1)
+            channel = conn.default_channel
+            for name in self.queue_names():
+                try:
+                    depths[name] = channel.queue_declare(queue=name, passive=True).message_count
+                except ChannelError as e:
+                    # Redisトランスポートはメッセージが無いとキー（リスト）自体が消え、NOT_FOUNDになる
+                    depths[name] = 0 if 'NOT_FOUND' in str(e) else None
+                    # AMQPではエラー後のチャネルが閉じられるため開き直す
+                    channel = conn.channel()
+                except Exception:
+                    depths[name] = None
+        return depths
+
+    @staticmethod
+    def _count(replies):
+        return sum(len(tasks) for tasks in replies.values()) if replies else 0
+
+    def collect(self):
+        """稼働状況を1回取得してスナップショットを更新"""
+        started = time.time()
+        snapshot = {
+            'broker_connected': False,
+            'workers': [],
+            'worker_count': 0,
+            'active_tasks': 0,
+            'reserved_tasks': 0,
+            'queues': {}
+        }
+        try:
+            snapshot['queues'] = self._queue_depths()
+            snapshot['broker_connected'] = True
+
+            inspect = self.celery_app.control.inspect(timeout=self.inspect_timeout)
+            active = inspect.active() or {}
+            reserved = inspect.reserved() or {}
+            snapshot['workers'] = sorted(set(active) | set(reserved))
+            snapshot['worker_count'] = len(snapshot['workers'])
+            snapshot['active_tasks'] = self._count(active)
+            snapshot['reserved_tasks'] = self._count(reserved)
+        except Exception as e:
+            snapshot['error'] = str(e)
+            logger.warning(f"Celery稼働状況の取得に失敗: {e}")
+
+        collected = self._run_collectors()
+
+        snapshot['collect_ms'] = round((time.time() - started) * 1000, 1)
+        snapshot['collected_at'] = datetime.now().isoformat()
+        with self._lock:
+            self._snapshot = (time.time(), snapshot)
+            self._collected = collected
+        return snapshot
+
+    def _run(self):
+        while True:
+            self.collect()
+            time.sleep(self.interval)
+
+    def start(self):
+        """収集スレッドを開始（fork後のプロセスでは起動し直す）"""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='celery-health', daemon=True)
+            self._thread.start()
+
+    def snapshot(self):
+        """最新のスナップショット（取得からの経過秒数付き）。未取得ならcollected=False"""
+        self.start()
+        with self._lock:
+            current = self._snapshot
+        if current is None:
+            return {
+                'collected': False, 'broker_connected': None, 'workers': [], 'worker_count': 0,
+                'active_tasks': 0, 'reserved_tasks': 0, 'queues': {}, 'age_seconds': None, 'stale': True
+            }
+
+        collected_time, snapshot = current
+        age = time.time() - collected_time
+        return {
+            **snapshot,
+            'collected': True,
+            'age_seconds': round(age, 1),
+            'stale': age > self.interval * 3
+        }
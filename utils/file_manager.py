@@ -3,42 +3,436 @@
 モデルや履歴ファイルの保存・読み込みを管理
 """
 
+import io
 import os
+import copy
+import json
 import pickle
+import threading
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime
 
+from utils.history_store import SQLiteHistoryStore
+from utils.artifact_store import RedisArtifactStore, LocalArtifactCache, ArtifactManifest, ArtifactEventBus, ArtifactTooLargeError
+from utils.prediction_entry import PredictionEntry
+from utils.artifact_io import stream_to_temp, validate_artifact, file_sha256, restricted_load, ArtifactValidationError
+from utils.profiling import profiled
+
 logger = logging.getLogger(__name__)
 
+# 読み込み済みモデル（モデルファイルパス -> {'version', 'model_data'}）。バージョンが変わるまでディスクから再読み込みしない。
+# 推定器・スケーラーは読み取り専用の呼び出し間で共有し、推定器をその場で学習し直す呼び出しは fresh=True で自分用に復元する
+_LOADED_MODELS = {}
+_LOADED_MODELS_LOCK = threading.Lock()
+
+PRED_COLUMNS = [f'pred_{i+1}' for i in range(7)]
+ACTUAL_COLUMNS = [f'actual_{i+1}' for i in range(7)]
+
+class _HistoryBlock:
+    """履歴CSVの番号列をまとめて保持する配列ブロック"""
+    
+    def __init__(self, df):
+        self.predictions = df[PRED_COLUMNS].to_numpy(dtype=np.uint8)
+        
+        if all(col in df.columns for col in ACTUAL_COLUMNS):
+            actual = df[ACTUAL_COLUMNS].to_numpy(dtype=float)
+            self.actual_valid = ~np.isnan(actual[:, 0])
+            self.actual = np.nan_to_num(actual).astype(np.uint8)
+        else:
+            self.actual_valid = np.zeros(len(df), dtype=bool)
+            self.actual = None
+        
+        if 'matches' in df.columns:
+            matches = df['matches'].to_numpy(dtype=float)
+            self.matches_valid = self.actual_valid & ~np.isnan(matches)
+            self.matches = np.nan_to_num(matches).astype(np.uint8)
+        else:
+            self.matches_valid = np.zeros(len(df), dtype=bool)
+            self.matches = None
+
 class FileManager:
     """ファイル管理クラス"""
     
-    def __init__(self, base_dir='./'):
+    HISTORY_BACKENDS = ('csv', 'sqlite')
+    ARTIFACT_BACKENDS = ('local', 'redis')
+    
+    # Web・ワーカー間で共有するファイル
+    SHARED_ARTIFACTS = ('model.pkl', 'prediction_history.csv', 'prediction_history.stats.json', 'loto7_data.csv')
+    
+    # タスクの詳細計測レポート（profiles/ に保存し、共有ストアには期限付きで置く）
+    PROFILE_DIR = 'profiles'
+    PROFILE_KEEP = 20
+    PROFILE_TTL = 7 * 24 * 60 * 60
+    
+    def __init__(self, base_dir='./', history_backend=None, artifact_backend=None):
         self.base_dir = base_dir
         self.model_path = os.path.join(base_dir, 'model.pkl')
         self.history_path = os.path.join(base_dir, 'prediction_history.csv')
+        self.history_db_path = os.path.join(base_dir, 'prediction_history.db')
+        self.history_stats_path = os.path.join(base_dir, 'prediction_history.stats.json')
         self.data_path = os.path.join(base_dir, 'loto7_data.csv')
+        self._data_rows = (None, 0)
+        
+        # 予測履歴の保存先（環境変数 LOTO7_HISTORY_BACKEND で切り替え、既定はCSV）
+        self.history_backend = (history_backend or os.environ.get('LOTO7_HISTORY_BACKEND', 'csv')).lower()
+        if self.history_backend not in self.HISTORY_BACKENDS:
+            logger.warning(f"不明な履歴バックエンド: {self.history_backend}（CSVを使用します）")
+            self.history_backend = 'csv'
+        self._history_store = None
         
         # ディレクトリ作成
         os.makedirs(base_dir, exist_ok=True)
+        
+        # アーティファクトのバージョン台帳と変更通知
+        self.manifest = ArtifactManifest(base_dir)
+        self._events = None
+        self._watching = False
+        self._stale = set(self.SHARED_ARTIFACTS)
+        self._stale_lock = threading.Lock()
+        
+        # 共有アーティファクトの保存先（環境変数 LOTO7_ARTIFACT_BACKEND=redis でRedis共有）
+        self.artifact_backend = (artifact_backend or os.environ.get('LOTO7_ARTIFACT_BACKEND', 'local')).lower()
+        self._artifacts = None
+        if self.artifact_backend == 'redis':
+            self._use_shareable_history_backend()
+            self._artifacts = self._create_artifact_cache()
+        elif self.artifact_backend != 'local':
+            logger.warning(f"不明なアーティファクトバックエンド: {self.artifact_backend}（ローカルを使用します）")
+            self.artifact_backend = 'local'
+    
+    def _use_shareable_history_backend(self):
+        """Redis共有時はCSV履歴を使う
+        
+        SQLite履歴DBは各プロセスのローカルディスクにあり共有ストアに載らないため、
+        Webとワーカーでディスクが分かれているとワーカーが書いた履歴がWebから見えない"""
+        if self.history_backend == 'sqlite':
+            logger.warning("SQLite履歴はアーティファクト共有（redis）と併用できません（CSVを使用します）")
+            self.history_backend = 'csv'
+            self._history_store = None
+    
+    def _create_artifact_cache(self):
+        """Redisアーティファクトストアを作成（失敗時はローカルのみで動作）"""
+        try:
+            redis_url = (
+                os.environ.get('LOTO7_ARTIFACT_REDIS_URL') or
+                os.environ.get('REDIS_URL') or
+                os.environ.get('CELERY_BROKER_URL') or
+                'redis://localhost:6379/0'
+            )
+            max_bytes = os.environ.get('LOTO7_ARTIFACT_MAX_BYTES')
+            store = RedisArtifactStore.from_url(redis_url, max_bytes=int(max_bytes) if max_bytes else None)
+            self._events = ArtifactEventBus(store.client)
+            return LocalArtifactCache(store, self.base_dir, self.manifest)
+        except Exception as e:
+            logger.warning(f"アーティファクトストア初期化失敗（ローカルファイルを使用）: {e}")
+            self.artifact_backend = 'local'
+            return None
+    
+    def set_artifact_store(self, store, events=None):
+        """アーティファクトストアを直接設定（Redis互換クライアントの差し替え用）"""
+        if store is not None:
+            self._use_shareable_history_backend()
+        self._artifacts = LocalArtifactCache(store, self.base_dir, self.manifest) if store is not None else None
+        self._events = events
+        self.artifact_backend = 'redis' if store is not None else 'local'
+    
+    def artifact_version(self, filename):
+        """ローカルで記録されているアーティファクトのバージョン（未記録なら0）"""
+        return self.manifest.version(filename)
+    
+    def sync_artifact(self, filename):
+        """共有ストアの新しいバージョンをローカルに反映（ストア障害時はローカルを使用）
+        
+        変更通知を受信中は、通知があったファイルだけストアに問い合わせる"""
+        if self._artifacts is None or filename not in self.SHARED_ARTIFACTS:
+            return False
+        
+        if self._watching:
+            with self._stale_lock:
+                if filename not in self._stale:
+                    return False
+                self._stale.discard(filename)
+        
+        try:
+            return self._artifacts.pull(filename)
+        except Exception as e:
+            logger.warning(f"アーティファクト同期失敗（ローカルを使用）: {filename}: {e}")
+            with self._stale_lock:
+                self._stale.add(filename)
+            return False
+    
+    def publish_artifact(self, filename):
+        """更新したファイルの新バージョンを記録し、共有ストアと他プロセスへ通知"""
+        if filename not in self.SHARED_ARTIFACTS or not os.path.exists(self.get_file_path(filename)):
+            return None
+        
+        path = self.get_file_path(filename)
+        info = {'size': os.path.getsize(path), 'sha256': file_sha256(path)}
+        if self._artifacts is not None:
+            try:
+                meta = self._artifacts.push(filename)
+                # 同時に保存された新しいバージョンに負けた場合は、次回の同期で取り直す
+                if meta and meta['sha256'] == info['sha256']:
+                    info['store_version'] = meta['version']
+            except ArtifactTooLargeError as e:
+                # ブローカーを兼ねるRedisを満杯にしないよう、このバージョンはローカルディスクにのみ置く
+                logger.warning(f"アーティファクトを共有ストアに置けません（ローカルのみ保存）: {e}")
+            except Exception as e:
+                logger.warning(f"アーティファクト共有失敗: {filename}: {e}")
+        
+        version = self.manifest.record(filename, **info)
+        
+        if self._events is not None and 'store_version' in info:
+            try:
+                self._events.publish(filename, info['store_version'])
+            except Exception as e:
+                logger.warning(f"アーティファクト更新通知失敗: {filename}: {e}")
+        
+        return version
+    
+    def artifact_checksum(self, filename):
+        """ファイルのSHA-256（マニフェストの記録がファイルと一致すればそれを使う）"""
+        path = self.get_file_path(filename)
+        if not os.path.exists(path):
+            return None
+        entry = self.manifest.entry(filename)
+        if entry.get('sha256') and entry.get('size') == os.path.getsize(path):
+            return entry['sha256']
+        return file_sha256(path)
+    
+    def install_artifact(self, filename, stream, expected_sha256=None, max_bytes=None):
+        """アップロードをストリーミングで一時ファイルに受け、検証してから置き換える
+        
+        Returns:
+            dict: {'filename', 'size', 'sha256', 'version', 'validation'}
+        
+        Raises:
+            ArtifactValidationError: チェックサム不一致・構造検証エラー
+        """
+        tmp_path, sha256, size = stream_to_temp(stream, self.base_dir, prefix=filename, max_bytes=max_bytes)
+        try:
+            if expected_sha256 and expected_sha256.lower() != sha256:
+                raise ArtifactValidationError(f"SHA-256が一致しません（受信: {sha256}）")
+            
+            validation = validate_artifact(tmp_path, filename)
+            os.replace(tmp_path, self.get_file_path(filename))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        version = self.publish_artifact(filename)
+        logger.info(f"アーティファクトを置き換え: {filename} v{version} ({size} bytes)")
+        
+        return {
+            'filename': filename,
+            'size': size,
+            'sha256': sha256,
+            'version': version,
+            'validation': validation
+        }
+    
+    def watch_artifacts(self, callback=None):
+        """他プロセスからの更新通知の受信を開始（Redis共有時のみ）
+        
+        受信中は通知のあったファイルだけを同期し、リクエストごとのストア問い合わせを省く"""
+        if self._events is None:
+            return False
+        
+        def on_event(name, version):
+            with self._stale_lock:
+                self._stale.add(name)
+            if name == 'model.pkl':
+                self._drop_loaded_model()
+            logger.info(f"アーティファクト更新通知: {name} v{version}")
+            if callback:
+                callback(name, version)
+        
+        def on_connect():
+            # 購読開始前の更新を取りこぼさないよう、全ファイルを一度確認する
+            with self._stale_lock:
+                self._stale = set(self.SHARED_ARTIFACTS)
+            self._watching = True
+        
+        def on_disconnect():
+            self._watching = False
+        
+        self._events.start_listener(on_event, on_connect=on_connect, on_disconnect=on_disconnect)
+        return True
+    
+    def _atomic_write(self, path, write_func, mode='wb', **open_kwargs):
+        """一時ファイルに書いてからリネーム（読み手が書きかけのファイルを見ない）"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, mode, **open_kwargs) as f:
+                write_func(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def write_json(self, path, obj):
+        """JSONを一時ファイル経由で書き込み（同時に書く他のプロセス・スレッドと一時ファイルを共有しない）"""
+        self._atomic_write(path, lambda f: json.dump(obj, f, ensure_ascii=False), mode='w', encoding='utf-8')
     
     def get_file_path(self, filename):
         """ファイルパスを取得"""
         return os.path.join(self.base_dir, filename)
     
+    def get_profile_path(self, filename):
+        """計測レポートのパス（ファイル名以外の指定は受け付けない）"""
+        return os.path.join(self.base_dir, self.PROFILE_DIR, os.path.basename(filename))
+    
+    def save_profile_report(self, filename, data):
+        """計測レポートを保存（Redis共有時はWebからも取得できるようストアに置く）"""
+        path = self.get_profile_path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._atomic_write(path, lambda f: f.write(data))
+        
+        # 古いレポートは直近PROFILE_KEEP件だけ残す（同時に整理する他プロセスとの競合は無視）
+        try:
+            profile_dir = os.path.dirname(path)
+            reports = sorted(
+                (os.path.join(profile_dir, name) for name in os.listdir(profile_dir) if not name.endswith('.tmp')),
+                key=os.path.getmtime
+            )
+            for old_path in reports[:-self.PROFILE_KEEP]:
+                os.remove(old_path)
+        except OSError:
+            pass
+        
+        if self._artifacts is not None:
+            try:
+                self._artifacts.store.put(f'{self.PROFILE_DIR}/{os.path.basename(filename)}', data, ttl=self.PROFILE_TTL)
+            except Exception as e:
+                logger.warning(f"計測レポートの共有失敗: {filename}: {e}")
+        
+        return path
+    
+    def load_profile_report(self, filename):
+        """計測レポートのローカルパス（無ければ共有ストアから取得。見つからなければNone）"""
+        path = self.get_profile_path(filename)
+        if os.path.exists(path):
+            return path
+        if self._artifacts is None:
+            return None
+        
+        try:
+            data, _ = self._artifacts.store.get(f'{self.PROFILE_DIR}/{os.path.basename(filename)}')
+        except Exception as e:
+            logger.warning(f"計測レポートの取得失敗: {filename}: {e}")
+            return None
+        if data is None:
+            return None
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._atomic_write(path, lambda f: f.write(data))
+        return path
+    
     def model_exists(self):
         """モデルファイルの存在確認"""
+        self.sync_artifact('model.pkl')
         return os.path.exists(self.model_path)
     
     def history_exists(self):
         """履歴ファイルの存在確認"""
+        if self.history_backend == 'sqlite' and os.path.exists(self.history_db_path):
+            return True
+        self.sync_artifact('prediction_history.csv')
+        self.sync_artifact('prediction_history.stats.json')
         return os.path.exists(self.history_path)
     
+    def files_status(self, sync=True):
+        """モデル・履歴・データキャッシュの有無（sync=Falseなら共有ストアに問い合わせずローカルのみ確認）"""
+        if sync:
+            return {
+                'model_exists': self.model_exists(),
+                'history_exists': self.history_exists(),
+                'data_cached': self.data_cached()
+            }
+        history_path = self.history_db_path if self.history_backend == 'sqlite' else self.history_path
+        return {
+            'model_exists': os.path.exists(self.model_path),
+            'history_exists': os.path.exists(history_path),
+            'data_cached': os.path.exists(self.data_path)
+        }
+    
+    def get_history_store(self):
+        """SQLite履歴ストアを取得（CSVバックエンドの場合はNone）
+        
+        初回作成時にストアが空でCSVが存在すれば自動で移行する"""
+        if self.history_backend != 'sqlite':
+            return None
+        
+        if self._history_store is None:
+            store = SQLiteHistoryStore(self.history_db_path)
+            self._history_store = store
+            if store.count() == 0 and os.path.exists(self.history_path):
+                self.migrate_history_csv_to_sqlite()
+        
+        return self._history_store
+    
+    def migrate_history_csv_to_sqlite(self):
+        """既存のprediction_history.csvをSQLiteストアへ移行（ストアの内容は置き換え）"""
+        try:
+            if not os.path.exists(self.history_path):
+                logger.info("移行する履歴CSVが存在しません")
+                return 0
+            
+            store = self._history_store or SQLiteHistoryStore(self.history_db_path)
+            self._history_store = store
+            
+            entries = self._read_history_csv()
+            store.replace_all(entries)
+            
+            logger.info(f"予測履歴をSQLiteへ移行: {len(entries)}回分 -> {self.history_db_path}")
+            return len(entries)
+            
+        except Exception as e:
+            logger.error(f"履歴移行エラー: {e}")
+            return 0
+    
+    def export_history_csv(self):
+        """SQLiteストアの内容をprediction_history.csvへ書き出し（ダウンロード用）"""
+        try:
+            store = self.get_history_store()
+            if store is None:
+                return os.path.exists(self.history_path)
+            
+            entries = store.load_entries()
+            if not entries:
+                return False
+            
+            self._write_history_csv(entries)
+            return True
+            
+        except Exception as e:
+            logger.error(f"履歴CSV書き出しエラー: {e}")
+            return False
+    
     def data_cached(self):
         """データキャッシュファイルの存在確認"""
+        self.sync_artifact('loto7_data.csv')
         return os.path.exists(self.data_path)
     
+    def data_row_count(self):
+        """データキャッシュの行数（ファイル未更新なら前回の値を返す。無ければNone）"""
+        try:
+            stat = os.stat(self.data_path)
+        except FileNotFoundError:
+            return None
+        
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._data_rows[0] != signature:
+            with open(self.data_path, 'rb') as f:
+                lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1024 * 1024), b''))
+            self._data_rows = (signature, max(lines - 1, 0))
+        return self._data_rows[1]
+    
+    @profiled('file_manager.save_model')
     def save_model(self, prediction_system):
         """予測システムのモデルを保存"""
         try:
@@ -54,12 +448,15 @@ class FileManager:
                 'saved_at': datetime.now().isoformat()
             }
             
-            # 自動照合学習の改善メトリクスも保存
+            # 自動照合学習の改善メトリクスと集約状態も保存
             if hasattr(prediction_system, 'auto_learner') and hasattr(prediction_system.auto_learner, 'improvement_metrics'):
                 model_data['improvement_metrics'] = prediction_system.auto_learner.improvement_metrics
+                if hasattr(prediction_system.auto_learner, 'get_state'):
+                    model_data['learner_state'] = prediction_system.auto_learner.get_state()
             
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(model_data, f)
+            self._atomic_write(self.model_path, lambda f: pickle.dump(model_data, f))
+            self._drop_loaded_model()
+            self.publish_artifact('model.pkl')
             
             logger.info(f"モデルを保存: {self.model_path}")
             return True
@@ -68,17 +465,56 @@ class FileManager:
             logger.error(f"モデル保存エラー: {e}")
             return False
     
-    def load_model(self, prediction_system):
-        """保存されたモデルを予測システムに読み込み"""
+    def _drop_loaded_model(self):
+        """プロセス内の読み込み済みモデルを破棄（新しいバージョンは次回ディスクから読む）"""
+        with _LOADED_MODELS_LOCK:
+            _LOADED_MODELS.pop(self.model_path, None)
+    
+    def _read_model_data(self, fresh=False):
+        """model.pklの内容を取得（fresh=Falseならバージョンが変わるまで読み込み済みのものを使う）"""
+        version = self.manifest.version('model.pkl')
+        if version == 0:
+            version = self.manifest.record('model.pkl', size=os.path.getsize(self.model_path))
+        
+        if not fresh:
+            with _LOADED_MODELS_LOCK:
+                cached = _LOADED_MODELS.get(self.model_path)
+            if cached is not None and cached['version'] == version:
+                logger.info(f"読み込み済みモデルを使用: v{version}")
+                return self._share_model_data(cached['model_data'])
+        
+        # 一括で読んでから復元する（ファイルから少しずつ読むより速い）
+        with open(self.model_path, 'rb') as f:
+            model_data = restricted_load(io.BytesIO(f.read()))
+        
+        if fresh:
+            return model_data
+        
+        with _LOADED_MODELS_LOCK:
+            _LOADED_MODELS[self.model_path] = {'version': version, 'model_data': model_data}
+        return self._share_model_data(model_data)
+    
+    @staticmethod
+    def _share_model_data(model_data):
+        """読み込み済みモデルを呼び出し側に渡す（コンテナは複製し、読み込み済みのものを書き換えさせない）"""
+        shared = {key: copy.copy(value) for key, value in model_data.items()}
+        # 学習状態は入れ子の辞書をそのまま引き継いで更新するため、丸ごと複製する
+        if 'learner_state' in shared:
+            shared['learner_state'] = copy.deepcopy(model_data['learner_state'])
+        return shared
+    
+    @profiled('file_manager.load_model')
+    def load_model(self, prediction_system, fresh=False):
+        """保存されたモデルを予測システムに読み込み
+        
+        fresh=True は推定器をその場で学習し直す学習タスク用で、他の呼び出しと共有しない複製を読み込む"""
         try:
             if not self.model_exists():
                 logger.warning("モデルファイルが存在しません")
                 return False
             
-            with open(self.model_path, 'rb') as f:
-                model_data = pickle.load(f)
+            model_data = self._read_model_data(fresh=fresh)
             
-            # 予測システムにモデルデータを復元
             prediction_system.trained_models = model_data['trained_models']
             prediction_system.scalers = model_data['scalers']
             prediction_system.model_weights = model_data['model_weights']
@@ -88,9 +524,11 @@ class FileManager:
             prediction_system.pattern_stats = model_data['pattern_stats']
             prediction_system.data_count = model_data['data_count']
             
-            # 改善メトリクスの復元
-            if 'improvement_metrics' in model_data:
-                if hasattr(prediction_system, 'auto_learner'):
+            # 学習状態・改善メトリクスの復元（旧形式はメトリクスのみ）
+            if hasattr(prediction_system, 'auto_learner'):
+                if 'learner_state' in model_data and hasattr(prediction_system.auto_learner, 'load_state'):
+                    prediction_system.auto_learner.load_state(model_data['learner_state'])
+                elif 'improvement_metrics' in model_data:
                     prediction_system.auto_learner.improvement_metrics = model_data['improvement_metrics']
             
             logger.info(f"モデルを読み込み: {self.model_path}")
@@ -103,39 +541,21 @@ class FileManager:
             logger.error(f"モデル読み込みエラー: {e}")
             return False
     
+    @profiled('file_manager.save_history')
     def save_history(self, prediction_history):
-        """予測履歴をCSVに保存"""
+        """予測履歴を保存（CSV全体を書き直し、またはSQLiteストアへ新規・変更分のみ書き込み）"""
         try:
             if not prediction_history.predictions:
                 logger.info("保存する予測履歴がありません")
                 return False
             
-            # データフレームに変換
-            rows = []
-            for entry in prediction_history.predictions:
-                base_row = {
-                    'round': entry['round'],
-                    'date': entry['date'],
-                    'verified': entry['verified']
-                }
-                
-                # 各予測セットを行として追加
-                for i, pred_set in enumerate(entry['predictions']):
-                    row = base_row.copy()
-                    row['prediction_idx'] = i
-                    for j in range(7):
-                        row[f'pred_{j+1}'] = pred_set[j]
-                    
-                    # 検証済みの場合は実際の番号と一致数も記録
-                    if entry['verified'] and entry['actual']:
-                        for j in range(7):
-                            row[f'actual_{j+1}'] = entry['actual'][j]
-                        row['matches'] = entry['matches'][i] if i < len(entry['matches']) else 0
-                    
-                    rows.append(row)
-            
-            df = pd.DataFrame(rows)
-            df.to_csv(self.history_path, index=False, encoding='utf-8')
+            store = self.get_history_store()
+            if store is not None:
+                written = store.upsert_entries(prediction_history.predictions)
+                logger.info(f"予測履歴をSQLiteに保存: {self.history_db_path}（{written}回分を更新）")
+                return True
+            
+            self._write_history_csv(prediction_history.predictions)
             
             logger.info(f"予測履歴をCSVに保存: {self.history_path}")
             return True
@@ -144,49 +564,91 @@ class FileManager:
             logger.error(f"履歴保存エラー: {e}")
             return False
     
-    def load_history(self, prediction_history):
-        """CSVから予測履歴を読み込み"""
-        try:
-            if not self.history_exists():
-                logger.info("履歴ファイルが存在しません")
-                return False
-            
-            df = pd.read_csv(self.history_path, encoding='utf-8')
+    def _write_history_csv(self, entries):
+        """予測履歴エントリをCSVに書き出し（精度統計の累積値も併せて保存）"""
+        # データフレームに変換
+        rows = []
+        histogram = [0] * 8
+        verified_rounds = 0
+        for entry in entries:
+            if entry['verified']:
+                verified_rounds += 1
+                for match_count in entry['matches']:
+                    histogram[min(int(match_count), 7)] += 1
             
-            # 予測を再構築
-            prediction_history.predictions = []
-            grouped = df.groupby(['round', 'date'])
+            base_row = {
+                'round': entry['round'],
+                'date': entry['date'],
+                'verified': entry['verified']
+            }
             
-            for (round_num, date), group in grouped:
-                predictions = []
-                actual = None
-                matches = []
-                verified = group['verified'].iloc[0]
+            # 各予測セットを行として追加
+            for i, pred_set in enumerate(entry['predictions']):
+                row = base_row.copy()
+                row['prediction_idx'] = i
+                for j in range(7):
+                    row[f'pred_{j+1}'] = pred_set[j]
                 
-                for _, row in group.iterrows():
-                    # 予測番号を取得
-                    pred = [int(row[f'pred_{i+1}']) for i in range(7)]
-                    predictions.append(pred)
-                    
-                    # 実際の番号と一致数を取得
-                    if verified and 'actual_1' in row and pd.notna(row['actual_1']):
-                        if actual is None:
-                            actual = [int(row[f'actual_{i+1}']) for i in range(7)]
-                        if 'matches' in row and pd.notna(row['matches']):
-                            matches.append(int(row['matches']))
+                # 検証済みの場合は実際の番号と一致数も記録
+                if entry['verified'] and entry['actual']:
+                    for j in range(7):
+                        row[f'actual_{j+1}'] = entry['actual'][j]
+                    row['matches'] = entry['matches'][i] if i < len(entry['matches']) else 0
                 
-                entry = {
-                    'round': int(round_num),
-                    'date': date,
-                    'predictions': predictions,
-                    'actual': actual,
-                    'matches': matches,
-                    'verified': verified
-                }
-                prediction_history.predictions.append(entry)
-            
-            # 統計を更新
-            if any(entry['verified'] for entry in prediction_history.predictions):
+                rows.append(row)
+        
+        df = pd.DataFrame(rows)
+        self._atomic_write(self.history_path, lambda f: df.to_csv(f, index=False), mode='w', encoding='utf-8', newline='')
+        
+        self._write_history_stats({
+            'histogram': histogram,
+            'verified_rounds': verified_rounds,
+            'total_rounds': len(entries),
+            'csv_size': os.path.getsize(self.history_path)
+        })
+        self.publish_artifact('prediction_history.csv')
+        self.publish_artifact('prediction_history.stats.json')
+    
+    def _write_history_stats(self, stats):
+        """精度統計の累積値をCSVの横に保存"""
+        self.write_json(self.history_stats_path, stats)
+    
+    def _read_history_stats(self, entries):
+        """保存済みの累積値を読み込み（CSVと整合しない場合はNone）"""
+        try:
+            with open(self.history_stats_path, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if (stats.get('csv_size') != os.path.getsize(self.history_path)
+                or stats.get('total_rounds') != len(entries)
+                or stats.get('verified_rounds') != sum(1 for entry in entries if entry['verified'])):
+            return None
+        return stats
+    
+    @profiled('file_manager.load_history')
+    def load_history(self, prediction_history):
+        """予測履歴を読み込み（CSVまたはSQLiteストア）"""
+        try:
+            store = self.get_history_store()
+            if store is not None:
+                entries = store.load_entries()
+                histogram, verified_rounds = store.load_accuracy_aggregates()
+                stats = {'histogram': histogram, 'verified_rounds': verified_rounds}
+            else:
+                if not self.history_exists():
+                    logger.info("履歴ファイルが存在しません")
+                    return False
+                entries = self._read_history_csv()
+                stats = self._read_history_stats(entries)
+            
+            prediction_history.predictions = entries
+            
+            # 統計を更新（保存済みの累積値があれば再計算しない）
+            if stats is not None:
+                prediction_history.restore_accuracy_aggregates(stats['histogram'], stats['verified_rounds'])
+            elif any(entry['verified'] for entry in prediction_history.predictions):
                 prediction_history._update_accuracy_stats()
             
             logger.info(f"予測履歴を読み込み: {len(prediction_history.predictions)}回分")
@@ -196,16 +658,59 @@ class FileManager:
             logger.error(f"履歴読み込みエラー: {e}")
             return False
     
+    def _read_history_csv(self):
+        """CSVから予測履歴エントリを再構築
+        
+        番号列はuint8のブロックとして一括で読み、開催回の境界オフセットで分割する。
+        各エントリはブロックのスライスを参照するだけで、行ごとのリストは作らない"""
+        df = pd.read_csv(self.history_path, encoding='utf-8')
+        if df.empty:
+            return []
+        
+        # 開催回・日付順に並べて境界を求める（安定ソートで各回のセット順を維持）
+        df = df.sort_values(['round', 'date'], kind='mergesort').reset_index(drop=True)
+        rounds = df['round'].to_numpy()
+        dates = df['date'].astype(str).to_numpy()
+        changed = (rounds[1:] != rounds[:-1]) | (dates[1:] != dates[:-1])
+        starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+        ends = np.concatenate((starts[1:], [len(df)]))
+        
+        block = _HistoryBlock(df)
+        verified = df['verified'].to_numpy()
+        
+        entries = []
+        for start, end in zip(starts, ends):
+            is_verified = bool(verified[start])
+            actual = None
+            matches = None
+            
+            if is_verified:
+                valid = np.flatnonzero(block.actual_valid[start:end])
+                if len(valid):
+                    actual = block.actual[start + valid[0]]
+                if block.matches is not None:
+                    matches = block.matches[start:end][block.matches_valid[start:end]]
+            
+            entries.append(PredictionEntry(
+                rounds[start], df['date'].iat[start], block.predictions[start:end],
+                actual=actual, matches=matches, verified=is_verified
+            ))
+        
+        return entries
+    
+    @profiled('file_manager.save_data_cache')
     def save_data_cache(self, data_df):
         """データをキャッシュに保存"""
         try:
-            data_df.to_csv(self.data_path, index=False, encoding='utf-8')
+            self._atomic_write(self.data_path, lambda f: data_df.to_csv(f, index=False), mode='w', encoding='utf-8', newline='')
+            self.publish_artifact('loto7_data.csv')
             logger.info(f"データをキャッシュに保存: {self.data_path}")
             return True
         except Exception as e:
             logger.error(f"データキャッシュ保存エラー: {e}")
             return False
     
+    @profiled('file_manager.load_data_cache')
     def load_data_cache(self):
         """キャッシュからデータを読み込み"""
         try:
@@ -221,6 +726,7 @@ class FileManager:
     
     def get_file_info(self, filename):
         """ファイル情報を取得"""
+        self.sync_artifact(filename)
         file_path = self.get_file_path(filename)
         
         if not os.path.exists(file_path):
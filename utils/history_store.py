@@ -0,0 +1,296 @@
+"""
+予測履歴ストア（SQLite版）
+WALモードでWeb・ワーカー両プロセスから同時に読み書きできる予測履歴の保存先
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from collections import Counter
+
+import numpy as np
+
+from utils.prediction_entry import PredictionEntry
+
+logger = logging.getLogger(__name__)
+
+PRED_COLUMNS = [f'n{i+1}' for i in range(7)]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS prediction_rounds (
+    round INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    verified INTEGER NOT NULL DEFAULT 0,
+    actual TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_prediction_rounds_verified ON prediction_rounds(verified);
+CREATE TABLE IF NOT EXISTS prediction_sets (
+    round INTEGER NOT NULL REFERENCES prediction_rounds(round) ON DELETE CASCADE,
+    set_idx INTEGER NOT NULL,
+    {', '.join(f'{col} INTEGER NOT NULL' for col in PRED_COLUMNS)},
+    matches INTEGER,
+    PRIMARY KEY (round, set_idx)
+);
+CREATE TABLE IF NOT EXISTS accuracy_histogram (
+    matches INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+MAX_MATCHES = 7
+
+class SQLiteHistoryStore:
+    """予測履歴のSQLiteストア（開催回・照合状態インデックス付き、行単位トランザクション）"""
+
+    def __init__(self, db_path, timeout=30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+        self._connection().executescript(SCHEMA)
+        
+        # 一致数ヒストグラムが未作成のDBは照合済みセットから作り直す
+        with self._transaction() as conn:
+            if conn.execute('SELECT COUNT(*) FROM accuracy_histogram').fetchone()[0] == 0:
+                self._rebuild_histogram(conn)
+
+    def _connection(self):
+        """スレッドごとの接続を取得（fork後は接続し直す）"""
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def _encode_actual(actual):
+        return ','.join(str(int(n)) for n in actual) if actual else None
+
+    @staticmethod
+    def _decode_actual(actual):
+        return [int(n) for n in actual.split(',')] if actual else None
+
+    def _insert_entry(self, conn, entry):
+        conn.execute(
+            'INSERT INTO prediction_rounds (round, date, verified, actual) VALUES (?, ?, ?, ?)',
+            (int(entry['round']), str(entry['date']), int(bool(entry['verified'])),
+             self._encode_actual(entry['actual']))
+        )
+        matches = entry['matches'] if entry['verified'] else []
+        conn.executemany(
+            f'INSERT INTO prediction_sets (round, set_idx, {", ".join(PRED_COLUMNS)}, matches) '
+            f'VALUES (?, ?, {", ".join("?" for _ in PRED_COLUMNS)}, ?)',
+            [
+                (int(entry['round']), i, *[int(n) for n in pred_set],
+                 int(matches[i]) if i < len(matches) else None)
+                for i, pred_set in enumerate(entry['predictions'])
+            ]
+        )
+
+    @staticmethod
+    def _rebuild_histogram(conn):
+        conn.execute('DELETE FROM accuracy_histogram')
+        conn.execute(
+            'INSERT INTO accuracy_histogram (matches, count) '
+            'SELECT s.matches, COUNT(*) FROM prediction_sets s '
+            'JOIN prediction_rounds r ON r.round = s.round '
+            'WHERE r.verified = 1 AND s.matches IS NOT NULL GROUP BY s.matches'
+        )
+    
+    @staticmethod
+    def _bump_histogram(conn, counts, sign):
+        conn.executemany(
+            'INSERT INTO accuracy_histogram (matches, count) VALUES (?, ?) '
+            'ON CONFLICT(matches) DO UPDATE SET count = count + excluded.count',
+            [(int(match_count), sign * n) for match_count, n in counts.items()]
+        )
+    
+    def insert_prediction(self, entry):
+        """予測を1件追加（既に同じ開催回があればFalse）"""
+        try:
+            with self._transaction() as conn:
+                self._insert_entry(conn, entry)
+            return True
+        except sqlite3.IntegrityError:
+            logger.warning(f"第{entry['round']}回の予測は既にストアに存在します")
+            return False
+
+    def update_verifications(self, entries):
+        """照合結果を1トランザクションで更新（一致数ヒストグラムも加算）"""
+        with self._transaction() as conn:
+            previously_verified = {
+                row[0] for row in conn.execute(
+                    f'SELECT round FROM prediction_rounds WHERE verified = 1 AND round IN '
+                    f'({", ".join("?" for _ in entries)})',
+                    [int(entry['round']) for entry in entries]
+                )
+            } if entries else set()
+            if previously_verified:
+                self._bump_histogram(conn, self._stored_match_counts(conn, previously_verified), -1)
+            self._bump_histogram(conn, Counter(m for entry in entries for m in entry['matches']), 1)
+            
+            conn.executemany(
+                'UPDATE prediction_rounds SET verified = 1, actual = ? WHERE round = ?',
+                [(self._encode_actual(entry['actual']), int(entry['round'])) for entry in entries]
+            )
+            conn.executemany(
+                'UPDATE prediction_sets SET matches = ? WHERE round = ? AND set_idx = ?',
+                [
+                    (int(match_count), int(entry['round']), i)
+                    for entry in entries
+                    for i, match_count in enumerate(entry['matches'])
+                ]
+            )
+
+    @staticmethod
+    def _stored_match_counts(conn, rounds):
+        rounds = [int(r) for r in rounds]
+        rows = conn.execute(
+            f'SELECT s.matches, COUNT(*) FROM prediction_sets s '
+            f'JOIN prediction_rounds r ON r.round = s.round '
+            f'WHERE r.verified = 1 AND s.matches IS NOT NULL AND s.round IN ({", ".join("?" for _ in rounds)}) '
+            f'GROUP BY s.matches',
+            rounds
+        ).fetchall()
+        return Counter(dict(rows))
+    
+    def delete_prediction(self, round_number):
+        """指定開催回の予測を削除（一致数ヒストグラムからも差し引く）"""
+        with self._transaction() as conn:
+            self._bump_histogram(conn, self._stored_match_counts(conn, [round_number]), -1)
+            cursor = conn.execute('DELETE FROM prediction_rounds WHERE round = ?', (int(round_number),))
+        return cursor.rowcount > 0
+
+    def replace_all(self, entries):
+        """全予測を置き換え（CSVからの移行・一括保存用）"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM prediction_rounds')
+            for entry in entries:
+                self._insert_entry(conn, entry)
+            self._rebuild_histogram(conn)
+
+    def upsert_entries(self, entries):
+        """ストアに無い開催回と、日付・照合状態が変わった開催回だけを書き込み（書き込んだ件数を返す）
+
+        ストアにあってentriesに無い開催回は削除しない（削除はdelete_predictionで行う）"""
+        with self._transaction() as conn:
+            stored = {
+                row[0]: row[1:] for row in conn.execute(
+                    'SELECT round, date, verified, actual FROM prediction_rounds'
+                )
+            }
+
+            changed = []
+            for entry in entries:
+                current = stored.get(int(entry['round']))
+                signature = (str(entry['date']), int(bool(entry['verified'])), self._encode_actual(entry['actual']))
+                if current is None or tuple(current) != signature:
+                    changed.append(entry)
+
+            replaced = [int(entry['round']) for entry in changed if int(entry['round']) in stored]
+            if replaced:
+                self._bump_histogram(conn, self._stored_match_counts(conn, replaced), -1)
+                conn.executemany('DELETE FROM prediction_rounds WHERE round = ?', [(r,) for r in replaced])
+
+            for entry in changed:
+                self._insert_entry(conn, entry)
+            self._bump_histogram(conn, Counter(
+                m for entry in changed if entry['verified'] for m in entry['matches']
+            ), 1)
+
+        return len(changed)
+
+    def count(self):
+        """保存されている開催回数"""
+        return self._connection().execute('SELECT COUNT(*) FROM prediction_rounds').fetchone()[0]
+
+    def load_accuracy_aggregates(self):
+        """一致数ヒストグラムと照合済み開催回数を取得"""
+        conn = self._connection()
+        histogram = [0] * (MAX_MATCHES + 1)
+        for match_count, n in conn.execute('SELECT matches, count FROM accuracy_histogram'):
+            if 0 <= match_count <= MAX_MATCHES:
+                histogram[match_count] = n
+        verified_rounds = conn.execute(
+            'SELECT COUNT(*) FROM prediction_rounds WHERE verified = 1'
+        ).fetchone()[0]
+        return histogram, verified_rounds
+    
+    def _build_entries(self, round_rows, set_rows):
+        """行データからPredictionEntryを組み立て（セットは開催回順に並んでいる前提）"""
+        sets = np.array(set_rows, dtype=np.int64).reshape(-1, len(PRED_COLUMNS) + 3)
+        set_rounds = sets[:, 0]
+        
+        entries = []
+        for round_num, date, verified, actual in round_rows:
+            start, end = np.searchsorted(set_rounds, [round_num, round_num + 1])
+            rows = sets[start:end]
+            matches = rows[:, 9]
+            entries.append(PredictionEntry(
+                round_num, date, rows[:, 2:9],
+                actual=self._decode_actual(actual),
+                matches=matches[matches >= 0] if verified else None,
+                verified=verified
+            ))
+        return entries
+    
+    def load_entries(self):
+        """全予測を開催回順に読み込み"""
+        conn = self._connection()
+        round_rows = conn.execute(
+            'SELECT round, date, verified, actual FROM prediction_rounds ORDER BY round'
+        ).fetchall()
+        set_rows = conn.execute(
+            f'SELECT round, set_idx, {", ".join(PRED_COLUMNS)}, COALESCE(matches, -1) FROM prediction_sets ORDER BY round, set_idx'
+        ).fetchall()
+        return self._build_entries(round_rows, set_rows)
+
+    def find_prediction(self, round_number):
+        """指定開催回の予測を取得（インデックス検索）"""
+        conn = self._connection()
+        round_rows = conn.execute(
+            'SELECT round, date, verified, actual FROM prediction_rounds WHERE round = ?', (int(round_number),)
+        ).fetchall()
+        if not round_rows:
+            return None
+        set_rows = conn.execute(
+            f'SELECT round, set_idx, {", ".join(PRED_COLUMNS)}, COALESCE(matches, -1) FROM prediction_sets '
+            f'WHERE round = ? ORDER BY set_idx', (int(round_number),)
+        ).fetchall()
+        return self._build_entries(round_rows, set_rows)[0]
+
+    def unverified_rounds(self):
+        """未照合の開催回一覧（verifiedインデックス使用）"""
+        rows = self._connection().execute(
+            'SELECT round FROM prediction_rounds WHERE verified = 0 ORDER BY round'
+        ).fetchall()
+        return [row[0] for row in rows]
+
+class _Transaction:
+    """BEGIN IMMEDIATE〜COMMIT/ROLLBACK を行うコンテキストマネージャー"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
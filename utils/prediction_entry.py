@@ -0,0 +1,137 @@
+"""
+予測履歴エントリ（コンパクト版）
+予測番号・当選番号・一致数をuint8配列で保持し、辞書形式でも参照できる
+"""
+
+import numpy as np
+
+NUMBERS_PER_SET = 7
+
+class PredictionEntry:
+    """予測履歴1回分のエントリ
+
+    predictions は (セット数, 7) 、actual は (7,) 、matches は (セット数,) のuint8配列で保持する。
+    entry['predictions'] などの辞書形式アクセスではPythonのリストを返すため、
+    既存の辞書エントリを前提としたコードやJSONレスポンスはそのまま使える。
+    """
+
+    __slots__ = ('round', 'date', 'verified', '_predictions', '_actual', '_matches')
+
+    KEYS = ('round', 'date', 'predictions', 'actual', 'matches', 'verified')
+
+    def __init__(self, round, date, predictions, actual=None, matches=None, verified=False):
+        self.round = int(round)
+        self.date = date
+        self.verified = bool(verified)
+        self._predictions = self._to_sets(predictions)
+        self._actual = self._to_actual(actual)
+        self._matches = self._to_matches(matches)
+
+    @classmethod
+    def from_dict(cls, entry):
+        """辞書形式のエントリから作成（既にPredictionEntryならそのまま返す）"""
+        if isinstance(entry, cls):
+            return entry
+        return cls(
+            entry['round'], entry['date'], entry['predictions'],
+            actual=entry.get('actual'), matches=entry.get('matches'),
+            verified=entry.get('verified', False)
+        )
+
+    @staticmethod
+    def _to_sets(predictions):
+        return np.asarray(predictions, dtype=np.uint8).reshape(-1, NUMBERS_PER_SET)
+
+    @staticmethod
+    def _to_actual(actual):
+        if actual is None or len(actual) == 0:
+            return None
+        return np.asarray(actual, dtype=np.uint8)
+
+    @staticmethod
+    def _to_matches(matches):
+        if matches is None:
+            return np.zeros(0, dtype=np.uint8)
+        return np.asarray(matches, dtype=np.uint8)
+
+    # 配列としての参照（ベクトル演算用）
+    @property
+    def predictions_array(self):
+        return self._predictions
+
+    @property
+    def actual_array(self):
+        return self._actual
+
+    @property
+    def matches_array(self):
+        return self._matches
+
+    # 辞書互換の参照
+    def __getitem__(self, key):
+        if key == 'predictions':
+            return self._predictions.tolist()
+        if key == 'actual':
+            return self._actual.tolist() if self._actual is not None else None
+        if key == 'matches':
+            return self._matches.tolist()
+        if key in ('round', 'date', 'verified'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'predictions':
+            self._predictions = self._to_sets(value)
+        elif key == 'actual':
+            self._actual = self._to_actual(value)
+        elif key == 'matches':
+            self._matches = self._to_matches(value)
+        elif key == 'round':
+            self.round = int(value)
+        elif key == 'verified':
+            self.verified = bool(value)
+        elif key == 'date':
+            self.date = value
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in self.KEYS else default
+
+    def keys(self):
+        return list(self.KEYS)
+
+    def values(self):
+        return [self[key] for key in self.KEYS]
+
+    def items(self):
+        return [(key, self[key]) for key in self.KEYS]
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def to_dict(self):
+        """JSONレスポンス用の辞書に変換"""
+        return {key: self[key] for key in self.KEYS}
+
+    def __eq__(self, other):
+        if isinstance(other, (PredictionEntry, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, PredictionEntry) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"PredictionEntry({self.to_dict()!r})"
+
+    def __getstate__(self):
+        return (self.round, self.date, self.verified, self._predictions, self._actual, self._matches)
+
+    def __setstate__(self, state):
+        self.round, self.date, self.verified, self._predictions, self._actual, self._matches = state
@@ -0,0 +1,297 @@
+"""
+処理区間（スパン）の計測
+学習・検証・予測の各段階の経過時間・CPU時間・メモリ増減を入れ子の木として記録する。
+計測はprofile_sessionの内側でだけ行い、セッション外のspan・profiledはほぼ何もしない。
+タスク単位で指定された場合だけ、cProfile（cpu）・tracemalloc（memory）の詳細計測も行う
+"""
+
+import os
+import io
+import json
+import time
+import pstats
+import marshal
+import cProfile
+import functools
+import threading
+import tracemalloc
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# タスクごとのスパン木を追記するJSONLファイル（未設定なら書き出さない）
+PERF_LOG_ENV = 'LOTO7_PERF_LOG'
+
+# タスクの詳細計測モード
+CAPTURE_MODES = ('cpu', 'memory')
+CAPTURE_TOP_N = 20
+
+_state = threading.local()
+_process = None
+
+def _rss():
+    """現在のRSS（バイト、取得できなければ0）"""
+    global _process
+    try:
+        import psutil
+        if _process is None or _process.pid != os.getpid():
+            _process = psutil.Process(os.getpid())
+        return _process.memory_info().rss
+    except Exception:
+        return 0
+
+def _traced():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+class SpanNode:
+    """スパン木の1ノード（同じ親の下の同名スパンは1ノードに合算）"""
+
+    __slots__ = ('name', 'count', 'wall', 'cpu', 'rss_delta', 'alloc', 'children', '_start')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rss_delta = 0
+        self.alloc = None
+        self.children = {}
+        self._start = None
+
+    def child(self, name):
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = SpanNode(name)
+        return node
+
+    def begin(self):
+        self._start = (time.perf_counter(), time.process_time(), _rss(), _traced())
+
+    def end(self):
+        wall, cpu, rss, traced = self._start
+        self.count += 1
+        self.wall += time.perf_counter() - wall
+        self.cpu += time.process_time() - cpu
+        self.rss_delta += _rss() - rss
+        if traced is not None and tracemalloc.is_tracing():
+            self.alloc = (self.alloc or 0) + _traced() - traced
+        self._start = None
+
+    def to_dict(self):
+        node = {
+            'name': self.name,
+            'count': self.count,
+            'wall_ms': round(self.wall * 1000, 1),
+            'cpu_ms': round(self.cpu * 1000, 1),
+            'rss_delta_kb': round(self.rss_delta / 1024, 1)
+        }
+        if self.alloc is not None:
+            node['alloc_kb'] = round(self.alloc / 1024, 1)
+        if self.children:
+            node['children'] = [child.to_dict() for child in self.children.values()]
+        return node
+
+class Profile:
+    """1回の計測セッションの結果"""
+
+    def __init__(self, name):
+        self.root = SpanNode(name)
+        self.started_at = datetime.now().isoformat()
+
+    def to_dict(self):
+        return {'started_at': self.started_at, **self.root.to_dict()}
+
+def is_profiling():
+    """このスレッドで計測セッションが有効か"""
+    return bool(getattr(_state, 'stack', None))
+
+@contextmanager
+def profile_session(name):
+    """計測セッションを開始（この中のspan・profiledが木として記録される）"""
+    previous = getattr(_state, 'stack', None)
+    profile = Profile(name)
+    _state.stack = [profile.root]
+    profile.root.begin()
+    try:
+        yield profile
+    finally:
+        profile.root.end()
+        _state.stack = previous
+
+@contextmanager
+def span(name):
+    """処理区間を計測（セッション外では何もしない）"""
+    stack = getattr(_state, 'stack', None)
+    if not stack:
+        yield None
+        return
+
+    node = stack[-1].child(name)
+    stack.append(node)
+    node.begin()
+    try:
+        yield node
+    finally:
+        node.end()
+        stack.pop()
+
+def profiled(name=None):
+    """関数・メソッド全体をスパンとして計測するデコレーター（名前の既定は修飾名）"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not getattr(_state, 'stack', None):
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def append_perf_log(record, path=None):
+    """スパン木をJSONLファイルに追記（LOTO7_PERF_LOG 未設定なら何もしない）"""
+    path = path or os.environ.get(PERF_LOG_ENV)
+    if not path:
+        return False
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        return True
+    except OSError as e:
+        logger.warning(f"性能ログの書き込みに失敗: {e}")
+        return False
+
+def _short_path(filename):
+    """ホットスポット表示用に site-packages 等の前置きを省いたパス"""
+    for marker in ('site-packages' + os.sep, os.getcwd() + os.sep):
+        index = filename.find(marker)
+        if index >= 0:
+            return filename[index + len(marker):]
+    return filename
+
+class TaskCapture:
+    """タスク全体をcProfile（cpu）またはtracemalloc（memory）で計測
+
+    指定されたタスクでだけ生成する（未指定のタスクには一切オーバーヘッドを加えない）。
+    memoryでは終了時に解放済みの一時確保も見えるよう、確保量が増えるたびにスナップショットを取り直し
+    ピーク付近のスナップショットで報告する
+    """
+
+    TRACEBACK_FRAMES = 25
+    REPORT_LINES = 100
+    PEAK_POLL_INTERVAL = 1.0  # 確保量の確認間隔（秒）
+    PEAK_GROWTH = 1.1         # 前回スナップショット時からこの倍率を超えたら取り直す
+
+    def __init__(self, mode, top_n=None):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"不明な計測モード: {mode}")
+        self.mode = mode
+        self.top_n = top_n or CAPTURE_TOP_N
+        self.wall = 0.0
+        self._profiler = None
+        self._snapshot = None
+        self._snapshot_size = 0
+        self._peak = 0
+        self._started_tracing = False
+        self._start = None
+        self._stop_event = threading.Event()
+        self._sampler = None
+
+    @property
+    def extension(self):
+        """保存するレポートの拡張子（cpuはpstats互換の.prof、memoryはテキスト）"""
+        return 'prof' if self.mode == 'cpu' else 'txt'
+
+    def start(self):
+        if self.mode == 'cpu':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.TRACEBACK_FRAMES)
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._sampler = threading.Thread(target=self._watch_peak, name='tracemalloc-peak', daemon=True)
+            self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+
+    def _watch_peak(self):
+        while not self._stop_event.wait(self.PEAK_POLL_INTERVAL):
+            current = tracemalloc.get_traced_memory()[0]
+            if current > self._snapshot_size * self.PEAK_GROWTH:
+                self._snapshot, self._snapshot_size = self._take_snapshot(), current
+
+    def stop(self):
+        self.wall = time.perf_counter() - self._start
+        if self.mode == 'cpu':
+            self._profiler.disable()
+        else:
+            self._stop_event.set()
+            self._sampler.join()
+            current, self._peak = tracemalloc.get_traced_memory()
+            if current >= self._snapshot_size:
+                self._snapshot, self._snapshot_size = self._take_snapshot(), current
+            if self._started_tracing:
+                tracemalloc.stop()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def hotspots(self):
+        """上位N件のホットスポット（cpuは自己時間順の関数、memoryは確保量順の行）"""
+        if self.mode == 'cpu':
+            stats = pstats.Stats(self._profiler).stats
+            ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top_n]
+            return [{
+                'function': f"{_short_path(filename)}:{line}({func})",
+                'calls': calls,
+                'self_ms': round(self_time * 1000, 1),
+                'cumulative_ms': round(cumulative * 1000, 1)
+            } for (filename, line, func), (_, calls, self_time, cumulative, _) in ranked]
+
+        return [{
+            'location': f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+            'size_kb': round(stat.size / 1024, 1),
+            'blocks': stat.count
+        } for stat in self._snapshot.statistics('lineno')[:self.top_n]]
+
+    def summary(self):
+        summary = {'mode': self.mode, 'wall_ms': round(self.wall * 1000, 1), 'hotspots': self.hotspots()}
+        if self.mode == 'memory':
+            summary['peak_kb'] = round(self._peak / 1024, 1)
+            summary['snapshot_kb'] = round(self._snapshot_size / 1024, 1)
+        return summary
+
+    def report_bytes(self):
+        """ダウンロード用のレポート（cpuはpstatsで読めるmarshal形式、memoryはテキスト）"""
+        if self.mode == 'cpu':
+            return marshal.dumps(pstats.Stats(self._profiler).stats)
+
+        out = io.StringIO()
+        out.write(f"tracemalloc report: peak {self._peak / 1024:.1f} KiB, "
+                  f"snapshot {self._snapshot_size / 1024:.1f} KiB, wall {self.wall:.2f}s\n\n")
+        out.write("== 行別の確保量（上位） ==\n")
+        for stat in self._snapshot.statistics('lineno')[:self.REPORT_LINES]:
+            out.write(f"{stat}\n")
+        out.write("\n== 確保元のトレースバック（上位10件） ==\n")
+        for stat in self._snapshot.statistics('traceback')[:10]:
+            out.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format():
+                out.write(f"{line}\n")
+        return out.getvalue().encode('utf-8')
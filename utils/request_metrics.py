@@ -0,0 +1,168 @@
+"""
+HTTPリクエストの計測（プロセス内）
+エンドポイントごとのレイテンシ分布・ステータス別件数・処理中件数・レスポンスバイト数を集計し、
+Prometheusテキスト形式で出力する。
+記録はスレッドごとのシャードに行うためロックを取らず、集計は出力時にまとめて行う
+"""
+
+import time
+import bisect
+import threading
+
+# レイテンシのバケット上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    """Prometheusのラベル表記 {a="x",b="y"}"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def estimate_quantile(buckets, counts, q):
+    """バケットごとの件数から分位点を線形補間で推定（最後のバケットは上限なし）"""
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            upper = buckets[i] if i < len(buckets) else buckets[-1]
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+def render_histogram(name, help_text, series, buckets=LATENCY_BUCKETS):
+    """ヒストグラム（累積バケット・_sum・_count）と分位点推定をテキスト形式で出力
+
+    series は [(labels, counts, total_sum)]。countsは各バケット＋上限超過の件数
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, counts, total_sum in series:
+        cumulative = 0
+        for bound, count in zip(buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels({**labels, "le": bound})} {cumulative}')
+        cumulative += counts[len(buckets)]
+        lines.append(f'{name}_bucket{format_labels({**labels, "le": "+Inf"})} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {total_sum:.6f}')
+        lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+
+    quantile_name = f'{name}_quantile'
+    lines += [f'# HELP {quantile_name} {help_text}（バケットからの推定分位点）', f'# TYPE {quantile_name} gauge']
+    for labels, counts, _ in series:
+        for q in QUANTILES:
+            lines.append(f'{quantile_name}{format_labels({**labels, "quantile": q})} {estimate_quantile(buckets, counts, q):.6f}')
+    return lines
+
+class _Shard:
+    """1スレッド分のカウンタ（そのスレッドだけが書き込む）"""
+
+    __slots__ = ('started', 'finished', 'latency', 'requests', 'response_bytes')
+
+    def __init__(self):
+        self.started = 0
+        self.finished = 0
+        self.latency = {}         # endpoint -> [バケット件数..., 合計秒]
+        self.requests = {}        # (endpoint, method, status) -> 件数
+        self.response_bytes = {}  # endpoint -> バイト数
+
+class RequestMetrics:
+    """エンドポイント別のリクエスト計測"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._shards = []
+        self._register_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            # シャードの登録時（スレッドごとに1回）だけロックを取る
+            shard = _Shard()
+            with self._register_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def request_started(self):
+        self._shard().started += 1
+
+    def request_finished(self, endpoint, method, status, elapsed, response_bytes=0):
+        """1リクエスト分を記録"""
+        shard = self._shard()
+        latency = shard.latency.get(endpoint)
+        if latency is None:
+            latency = shard.latency[endpoint] = [0] * (len(self.buckets) + 2)
+        latency[bisect.bisect_left(self.buckets, elapsed)] += 1
+        latency[-1] += elapsed
+
+        key = (endpoint, method, int(status))
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        shard.response_bytes[endpoint] = shard.response_bytes.get(endpoint, 0) + int(response_bytes or 0)
+        shard.finished += 1
+
+    def _merge(self):
+        shards = list(self._shards)
+        latency, requests, response_bytes = {}, {}, {}
+        for shard in shards:
+            for endpoint, values in list(shard.latency.items()):
+                merged = latency.setdefault(endpoint, [0] * len(values))
+                for i, value in enumerate(values):
+                    merged[i] += value
+            for key, count in list(shard.requests.items()):
+                requests[key] = requests.get(key, 0) + count
+            for endpoint, size in list(shard.response_bytes.items()):
+                response_bytes[endpoint] = response_bytes.get(endpoint, 0) + size
+        in_flight = sum(shard.started for shard in shards) - sum(shard.finished for shard in shards)
+        return latency, requests, response_bytes, max(in_flight, 0)
+
+    def summary(self):
+        """エンドポイント別の件数と分位点（JSON用）"""
+        latency, requests, response_bytes, in_flight = self._merge()
+        endpoints = {}
+        for endpoint, values in sorted(latency.items()):
+            counts = values[:-1]
+            total = sum(counts)
+            endpoints[endpoint] = {
+                'count': total,
+                'avg_ms': round(values[-1] / total * 1000, 1) if total else 0,
+                **{f'p{int(q * 100)}_ms': round(estimate_quantile(self.buckets, counts, q) * 1000, 1) for q in QUANTILES},
+                'response_bytes': response_bytes.get(endpoint, 0)
+            }
+        return {'in_flight': in_flight, 'endpoints': endpoints}
+
+    def render(self):
+        """Prometheusテキスト形式の行リスト"""
+        latency, requests, response_bytes, in_flight = self._merge()
+
+        lines = ['# HELP loto7_http_requests_total リクエスト件数（エンドポイント・メソッド・ステータス別）',
+                 '# TYPE loto7_http_requests_total counter']
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f'loto7_http_requests_total{format_labels({"endpoint": endpoint, "method": method, "status": status})} {count}')
+
+        lines += render_histogram(
+            'loto7_http_request_duration_seconds', 'リクエスト処理時間（秒）',
+            [({'endpoint': endpoint}, values[:-1], values[-1]) for endpoint, values in sorted(latency.items())],
+            self.buckets
+        )
+
+        lines += ['# HELP loto7_http_response_bytes_total レスポンスのバイト数',
+                  '# TYPE loto7_http_response_bytes_total counter']
+        for endpoint, size in sorted(response_bytes.items()):
+            lines.append(f'loto7_http_response_bytes_total{format_labels({"endpoint": endpoint})} {size}')
+
+        lines += ['# HELP loto7_http_requests_in_flight 処理中のリクエスト数',
+                  '# TYPE loto7_http_requests_in_flight gauge',
+                  f'loto7_http_requests_in_flight {in_flight}',
+                  '# HELP loto7_process_start_time_seconds 計測開始時刻（UNIX秒）',
+                  '# TYPE loto7_process_start_time_seconds gauge',
+                  f'loto7_process_start_time_seconds {self.started_at:.3f}']
+        return lines
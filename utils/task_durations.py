@@ -0,0 +1,126 @@
+"""
+タスク所要時間の履歴と予測
+タスク種別・学習段階・データ件数ごとに実際の所要時間を直近N件保存し、
+中央値・90パーセンタイルのETAとクライアントの推奨ポーリング間隔を返す
+"""
+
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 履歴が無い場合の目安（秒）。従来の固定表示と同じ範囲
+DEFAULT_DURATIONS = {
+    'tasks.predict_task': (30, 60),
+    'tasks.train_model_task': (120, 300),
+    'tasks.validation_task': (180, 600),
+    'tasks.heavy_init_task': (120, 300),
+    'tasks.progressive_learning_pipeline_task': (1200, 2700),
+}
+
+POLL_INTERVAL_MIN_MS = 1000
+POLL_INTERVAL_MAX_MS = 15000
+
+def parse_estimated_time(text):
+    """'3-5分' や '30-60秒' を (下限秒, 上限秒) に変換（解釈できなければNone）"""
+    match = re.match(r'\s*(\d+)(?:\s*-\s*(\d+))?\s*(秒|分)', text or '')
+    if not match:
+        return None
+    unit = 60 if match.group(3) == '分' else 1
+    low = int(match.group(1)) * unit
+    high = int(match.group(2) or match.group(1)) * unit
+    return low, high
+
+def format_duration(seconds):
+    """秒数を '45秒'・'3分' のような表示に変換"""
+    if seconds < 60:
+        return f"{max(int(round(seconds)), 1)}秒"
+    return f"{int(round(seconds / 60))}分"
+
+def recommended_poll_interval_ms(median_seconds):
+    """ETAから推奨ポーリング間隔を決める（所要時間の約1/20、1〜15秒）"""
+    interval = int(median_seconds * 1000 / 20)
+    return min(max(interval, POLL_INTERVAL_MIN_MS), POLL_INTERVAL_MAX_MS)
+
+def data_size_bucket(data_size, width=100):
+    """データ件数をバケットに丸める（件数が少し増えただけで履歴が分散しないように）"""
+    if data_size is None:
+        return None
+    return int(data_size) // width * width
+
+def build_estimate(median, p90, samples, source):
+    """エンドポイントに含めるETA情報"""
+    return {
+        'eta': {
+            'median_seconds': round(median, 1),
+            'p90_seconds': round(p90, 1),
+            'samples': samples,
+            'source': source
+        },
+        'estimated_time': f"約{format_duration(median)}（最大{format_duration(p90)}程度）",
+        'poll_interval_ms': recommended_poll_interval_ms(median)
+    }
+
+def default_estimate(task_name, default=None):
+    """履歴が無い・取得できない場合の目安"""
+    low, high = default or DEFAULT_DURATIONS.get(task_name, (60, 300))
+    return build_estimate((low + high) / 2, float(high), 0, 'default')
+
+class TaskDurationStore:
+    """タスク所要時間の履歴（Redisリスト、系列ごとに直近MAX_SAMPLES件）
+
+    キー構成:
+        {namespace}:{task}:{stage}:all          データ件数によらない系列
+        {namespace}:{task}:{stage}:n{bucket}    データ件数バケット別の系列
+    """
+
+    NAMESPACE = 'loto7:task_durations'
+    MAX_SAMPLES = 50
+    MIN_SAMPLES = 3  # これ未満の系列は予測に使わない
+    SOCKET_TIMEOUT = 2.0
+
+    def __init__(self, client, namespace=None):
+        self.client = client
+        self.namespace = namespace or self.NAMESPACE
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=cls.SOCKET_TIMEOUT,
+                                        socket_connect_timeout=cls.SOCKET_TIMEOUT), **kwargs)
+
+    def _keys(self, task_name, stage=None, data_size=None):
+        """(データ件数別のキー, 全体のキー)"""
+        base = f'{self.namespace}:{task_name}:{stage or "-"}'
+        bucket = data_size_bucket(data_size)
+        return (f'{base}:n{bucket}' if bucket is not None else None), f'{base}:all'
+
+    def record(self, task_name, seconds, stage=None, data_size=None):
+        """完了したタスクの所要時間を追加"""
+        pipe = self.client.pipeline(transaction=False)
+        for key in self._keys(task_name, stage, data_size):
+            if key is None:
+                continue
+            pipe.lpush(key, f'{seconds:.3f}')
+            pipe.ltrim(key, 0, self.MAX_SAMPLES - 1)
+        pipe.execute()
+
+    def samples(self, key):
+        return [float(value) for value in self.client.lrange(key, 0, self.MAX_SAMPLES - 1)]
+
+    def estimate(self, task_name, stage=None, data_size=None, default=None):
+        """ETA（中央値・90パーセンタイル）と推奨ポーリング間隔
+
+        同じデータ件数の履歴 → 件数によらない履歴 → 既定の目安 の順に使う
+        """
+        for key, source in zip(self._keys(task_name, stage, data_size), ('history', 'history_all_sizes')):
+            if key is None:
+                continue
+            values = self.samples(key)
+            if len(values) >= self.MIN_SAMPLES:
+                median, p90 = np.percentile(values, [50, 90])
+                return build_estimate(float(median), float(p90), len(values), source)
+
+        return default_estimate(task_name, default)
@@ -0,0 +1,118 @@
+"""
+タスク進捗イベント（Redis Pub/Sub版）
+ワーカーが進捗・完了を送信し、Web側はSSE・ロングポーリングで待機中のリクエストへ配信する。
+Web側の購読は1本の接続（パターン購読）で受け、タスクIDごとのキューへ振り分ける
+"""
+
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('SUCCESS', 'FAILURE', 'REVOKED')
+
+class TaskSubscription:
+    """1つのタスクのイベントを受け取るキュー"""
+
+    def __init__(self, bus, task_id):
+        self.bus = bus
+        self.task_id = task_id
+        self._queue = queue.Queue()
+
+    def put(self, event):
+        self._queue.put(event)
+
+    def get(self, timeout=None):
+        """次のイベント（timeout秒以内に無ければNone）"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class TaskEventBus:
+    """タスクの進捗・完了イベントをRedis Pub/Subで送受信"""
+
+    CHANNEL_PREFIX = 'loto7:tasks:'
+    RECONNECT_DELAY = 5
+
+    def __init__(self, client, channel_prefix=None):
+        self.client = client
+        self.channel_prefix = channel_prefix or self.CHANNEL_PREFIX
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self.connected = False
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def publish(self, task_id, state, **info):
+        """イベントを送信（購読者がいなければ何もしない）"""
+        message = json.dumps({'task_id': task_id, 'state': state, **info}, ensure_ascii=False, default=str)
+        self.client.publish(self.channel_prefix + task_id, message)
+
+    def subscribe(self, task_id):
+        """タスクIDのイベント受信を開始（受信スレッドは初回に起動）"""
+        subscription = TaskSubscription(self, task_id)
+        with self._lock:
+            self._subscriptions.setdefault(task_id, set()).add(subscription)
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='task-events', daemon=True)
+                self._listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.task_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.task_id]
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.get('task_id'), ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def _listen(self):
+        """パターン購読でイベントを受信し、購読中のタスクへ振り分ける（切断時は再接続）"""
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.channel_prefix + '*')
+                self.connected = True
+
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message or message.get('type') != 'pmessage':
+                        continue
+                    data = message['data']
+                    self._dispatch(json.loads(data.decode() if isinstance(data, bytes) else data))
+
+            except Exception as e:
+                logger.warning(f"タスクイベントの受信エラー（再接続します）: {e}")
+                self.connected = False
+                time.sleep(self.RECONNECT_DELAY)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,185 @@
+"""
+Celeryタスクの計測（Redis集計版）
+タスク名・キューごとに、投入→開始の待ち時間・実行時間のヒストグラム、結果別件数、ピークRSSを
+Redisのハッシュに加算する。Web・ワーカーのどちらからでも同じ値を参照できる
+"""
+
+import os
+import bisect
+import logging
+import threading
+
+from utils.request_metrics import render_histogram, estimate_quantile, format_labels
+
+logger = logging.getLogger(__name__)
+
+# 待ち時間・実行時間のバケット上限（秒）
+TASK_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+class RssSampler:
+    """タスク実行中のRSSを一定間隔で測り、ピークを記録するスレッド"""
+
+    INTERVAL = 0.5
+
+    def __init__(self, interval=None):
+        self.interval = interval or self.INTERVAL
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        try:
+            import psutil
+            self.peak = max(self.peak, psutil.Process(os.getpid()).memory_info().rss)
+        except Exception:
+            pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """サンプリングを止めてピーク（バイト）を返す"""
+        self._stop.set()
+        self._sample()
+        return self.peak
+
+class TaskMetricsStore:
+    """タスク計測値をRedisに集計
+
+    キー構成:
+        {namespace}:series                    計測済みの "タスク名|キュー" 一覧（セット）
+        {namespace}:{task}|{queue}:wait       待ち時間ヒストグラム（バケット番号→件数, sum）
+        {namespace}:{task}|{queue}:run        実行時間ヒストグラム
+        {namespace}:{task}|{queue}:outcome    結果（SUCCESS/FAILURE等）別件数
+        {namespace}:{task}|{queue}:rss        ピークRSS（max, last）
+    """
+
+    NAMESPACE = 'loto7:task_metrics'
+    SOCKET_TIMEOUT = 2.0  # 状態APIがRedis障害で止まらないように
+
+    def __init__(self, client, namespace=None, buckets=TASK_BUCKETS):
+        self.client = client
+        self.namespace = namespace or self.NAMESPACE
+        self.buckets = tuple(buckets)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=cls.SOCKET_TIMEOUT,
+                                        socket_connect_timeout=cls.SOCKET_TIMEOUT), **kwargs)
+
+    def _key(self, series, kind):
+        return f'{self.namespace}:{series}:{kind}'
+
+    def _observe(self, pipe, key, value):
+        pipe.hincrby(key, str(bisect.bisect_left(self.buckets, value)), 1)
+        pipe.hincrbyfloat(key, 'sum', value)
+
+    def record(self, task_name, queue, run_time, outcome, queue_wait=None, peak_rss=None):
+        """1タスク分の計測値を加算"""
+        series = f'{task_name}|{queue}'
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(f'{self.namespace}:series', series)
+        if queue_wait is not None:
+            self._observe(pipe, self._key(series, 'wait'), max(queue_wait, 0.0))
+        self._observe(pipe, self._key(series, 'run'), run_time)
+        pipe.hincrby(self._key(series, 'outcome'), outcome, 1)
+        if peak_rss:
+            pipe.hset(self._key(series, 'rss'), 'last', int(peak_rss))
+        pipe.execute()
+
+        # ピークRSSの最大値はスクリプトを使わず比較して更新（同時実行時の取りこぼしは許容）
+        if peak_rss:
+            current = self.client.hget(self._key(series, 'rss'), 'max')
+            if current is None or int(current) < int(peak_rss):
+                self.client.hset(self._key(series, 'rss'), 'max', int(peak_rss))
+
+    @staticmethod
+    def _decode(raw):
+        return {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+
+    def _histogram(self, raw):
+        counts = [0] * (len(self.buckets) + 1)
+        for field, value in raw.items():
+            if field != 'sum':
+                counts[min(int(field), len(self.buckets))] += int(value)
+        return counts, float(raw.get('sum', 0))
+
+    def load(self):
+        """全系列の集計値を取得 {(タスク名, キュー): {...}}"""
+        names = sorted(
+            name.decode() if isinstance(name, bytes) else name
+            for name in self.client.smembers(f'{self.namespace}:series')
+        )
+        pipe = self.client.pipeline(transaction=False)
+        for series in names:
+            for kind in ('wait', 'run', 'outcome', 'rss'):
+                pipe.hgetall(self._key(series, kind))
+        results = pipe.execute()
+
+        metrics = {}
+        for i, series in enumerate(names):
+            wait, run, outcome, rss = (self._decode(raw) for raw in results[i * 4:i * 4 + 4])
+            task_name, _, queue = series.partition('|')
+            metrics[(task_name, queue)] = {
+                'wait': self._histogram(wait),
+                'run': self._histogram(run),
+                'outcome': {key: int(value) for key, value in outcome.items()},
+                'peak_rss': int(rss.get('max', 0)),
+                'last_rss': int(rss.get('last', 0))
+            }
+        return metrics
+
+    def summary(self):
+        """タスク別の件数・分位点・結果（JSON用）"""
+        summary = {}
+        for (task_name, queue), values in self.load().items():
+            entry = {'queue': queue, 'outcome': values['outcome'],
+                     'peak_rss_mb': round(values['peak_rss'] / 1024 / 1024, 1)}
+            for kind in ('wait', 'run'):
+                counts, total_sum = values[kind]
+                total = sum(counts)
+                entry[kind] = {
+                    'count': total,
+                    'avg_s': round(total_sum / total, 2) if total else 0,
+                    'p50_s': round(estimate_quantile(self.buckets, counts, 0.5), 2),
+                    'p95_s': round(estimate_quantile(self.buckets, counts, 0.95), 2)
+                }
+            summary[f'{task_name}|{queue}'] = entry
+        return summary
+
+    def render(self):
+        """Prometheusテキスト形式の行リスト"""
+        metrics = self.load()
+        series = sorted(metrics.items())
+
+        lines = render_histogram(
+            'loto7_task_queue_wait_seconds', 'タスク投入から実行開始までの待ち時間（秒）',
+            [({'task': task, 'queue': queue}, *values['wait']) for (task, queue), values in series],
+            self.buckets
+        )
+        lines += render_histogram(
+            'loto7_task_run_seconds', 'タスク実行時間（秒）',
+            [({'task': task, 'queue': queue}, *values['run']) for (task, queue), values in series],
+            self.buckets
+        )
+
+        lines += ['# HELP loto7_tasks_total タスク件数（結果別）', '# TYPE loto7_tasks_total counter']
+        for (task, queue), values in series:
+            for outcome, count in sorted(values['outcome'].items()):
+                lines.append(f'loto7_tasks_total{format_labels({"task": task, "queue": queue, "outcome": outcome})} {count}')
+
+        lines += ['# HELP loto7_task_peak_rss_bytes タスク実行中のピークRSS（バイト）', '# TYPE loto7_task_peak_rss_bytes gauge']
+        for (task, queue), values in series:
+            lines.append(f'loto7_task_peak_rss_bytes{format_labels({"task": task, "queue": queue})} {values["peak_rss"]}')
+        return lines
@@ -36,7 +36,7 @@ def start_worker():
             '--loglevel=info',
             '--concurrency=1',
             '--pool=solo',  # Render.com無料プランに適したプール
-            '--queues=training,prediction,validation,celery',
+            '--queues=training,prediction,validation,learning,celery',
             '--without-heartbeat',  # ハートビート無効化（メモリ節約）
             '--without-mingle',     # Mingle無効化（起動高速化）
             '--without-gossip',     # Gossip無効化（メモリ節約）